@@ -1,7 +1,10 @@
 import config
+import base.commands
 import base.locations
 import games.base.game
 
+base.commands.register_commands("admin", "init")
+
 
 class PrivilegeError(Exception):
     def __init__(self, desc="You are not allowed to do this action."):
@@ -0,0 +1,271 @@
+"""
+Build the static assets: bundle and minify JavaScript and CSS files and give all files
+content-hashed names.
+
+Since the name of a built file changes whenever its content changes, browsers may cache them
+forever. The manifest maps the original URLs of the assets (e.g. "/static/client.js") to the
+URLs of the built files, both for the templates (`url()`) and for the JS loader (which gets the
+whole manifest).
+
+Minification uses rjsmin and rcssmin, if they are installed. Otherwise JS and CSS get a
+conservative built-in minification. Fonts are not built (nor subset) and stay in the static path.
+Every built file gets a gzipped sibling (and one compressed with brotli, if it is installed),
+which `server.StaticFileHandler` serves to clients that accept it.
+
+The assets are built when the server starts (unless `config["build_assets"]` is False).
+Run `python -m base.assets` to build them beforehand.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+
+from configuration import config
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+#: The URL under which the built assets are served.
+ASSET_URL = "/assets/"
+
+#: HTML fragments (relative to the static path) which the client loads.
+HTML_FRAGMENTS = ["welcome.html", "lobby.html", "admin.html"]
+
+#: Extensions of the files which are worth compressing.
+COMPRESSIBLE = (".js", ".css", ".html", ".json", ".svg")
+
+#: The file name extensions of precompressed files (by content encoding).
+ENCODING_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+_manifest = None
+_cache_control = None
+
+
+def content_hash(data):
+    """A short hash of `data` (bytes) for file names and cache control."""
+    return hashlib.sha1(data).hexdigest()[:12]
+
+
+def hashed_name(name, data):
+    """Insert the content hash of `data` into the file name `name`, e.g. client.js -> client.0123abcd4567.js."""
+    root, ext = os.path.splitext(name)
+    return "{}.{}{}".format(root, content_hash(data), ext)
+
+
+def minify_js(source):
+    """
+    Minify JavaScript.
+
+    Without rjsmin we only remove indentation, empty lines and lines containing nothing but a
+    // comment. Line breaks are kept, so automatic semicolon insertion still works.
+    """
+    if rjsmin:
+        return rjsmin.jsmin(source)
+    lines = (line.strip() for line in source.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//")) + "\n"
+
+
+def gzip_compress(data):
+    """Compress `data` with gzip (deterministically, i.e. without a time stamp)."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=9, mtime=0) as file:
+        file.write(data)
+    return buffer.getvalue()
+
+
+def compress(path):
+    """
+    Write precompressed siblings (.gz and, if brotli is installed, .br) of a file.
+
+    Nothing is written for files which are not compressible or do not get smaller.
+    """
+    if not path.endswith(COMPRESSIBLE):
+        return
+    with open(path, "rb") as file:
+        data = file.read()
+    compressors = [("gzip", gzip_compress)]
+    if brotli is not None:
+        compressors.append(("br", brotli.compress))
+    for encoding, compressor in compressors:
+        compressed = compressor(data)
+        if len(compressed) < len(data):
+            with open(path + ENCODING_EXTENSIONS[encoding], "wb") as file:
+                file.write(compressed)
+
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_SPACE = re.compile(r"\s+")
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(source):
+    """Minify CSS (without rcssmin we remove comments and superfluous white space)."""
+    if rcssmin:
+        return rcssmin.cssmin(source)
+    source = _CSS_COMMENT.sub("", source)
+    source = _CSS_SPACE.sub(" ", source)
+    return _CSS_PUNCTUATION.sub(r"\1", source).strip() + "\n"
+
+
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")?#]+)([^'")]*)\1\s*\)""")
+
+
+def rewrite_css_urls(source, manifest):
+    """Replace the URLs in `source` that have been built by the URLs of the built files."""
+    def replace(match):
+        quote, path, suffix = match.groups()
+        if path in manifest:
+            return "url({0}{1}{2}{0})".format(quote, manifest[path], suffix)
+        return match.group(0)
+    return _CSS_URL.sub(replace, source)
+
+
+class AssetBuilder:
+    """Build assets into `output_path` and collect the manifest."""
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.manifest = {}
+
+    def _write(self, name, data):
+        name = hashed_name(name, data)
+        path = os.path.join(self.output_path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path):
+            with open(path, "wb") as file:
+                file.write(data)
+            compress(path)
+        return ASSET_URL + name.replace(os.sep, "/")
+
+    def add_bundle(self, url, name, sources):
+        """
+        Concatenate and minify a list of JS or CSS files (depending on the extension of `name`).
+
+        :param url: The original URL of the bundle.
+        :param name: The name of the built file (relative to the output path).
+        :param sources: The files to bundle. Missing files are skipped.
+        """
+        sources = [s for s in sources if os.path.isfile(s)]
+        if not sources:
+            return
+        texts = []
+        for source in sources:
+            with open(source, encoding="utf-8") as file:
+                texts.append(file.read())
+        if name.endswith(".css"):
+            text = minify_css(rewrite_css_urls("\n".join(texts), self.manifest))
+        else:
+            # Separate with semicolons, in case a file does not end with one.
+            text = minify_js(";\n".join(texts))
+        self.manifest[url] = self._write(name, text.encode())
+
+    def add_file(self, url, name, source):
+        """Copy a file (e.g. an HTML fragment). Missing files are skipped."""
+        if not os.path.isfile(source):
+            return
+        with open(source, "rb") as file:
+            self.manifest[url] = self._write(name, file.read())
+
+    def write_manifest(self):
+        with open(os.path.join(self.output_path, "manifest.json"), "w") as file:
+            json.dump(self.manifest, file, indent=2, sort_keys=True)
+
+
+def build(games=()):
+    """
+    Build all assets of the server and the given games.
+
+    :param games: The identifiers of the games.
+    :return: The manifest.
+    """
+    global _manifest, _cache_control
+    static = config["static_path"]
+    builder = AssetBuilder(config["asset_path"])
+
+    builder.add_bundle("/static/client.js", "client.js", [os.path.join(static, "client.js")])
+    builder.add_bundle("/static/client.css", "client.css", [os.path.join(static, "client.css")])
+    builder.add_bundle("/static/admin.js", "admin.js", [os.path.join(static, "admin.js")])
+    for fragment in HTML_FRAGMENTS:
+        builder.add_file("/static/" + fragment, fragment, os.path.join(static, fragment))
+
+    for game in games:
+        source = os.path.join(os.path.dirname(os.path.dirname(__file__)), "games", game)
+        for name in ("game.js", "game.css"):
+            url = "/static/{}/{}/{}".format(config["games_static_path"], game, name)
+            builder.add_bundle(url, game + "/" + name, [os.path.join(source, name)])
+
+    builder.write_manifest()
+    _manifest = builder.manifest
+    _cache_control = None
+    logger.info("Built {} assets.".format(len(_manifest)))
+    return _manifest
+
+
+def get_manifest():
+    """
+    The manifest of the built assets.
+
+    If they have not been built in this process, the manifest of an earlier build is used (if any).
+    """
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(os.path.join(config["asset_path"], "manifest.json")) as file:
+                _manifest = json.load(file)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def url(path):
+    """The URL of the built version of the asset at `path` (or `path` itself if it was not built)."""
+    return get_manifest().get(path, path)
+
+
+def get_cache_control():
+    """
+    A string that changes whenever any static file changes.
+
+    The client adds it to the URLs of files that were not built, so that they are only cached until
+    they change (and not just until the server restarts).
+    """
+    global _cache_control
+    if _cache_control is None:
+        digest = hashlib.sha1()
+        for root, dirs, files in os.walk(config["static_path"]):
+            # The built assets are covered by the manifest.
+            dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != config["asset_path"])
+            for name in sorted(files):
+                try:
+                    with open(os.path.join(root, name), "rb") as file:
+                        digest.update(file.read())
+                except OSError:
+                    pass
+        for path, built in sorted(get_manifest().items()):
+            digest.update(built.encode())
+        _cache_control = digest.hexdigest()[:12]
+    return _cache_control
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for original, built in sorted(build(config["games"]).items()):
+        print("{} -> {}".format(original, built))
@@ -1,23 +1,32 @@
 """A client is a logged in user."""
 
+import asyncio
 import html
+import itertools
 import time
 import pprint
 import logging
+import concurrent.futures
 # import json
 # import os
 from collections import deque, defaultdict
 from unittest.mock import Mock
 
-import tornado.ioloop
-from tornado.concurrent import Future
-
 from configuration import config
 import server
+import base.assets
+import base.commands
+from base.commands import UnknownCommandError
+import base.encoding
 import base.interface
+import base.ratelimit
 
 logger = logging.getLogger(__name__)
 
+base.commands.register_commands(
+    "", "cancel_interactions", "quit", "set_client_info", "set_games_info", "set_variable"
+)
+
 
 class ClientManager:
     """Keep track of all clients."""
@@ -180,6 +189,7 @@ class Client:
         self.last_activity = time.time()
 
         self.messages = MessageQueue()
+        self.rate_limiter = base.ratelimit.RateLimiter()
         self._next_query_id = 1
         self._queries = {}
         self._permanent_messages = []
@@ -275,7 +285,7 @@ class Client:
             "id": self.id,
             "name": str(self),
             "admin": self.is_admin,
-            "cache_control": config["cache_control"]
+            "cache_control": config["cache_control"] or base.assets.get_cache_control(),
         }
         self.send_message(msg)
 
@@ -324,7 +334,10 @@ class Client:
         Send a message or command to the client.
 
         :type item: dict
+        :raises UnknownCommandError: If the client has no handler for the command.
         """
+        if not base.commands.is_known(item["command"]):
+            raise UnknownCommandError(item["command"])
         if logger.isEnabledFor(logging.DEBUG):
             logger.debug("Sending the following message to {}:\n{}".format(self.name, pprint.pformat(item)))
         self.messages.put(item)
@@ -392,12 +405,9 @@ class Client:
         self._next_query_id += 1
         return id_
 
-    def query(self, command, **kwargs):
+    async def query(self, command, **kwargs):
         """
-        Send a query to the UI that asks for user feedback.
-
-        This function returns a Future, that will receive the response when the query completes.
-        This future is intended to be `yield`ed from a coroutine.
+        Send a query to the UI that asks for user feedback and wait for the response.
 
         On the JS side this will call the function `command` with the three parameters:
          * `params`: `kwargs` (i.e. the actual parameters).
@@ -406,18 +416,19 @@ class Client:
 
         :param command: The UI command.
         :param kwargs: The parameters to the command.
-        :return: A future which will receive the response (which is always a dict).
-        :rtype: Future
+        :return: The response (which is always a dict).
+        :raises InteractionCancelledException: If `cancel_interactions()` is called (or the
+            exception passed to it).
         """
         query = {
             "command": command,
             "query_id": self._get_next_query_id(),
             "parameters": kwargs,
         }
-        future = Future()
+        future = asyncio.Future()
         self._queries[query["query_id"]] = {"query": query, "future": future}
         self.send_message(query)
-        return future
+        return await future
 
     def post_response(self, response):
         """
@@ -490,7 +501,7 @@ class MockClient(Client):
             command=command,
             parameters=kwargs,
         )
-        future = Future()
+        future = asyncio.Future()
         self.queries.append({"query": query, "future": future})
         query["query_id"] = len(self.queries) - 1
         self.send_message(query)
@@ -530,6 +541,118 @@ class NullClient():
         pass
 
 
+_bot_executor = None
+
+
+def get_bot_executor():
+    """
+    Return the pool in which computer players think (see `config.bot_processes`).
+
+    :rtype: concurrent.futures.Executor
+    """
+    global _bot_executor
+    if _bot_executor is None:
+        if config["bot_processes"]:
+            _bot_executor = concurrent.futures.ProcessPoolExecutor(config["bot_processes"])
+        else:
+            _bot_executor = concurrent.futures.ThreadPoolExecutor(1)
+    return _bot_executor
+
+
+class BotClient(Client):
+    """
+    A client for a computer player.
+
+    It can join locations like any other client, but all messages to it are discarded. Choices
+    (e.g. yes/no prompts) are answered with the first answer; all other decisions are made by the
+    game's player object. Expensive computations should be run through `think()`, so that they do
+    not block the event loop.
+    """
+
+    _ids = itertools.count(-2, -1)  # -1 is used by NullClient
+
+    def __init__(self, name="Computer", time_budget=None, inline=False, executor=None):
+        """
+        :param name: The name shown to the other players.
+        :param time_budget: Seconds the player may think per move (defaults to `config.bot_time_budget`).
+        :param inline: Compute synchronously in `think()` (for simulations and tests).
+        :param executor: The pool to think in (defaults to `get_bot_executor()`).
+        :type executor: concurrent.futures.Executor
+        """
+        super().__init__(next(BotClient._ids), name)
+        self.time_budget = config["bot_time_budget"] if time_budget is None else time_budget
+        self.inline = inline
+        self.executor = executor
+        self._thinking = set()
+
+    def send_message(self, item):
+        pass
+
+    def send_chat_message(self, item):
+        pass
+
+    def send_permanent_message(self, group, message):
+        pass
+
+    async def query(self, command, **kwargs):
+        """
+        Answer a query right away.
+
+        :raises BotQueryError: If the query is not a choice.
+        """
+        if command == "ui.choice":
+            return 0
+        raise BotQueryError(self, command)
+
+    def think(self, fn, *args):
+        """
+        Call `fn(*args)` in a worker.
+
+        :param fn: A function that can be pickled (i.e. defined at module level), as well as its arguments.
+        :return: A future which receives the return value (or an exception if `cancel_interactions()` is called).
+        :rtype: asyncio.Future
+        """
+        future = asyncio.Future()
+        if self.inline:
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        def done(worker_future):
+            self._thinking.discard(future)
+            if future.done():  # cancelled in the meantime
+                return
+            if worker_future.exception() is not None:
+                future.set_exception(worker_future.exception())
+            else:
+                future.set_result(worker_future.result())
+
+        self._thinking.add(future)
+        worker_future = (self.executor or get_bot_executor()).submit(fn, *args)
+        asyncio.wrap_future(worker_future).add_done_callback(done)
+        return future
+
+    def cancel_interactions(self, exception=None):
+        if exception is None:
+            exception = InteractionCancelledException()
+        for future in self._thinking:
+            if not future.done():
+                future.set_exception(exception)
+        self._thinking = set()
+
+
+class BotQueryError(Exception):
+    """A computer player was sent a query it cannot answer."""
+    def __init__(self, client, command):
+        self.client = client
+        self.command = command
+
+    def __str__(self):
+        return "Computer player {} cannot answer the query {}.".format(self.client, self.command)
+
+
 class UnhandledClientRequestError(Exception):
     """An exception that is raised when the client sends a request that could not be handled."""
     def __init__(self, command):
@@ -543,6 +666,7 @@ class MessageQueue():
     """A queue that stores all messages that are waiting to be send to the client."""
     def __init__(self):
         self.messages = []
+        self.encoder = base.encoding.JsonEncoder()
         self._poll_request_handler = None
 
     def wait_for_messages(self, poll_request_handler):
@@ -562,7 +686,7 @@ class MessageQueue():
         """
         self.messages.append(message)
         if self._poll_request_handler:
-            tornado.ioloop.IOLoop.instance().add_callback(self._poll_request_handler.send_messages)
+            asyncio.get_event_loop().call_soon(self._poll_request_handler.send_messages)
             self._poll_request_handler = None
 
     def get_all(self):
@@ -571,6 +695,15 @@ class MessageQueue():
         self.messages.clear()
         return msgs
 
+    def set_encoding(self, name):
+        """
+        Set the wire encoding the client understands (see `base.encoding`).
+
+        Changing it starts with a fresh encoder, keeping it keeps the state of the current one.
+        """
+        if name != self.encoder.name:
+            self.encoder = base.encoding.get_encoder(name)
+
     def clear(self):
         """Remove all messages from the queue."""
         self.messages.clear()
@@ -578,6 +711,8 @@ class MessageQueue():
     def client_reconnected(self):
         """Handle a client reconnect."""
         self.clear()
+        # The new page does not know any interned shapes.
+        self.encoder = base.encoding.get_encoder(self.encoder.name)
         if self._poll_request_handler:
             self._poll_request_handler.disconnect_old_connection()
             self._poll_request_handler = None
\ No newline at end of file
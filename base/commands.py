@@ -0,0 +1,32 @@
+"""
+The commands sent to the client.
+
+A command "games.base.init" is the handler "init" of the namespace "games.base" and a command
+without a dot (e.g. "quit") belongs to the namespace "". Every module that sends commands
+registers them when it is imported, just like the JS modules register their handlers with
+`commands.register()` in client.js. `base.client.Client.send_message()` rejects commands that
+have not been registered, so that typos show up on the server instead of as "Unknown command"
+in some browser console.
+"""
+
+_commands = set()
+
+
+class UnknownCommandError(Exception):
+    """A command that has not been registered was sent to the client."""
+    def __init__(self, command):
+        self.command = command
+
+    def __str__(self):
+        return "Unknown client command {}.".format(self.command)
+
+
+def register_commands(namespace, *names):
+    """Declare that the client has handlers for the commands `names` in `namespace`."""
+    for name in names:
+        _commands.add(namespace + "." + name if namespace else name)
+
+
+def is_known(command):
+    """Has `command` been registered?"""
+    return command in _commands
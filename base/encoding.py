@@ -0,0 +1,84 @@
+"""
+Wire encodings of the messages sent to the client.
+
+The plain "json" encoding sends a list of message dicts. Most messages repeat the same long
+command names and keys over and over (e.g. {"command": "games.schnapsen.update_game_ui", ...}),
+so the "compact" encoding interns them: the first time a message with a new *shape* (its command
+and its keys) is sent, the shape is sent along and gets the next id. Afterwards such messages
+are sent as arrays [shape id, value, value, ...]. A compact response looks like
+
+    {"s": {"0": ["games.base.init", "game_id", "players"]}, "m": [[0, 12, ["Alice", "Bob"]]]}
+
+where "s" maps the ids of the new shapes to the shapes and "m" lists the encoded messages. The
+values (e.g. query parameters or HTML) are sent as they are.
+
+The new shapes are only remembered once the response has been serialized. If a response gets
+lost nevertheless, the client notices the gap in the shape ids and reloads the page.
+
+The client announces which encoding it understands when it polls (see `server.PollHandler`).
+Since the client only keeps the shapes for the lifetime of the page, the shapes are forgotten
+when it reconnects.
+"""
+
+import json
+
+
+class JsonEncoder:
+    """Send the messages as they are."""
+    name = "json"
+
+    def encode(self, messages):
+        """
+        Encode a list of messages.
+
+        :type messages: list
+        :return: A JSON serializable object.
+        """
+        return messages
+
+    def dumps(self, messages):
+        """Encode a list of messages as a JSON string."""
+        return json.dumps(self.encode(messages))
+
+
+class CompactEncoder(JsonEncoder):
+    """Intern the shapes of the messages."""
+    name = "compact"
+
+    def __init__(self):
+        self._shapes = {}  # (command, key, key, ...) -> id
+
+    def encode(self, messages):
+        return self._encode(messages)[0]
+
+    def _encode(self, messages):
+        """Encode `messages` and return the encoded object and the new shapes (shape -> id)."""
+        new_shapes = {}
+        encoded = []
+        for message in messages:
+            shape = (message["command"],) + tuple(key for key in message if key != "command")
+            id_ = self._shapes.get(shape)
+            if id_ is None:
+                id_ = new_shapes.get(shape)
+            if id_ is None:
+                id_ = new_shapes[shape] = len(self._shapes) + len(new_shapes)
+            encoded.append([id_] + [message[key] for key in shape[1:]])
+        return {"s": {id_: list(shape) for shape, id_ in new_shapes.items()}, "m": encoded}, new_shapes
+
+    def dumps(self, messages):
+        data, new_shapes = self._encode(messages)
+        dumped = json.dumps(data, separators=(",", ":"))
+        self._shapes.update(new_shapes)
+        return dumped
+
+
+ENCODINGS = {encoder.name: encoder for encoder in (JsonEncoder, CompactEncoder)}
+
+
+def get_encoder(name):
+    """
+    Get a (fresh) encoder.
+
+    :param name: The name of the encoding. Unknown encodings fall back to "json".
+    """
+    return ENCODINGS.get(name, JsonEncoder)()
@@ -1,14 +1,15 @@
 """Some basic UI elements."""
 
-from tornado.gen import coroutine
+import base.commands
+
+base.commands.register_commands("ui", "choice", "say")
 
 
 class UI():
     def __init__(self, client):
         self.client = client
 
-    @coroutine
-    def ask_choice(self, question, answers, leave_question=False, new_line_after_question=True):
+    async def ask_choice(self, question, answers, leave_question=False, new_line_after_question=True):
         """
         Ask a multiple choice question.
 
@@ -27,7 +28,7 @@ class UI():
         assert len(answers) > 0, "You must give at least one answer."
 
         while True:
-            result = yield self.client.query(
+            result = await self.client.query(
                 'ui.choice',
                 question=question,
                 answers=answers,
@@ -43,8 +44,7 @@ class UI():
             except (ValueError, KeyError, TypeError):
                 continue
 
-    @coroutine
-    def ask_yes_no(self, question, leave_question=False):
+    async def ask_yes_no(self, question, leave_question=False):
         """
         Ask a yes/no question.
 
@@ -53,11 +53,10 @@ class UI():
         :return: True if the user says "yes", False otherwise.
         :rtype: bool
         """
-        result = yield self.ask_choice(question, ["Yes", "No"], leave_question)
+        result = await self.ask_choice(question, ["Yes", "No"], leave_question)
         return [True, False][result]
 
-    @coroutine
-    def link(self, link_text, pre_text=""):
+    async def link(self, link_text, pre_text=""):
         """
         Present the player with a link to click.
 
@@ -66,7 +65,7 @@ class UI():
         @param link_text: The text that is clickable.
         @param pre_text: Non-clickable text before the link.
         """
-        yield self.ask_choice(pre_text, [link_text], new_line_after_question=False)
+        await self.ask_choice(pre_text, [link_text], new_line_after_question=False)
 
     def say(self, msg):
         """Say something to the client."""
@@ -1,16 +1,56 @@
+import asyncio
 import time
 import html
 import logging
-
-import tornado.ioloop
+from collections import Counter
 
 from configuration import config
 import base.client
+import base.commands
 import server
 
 
 logger = logging.getLogger(__name__)
 
+base.commands.register_commands("chat", "enable", "disable", "receive_message", "system_message")
+base.commands.register_commands("lobby", "init")
+
+#: The number of messages sent by `broadcast()`, by command.
+fanout = Counter()
+
+
+def broadcast(clients, payload, overrides=None, chat=False, permanent_group=None):
+    """
+    Send the same message to many clients.
+
+    The command is checked before anything is sent, so that an unknown command reaches none of
+    the clients. All clients without overrides get the very same payload object, which is only
+    encoded when it is polled.
+
+    :param clients: The recipients.
+    :param payload: The message (dict).
+    :param overrides: Maps clients to dicts of keys that differ for them (e.g. a message
+                      rendered for that client). The payload itself is not changed.
+    :type overrides: dict
+    :param chat: Whether to send a chat message (see `base.client.Client.send_chat_message()`).
+    :param permanent_group: Send a permanent message of this group instead (see
+                            `base.client.Client.send_permanent_message()`).
+    """
+    if not base.commands.is_known(payload["command"]):
+        raise base.commands.UnknownCommandError(payload["command"])
+    overrides = overrides or {}
+    count = 0
+    for client in clients:
+        message = dict(payload, **overrides[client]) if client in overrides else payload
+        if permanent_group is not None:
+            client.send_permanent_message(permanent_group, message)
+        elif chat:
+            client.send_chat_message(message)
+        else:
+            client.send_message(message)
+        count += 1
+    fanout[payload["command"]] += count
+
 
 class LocationManager:
     def __init__(self):
@@ -82,8 +122,7 @@ class Location:
                     "time": time.time()
                 }
                 logging.getLogger('chat').info("{}: {}".format(client.name, message))
-                for c in self.clients:
-                    c.send_chat_message(cmd)
+                self.broadcast(cmd, chat=True)
             return True
         return False
 
@@ -112,8 +151,16 @@ class Location:
             "level": level,
             "time": time.time()
         }
-        for c in self.clients:
-            c.send_chat_message(d)
+        self.broadcast(d, chat=True)
+
+    def broadcast(self, payload, overrides=None, exclude=(), **kwargs):
+        """
+        Send a message to all clients in the location (see `broadcast()`).
+
+        :param exclude: Clients who do not get the message.
+        """
+        clients = [c for c in self.clients if c not in exclude] if exclude else self.clients
+        broadcast(clients, payload, overrides, **kwargs)
 
     def notify_of_exception(self, e):
         """
@@ -128,10 +175,19 @@ class Location:
             self.system_message("An error occurred. Expect weird things. [{}]".format(html.escape(str(e))))
 
     def anchor_coroutine(self, coroutine):
-        future = coroutine()
-        tornado.ioloop.IOLoop.instance().add_future(future, self._anchored_coroutine_done)
+        """
+        Run the coroutine function `coroutine` in a task and report its exceptions to the clients.
+
+        :return: The task.
+        :rtype: asyncio.Task
+        """
+        task = asyncio.get_event_loop().create_task(coroutine())
+        task.add_done_callback(self._anchored_coroutine_done)
+        return task
 
     def _anchored_coroutine_done(self, future):
+        if future.cancelled():
+            return
         e = future.exception()
         if e:
             self.notify_of_exception(e)
@@ -0,0 +1,98 @@
+"""
+Versioned membership lists of locations.
+
+Instead of telling every client about every single join and leave (which is quadratic in the
+number of clients when a lobby fills up), a `Presence` collects the changes of one event loop
+iteration and sends them as a single diff. Every diff increases the version of the membership
+list, so a client can tell whether it missed one and has to fetch a fresh snapshot.
+Snapshots can be fetched in pages, so that large lobbies do not have to be sent at once.
+"""
+
+import asyncio
+
+
+class Presence:
+    """The membership list of a location."""
+
+    def __init__(self, location, command):
+        """
+        :param location: The location whose clients receive the diffs.
+        :type location: base.locations.Location
+        :param command: The command of the diff messages.
+        """
+        self.location = location
+        self.command = command
+        self.version = 0
+        self.members = {}  # id -> name of all members as of `self.version` (in order of joining).
+        self._pending = {}  # id -> name (or None if the client left) of changes since the last diff.
+        self._flush_scheduled = False
+
+    def add(self, client):
+        """A client joins (it will be part of the next diff)."""
+        self._pending[client.id] = str(client)
+        self._schedule_flush()
+
+    def remove(self, client):
+        """A client leaves (it will be part of the next diff)."""
+        self._pending[client.id] = None
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_event_loop().call_soon(self.flush)
+
+    def get_diff(self):
+        """
+        Apply the pending changes and return them.
+
+        :return: A diff message (or None if nothing changed). "add" maps the ids of new (or
+                 renamed) members to their names and "remove" lists the ids of members who left.
+        """
+        add, remove = {}, []
+        for id_, name in self._pending.items():
+            if name is None:
+                if id_ in self.members:
+                    del self.members[id_]
+                    remove.append(id_)
+            elif self.members.get(id_) != name:
+                self.members[id_] = name
+                add[id_] = name
+        self._pending.clear()
+
+        if not add and not remove:
+            return None
+        self.version += 1
+        return {
+            "command": self.command,
+            "version": self.version,
+            "add": add,
+            "remove": remove,
+        }
+
+    def flush(self):
+        """Send the pending changes to all clients of the location."""
+        self._flush_scheduled = False
+        diff = self.get_diff()
+        if diff:
+            self.location.broadcast(diff)
+
+    def get_snapshot(self, offset=0, limit=None):
+        """
+        Return (a page of) the members as of the current version.
+
+        Pending changes are not included; they will reach the client with the next diff.
+
+        :param offset: Index of the first member to return.
+        :param limit: Maximal number of members to return (all if None).
+        :return: A dict with the "version", the "total" number of members, the "offset" and the
+                 "clients" of the page (mapping ids to names).
+        """
+        ids = list(self.members)
+        end = len(ids) if limit is None else offset + limit
+        return {
+            "version": self.version,
+            "total": len(ids),
+            "offset": offset,
+            "clients": {id_: self.members[id_] for id_ in ids[offset:end]},
+        }
@@ -0,0 +1,70 @@
+"""
+Limit how often a client may send requests.
+
+Every client has a token bucket per class of commands (see `config["rate_limits"]`). A command
+belongs to the class with the longest matching name, where "games.lobby" matches
+"games.lobby.propose_game" and "" matches every command. A request takes a token from its
+bucket, and buckets fill up again at a constant rate. Requests that find their bucket empty are
+rejected (with HTTP status 429, see `server.ClientRequestHandler`).
+"""
+
+import time
+
+from configuration import config
+
+
+class TokenBucket:
+    """Allow `rate` actions per second on average and bursts of up to `burst` actions."""
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._clock = clock
+        self._last = clock()
+
+    def take(self):
+        """
+        Take a token (if there is one).
+
+        :return: Whether the action is allowed.
+        :rtype: bool
+        """
+        now = self._clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def get_command_class(command, classes):
+    """
+    The class of `command`, i.e. the longest name in `classes` that matches it.
+
+    :return: The class (or None if no class matches).
+    """
+    matching = [c for c in classes if c == "" or command == c or command.startswith(c + ".")]
+    return max(matching, key=len) if matching else None
+
+
+class RateLimiter:
+    """The token buckets of a client."""
+    def __init__(self, clock=time.monotonic):
+        self._buckets = {}  # command class -> TokenBucket
+        self._clock = clock
+
+    def allow(self, command):
+        """
+        Is the client allowed to send `command` now?
+
+        :rtype: bool
+        """
+        limits = config["rate_limits"]
+        command_class = get_command_class(command, limits)
+        if command_class is None:
+            return True
+        bucket = self._buckets.get(command_class)
+        if bucket is None:
+            bucket = self._buckets[command_class] = TokenBucket(*limits[command_class], clock=self._clock)
+        return bucket.take()
@@ -0,0 +1,75 @@
+"""
+Handle the requests and responses of the clients outside of the HTTP handlers.
+
+Handling a request can take a while (e.g. a lobby broadcast or resuming a game coroutine, which
+then writes to the log of every player). The HTTP handlers therefore only put the requests into
+the queue of the client's location and return. The scheduler then handles the queues in rounds,
+with at most `config["request_batch_size"]` requests of every location per round. Between two
+rounds the event loop can accept new connections and answer polls. A busy game therefore cannot
+keep the requests of other locations waiting.
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+import logging
+
+from configuration import config
+
+logger = logging.getLogger(__name__)
+
+
+class RequestScheduler:
+    """The request queues of all locations."""
+    def __init__(self):
+        self._queues = OrderedDict()  # location -> deque of (client, function, args, key)
+        self._keys = set()  # keys of the waiting calls
+        self._scheduled = False
+
+    def __len__(self):
+        """The number of waiting requests."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def put(self, client, function, *args, key=None):
+        """
+        Call `function(*args)` for `client` in a later round.
+
+        Exceptions raised by `function` are logged and reported to the client's location.
+
+        :type client: base.client.Client
+        :param key: If given, the call is dropped while a call with the same key is still waiting.
+        :return: Whether the call was queued.
+        :rtype: bool
+        """
+        if key is not None:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+        queue = self._queues.get(client.location)
+        if queue is None:
+            queue = self._queues[client.location] = deque()
+        queue.append((client, function, args, key))
+        self._schedule()
+        return True
+
+    def _schedule(self):
+        if not self._scheduled:
+            self._scheduled = True
+            asyncio.get_event_loop().call_soon(self.run_round)
+
+    def run_round(self):
+        """Handle the next batch of requests of every location."""
+        self._scheduled = False
+        for location in list(self._queues):
+            queue = self._queues[location]
+            for _ in range(min(len(queue), config["request_batch_size"])):
+                client, function, args, key = queue.popleft()
+                self._keys.discard(key)
+                try:
+                    function(*args)
+                except Exception as e:
+                    logger.exception("Error while handling a request of {}.".format(client))
+                    client.notify_of_exception(e)
+            if not queue:
+                del self._queues[location]
+        if self._queues:
+            self._schedule()
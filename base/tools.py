@@ -1,10 +1,11 @@
 # import warnings
+import asyncio
 import functools
+import json
 # import traceback
 import os
 
 import tornado.template
-import tornado.gen
 
 from configuration import config
 
@@ -32,19 +33,11 @@ def decorator(d):
     return wrapper
 
 
-@decorator
-def coroutine(func):
-    """
-    A wrapper around tornado.gen.coroutine, that marks the function as a coroutine.
-    """
-    return tornado.gen.coroutine(func)
-
-
 def iscoroutine(f):
     """
-    Check whether a function is a coroutine (i.e. is decorated with base.tools.coroutine).
+    Check whether a function is a coroutine function (i.e. defined with `async def`).
     """
-    return hasattr(f, "decorators") and "coroutine" in f.decorators
+    return asyncio.iscoroutinefunction(f)
 
 
 # def deprecated(func):
@@ -115,6 +108,17 @@ def a_or_number(num, a="a"):
         return num
 
 
+def json_for_script(value):
+    """
+    Encode `value` as JSON that can be embedded in a <script> element.
+
+    Besides non-ASCII characters (including the line separators U+2028 and U+2029, which end
+    string literals in older browsers) we also escape <, > and &, so that the JSON cannot
+    close the script element or open a comment.
+    """
+    return json.dumps(value).replace("<", "\\u003c").replace(">", "\\u003e").replace("&", "\\u0026")
+
+
 template_loader = tornado.template.Loader(config["template_path"])
 
 
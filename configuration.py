@@ -1,6 +1,4 @@
 import argparse
-import hashlib
-import time
 import os
 import binascii
 from collections import ChainMap
@@ -59,9 +57,15 @@ config = ConfigChainMap(dict(
     # Set to true to disable stored log-ins
     disable_stored_logins=False,
 
-    # The following value is used by the clients to smartly cache stuff, but only until we reload the server
-    # or change this variable.
-    cache_control=hashlib.md5(str(time.clock()).encode()).hexdigest(),
+    # The following value is used by the clients to smartly cache stuff, but only until we change this variable.
+    # If None, a hash of the static files is used (see `base.assets.get_cache_control()`).
+    cache_control=None,
+
+    # The folder where the built (minified and content-hashed) static files are put
+    asset_path=os.path.join(os.path.dirname(__file__), "static/assets"),
+
+    # Whether to build the static files when the server starts.
+    build_assets=True,
 
     # Used for secure cookies
     cookie_secret=binascii.hexlify(os.urandom(32)).decode(),
@@ -74,6 +78,44 @@ config = ConfigChainMap(dict(
     # Whether to allow cheats (useful for testing).
     cheats_enabled=False,
 
+    # Whether clients may use the compact wire encoding (see `base.encoding`).
+    compact_encoding=True,
+
+    # Poll responses of at least this many bytes are gzipped (None to never compress them).
+    poll_compression_threshold=2048,
+
+    # The gzip compression level (1-9) of poll responses.
+    poll_compression_level=6,
+
+    # Rate limits of client requests: command class -> (requests per second, burst size), see `base.ratelimit`.
+    # A command belongs to the longest matching class, "" matches all commands.
+    rate_limits={
+        "": (20, 50),
+        "chat.message": (1, 5),
+        "games.lobby.propose_game": (0.5, 5),
+        "games.get_info": (1, 3),
+    },
+
+    # Command classes (see `rate_limits`) of idempotent requests. Such a request is dropped if an identical
+    # request of the same client is still waiting.
+    deduplicate_requests=["games.get_info", "games.lobby.propose_game"],
+
+    # The asyncio event loop policy (a dotted class name). If it cannot be imported (or is None),
+    # asyncio's default event loop is used.
+    event_loop_policy="uvloop.EventLoopPolicy",
+
+    # Maximal number of requests of a location that are handled before other locations get their turn.
+    request_batch_size=20,
+
+    # Number of clients per page of a lobby's membership list.
+    lobby_page_size=200,
+
+    # Number of worker processes in which computer players think (0 to use a thread instead).
+    bot_processes=1,
+
+    # Time (in seconds) a computer player may think about a move.
+    bot_time_budget=1.0,
+
     # These games are available.
     games=["schnapsen"]
 ))
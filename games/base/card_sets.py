@@ -0,0 +1,108 @@
+"""
+Bitset representation of sets of cards from a fixed deck.
+
+Every card of the deck is assigned a bit, so that a set of cards is just an integer.
+Membership tests, intersections and filtering by suit or rank are then simple integer
+operations. This is mainly useful for games with small, fixed decks and for AI search.
+"""
+
+
+def popcount(mask):
+    """Return the number of cards in the set `mask`."""
+    return bin(mask).count("1")
+
+
+def iter_bits(mask):
+    """Iterate over the indices of the bits set in `mask` (from lowest to highest)."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DeckIndex:
+    """Assign a bit to every card of a fixed deck."""
+
+    def __init__(self, cards):
+        """
+        :param cards: All cards of the deck. Their ids must be unique.
+        """
+        self.cards = list(cards)
+        self.bits = {card.id: 1 << i for i, card in enumerate(self.cards)}
+        self.positions = {card.id: i for i, card in enumerate(self.cards)}
+        self.all = (1 << len(self.cards)) - 1
+        assert len(self.bits) == len(self.cards), "Card ids must be unique."
+
+    def bit(self, card):
+        """Return the bit of a single card."""
+        return self.bits[card.id]
+
+    def position(self, card):
+        """Return the index of the bit of a single card."""
+        return self.positions[card.id]
+
+    def mask(self, cards):
+        """Return the set containing `cards`."""
+        bits = self.bits
+        mask = 0
+        for card in cards:
+            mask |= bits[card.id]
+        return mask
+
+    def mask_of_ids(self, ids):
+        """Return the set containing the cards with the given ids."""
+        bits = self.bits
+        mask = 0
+        for id_ in ids:
+            mask |= bits[id_]
+        return mask
+
+    def get_cards(self, mask):
+        """Return a list of the cards in the set `mask` (in deck order)."""
+        return [self.cards[i] for i in iter_bits(mask)]
+
+    def ids(self, mask):
+        """Return a list of the ids of the cards in the set `mask` (in deck order)."""
+        return [self.cards[i].id for i in iter_bits(mask)]
+
+    def filter(self, cards, mask):
+        """Return the cards in `cards` which are in the set `mask` (keeping the order of `cards`)."""
+        bits = self.bits
+        return [card for card in cards if bits[card.id] & mask]
+
+
+class PlayingCardDeckIndex(DeckIndex):
+    """
+    A `DeckIndex` for `games.base.playing_cards.Card`s.
+
+    Besides the bits we precompute masks of all suits and ranks and tables to decide tricks
+    in games where the higher card of the led suit wins, unless a trump is played.
+    """
+
+    def __init__(self, cards):
+        super().__init__(cards)
+        self.suit_masks = {}
+        self.rank_masks = {}
+        for card in self.cards:
+            self.suit_masks[card.suit] = self.suit_masks.get(card.suit, 0) | self.bits[card.id]
+            self.rank_masks[card.rank] = self.rank_masks.get(card.rank, 0) | self.bits[card.id]
+        self.values = tuple(card.value for card in self.cards)
+
+        # higher[i]: Cards of the same suit as card i with a higher value.
+        self.higher = tuple(
+            self.mask(c for c in self.cards if c.suit == card.suit and c.value > card.value)
+            for card in self.cards
+        )
+        # beaten_by[trump][i]: Cards that win a trick led by card i.
+        self.beaten_by = {
+            trump: tuple(
+                self.higher[i] | (self.suit_masks[trump] if card.suit != trump else 0)
+                for i, card in enumerate(self.cards)
+            )
+            for trump in self.suit_masks
+        }
+
+    def value(self, mask):
+        """Return the sum of the values of the cards in the set `mask`."""
+        values = self.values
+        return sum(values[i] for i in iter_bits(mask))
@@ -1,18 +1,45 @@
+import asyncio
+import contextlib
 import random
 
-from tornado.gen import coroutine
-
+import base.commands
 from games.base.game import CheaterException
 from games.base.log import PlayerLogEntry
 from base.tools import english_join_list, plural_s, a_or_number
 
+base.commands.register_commands("games.base.cards", "select")
+
+
+def set_invariant_checks(enabled):
+    """
+    Globally switch the invariant checks of card collections on or off.
+
+    The checks (only cards, no duplicates, consistent locations) are on by default. They take
+    time linear in the size of the collection on every change, so simulations and production
+    servers may want to switch them off. Single collections (or all collections of a game, see
+    `games.base.game.Game.check_invariants`) can override the global setting.
+
+    :return: The previous setting.
+    """
+    previous = CardCollection.checked
+    CardCollection.checked = enabled
+    return previous
+
 
 class Card:
     """Abstract base class for all cards."""
+
+    # Whether this class overrides `_on_location_change()`. Otherwise we do not call it on each move.
+    _has_location_hook = False
+
     def __init__(self):
         self.id = None
         self._location = None
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._has_location_hook = cls._on_location_change is not Card._on_location_change
+
     @property
     def location(self):
         return self._location
@@ -20,7 +47,9 @@ class Card:
     @location.setter
     def location(self, value):
         self._location = value
-        self._on_location_change()
+        # The hook may also be set on single instances (e.g. in tests).
+        if self._has_location_hook or "_on_location_change" in self.__dict__:
+            self._on_location_change()
 
     def _on_location_change(self):
         pass
@@ -29,13 +58,28 @@ class Card:
         raise NotImplementedError()
 
 
+def _trusted_collection(cards):
+    """
+    Wrap cards in a `CardCollection` without checking them again.
+
+    Only use this for cards that are known to be valid, e.g. a slice of another collection.
+    """
+    collection = CardCollection()
+    list.extend(collection, cards)
+    return collection
+
+
 class CardCollection(list):
     """A generic collection of cards."""
 
+    #: Check the invariants on every change? (See `set_invariant_checks()`.)
+    checked = True
+
     def __init__(self, iterable=None):
         if iterable is not None:
-            assert all(isinstance(o, Card) for o in iterable), "Only cards are allowed in a CardCollection."
-            assert len(iterable) == len(set(iterable)), "Duplicate cards are not allowed."
+            if self.checked:
+                assert all(isinstance(o, Card) for o in iterable), "Only cards are allowed in a CardCollection."
+                assert len(iterable) == len(set(iterable)), "Duplicate cards are not allowed."
             super().__init__(iterable)
         else:
             super().__init__()
@@ -44,34 +88,39 @@ class CardCollection(list):
         """
         Note that we do not assert uniqueness here. This is needed for shuffling.
         """
-        if isinstance(key, slice):
-            assert all(isinstance(o, Card) for o in card), "Only cards are allowed in a CardCollection."
-        else:
-            assert isinstance(card, Card), "Only cards are allowed in a CardCollection."
+        if self.checked:
+            if isinstance(key, slice):
+                assert all(isinstance(o, Card) for o in card), "Only cards are allowed in a CardCollection."
+            else:
+                assert isinstance(card, Card), "Only cards are allowed in a CardCollection."
 
         super().__setitem__(key, card)
 
     def append(self, card):
-        assert isinstance(card, Card), "Only cards are allowed in a CardCollection."
-        assert not card in self, "Duplicate cards are not allowed."
+        if self.checked:
+            assert isinstance(card, Card), "Only cards are allowed in a CardCollection."
+            assert not card in self, "Duplicate cards are not allowed."
         super().append(card)
 
     def copy(self):
-        return CardCollection(self[:])
+        return _trusted_collection(self)
 
     def extend(self, iterable):
-        assert all(isinstance(o, Card) for o in iterable), "Only cards are allowed in a CardCollection."
-        assert all(card not in self for card in iterable), "Duplicate cards are not allowed."
-        assert len(iterable) == len(set(iterable)), "Duplicate cards are not allowed."
+        if self.checked:
+            assert all(isinstance(o, Card) for o in iterable), "Only cards are allowed in a CardCollection."
+            assert all(card not in self for card in iterable), "Duplicate cards are not allowed."
+            assert len(iterable) == len(set(iterable)), "Duplicate cards are not allowed."
         super().extend(iterable)
 
     def insert(self, index, card):
-        assert isinstance(card, Card), "Only cards are allowed in a CardCollection."
-        assert not card in self, "Duplicate cards are not allowed."
+        if self.checked:
+            assert isinstance(card, Card), "Only cards are allowed in a CardCollection."
+            assert not card in self, "Duplicate cards are not allowed."
         super().insert(index, card)
 
     def remove(self, card):
-        assert isinstance(card, Card)
+        if self.checked:
+            assert isinstance(card, Card)
         super().remove(card)
 
     def remove_collection(self, iterable):
@@ -85,7 +134,7 @@ class CardCollection(list):
             f = [c for c in f if isinstance(c, condition)]
         for attr, value in kwconditions.items():
             f = [c for c in f if getattr(c, attr) == value]
-        return CardCollection(f)
+        return _trusted_collection(f)
 
     def antifilter(self, *conditions, **kwconditions):
         """Get a subcollection of all cards not having class in *conditions and
@@ -95,7 +144,7 @@ class CardCollection(list):
             f = [c for c in f if not isinstance(c, condition)]
         for attr, value in kwconditions.items():
             f = [c for c in f if not getattr(c, attr) == value]
-        return CardCollection(f)
+        return _trusted_collection(f)
 
     def call(self, method, *args, **kwargs):
         """Call a method on all cards in the collection."""
@@ -106,9 +155,15 @@ class CardCollection(list):
         """Return a list of all card ids in this collection."""
         return [c.id for c in self]
 
-    def shuffle(self):
-        """Shuffle the collection."""
-        random.shuffle(self)
+    def shuffle(self, rng=None):
+        """
+        Shuffle the collection.
+
+        :param rng: The random number generator to use (usually the game's `random` attribute).
+                    If it is None, the global `random` module is used.
+        :type rng: random.Random
+        """
+        (rng or random).shuffle(self)
 
     def get_by_ids(self, *ids):
         """Get the cards with the given ids."""
@@ -116,7 +171,7 @@ class CardCollection(list):
         if len(found) != len(ids):
             found_ids = [c.id for c in found]
             raise KeyError([id for id in ids if not id in found_ids])
-        return CardCollection(found)
+        return _trusted_collection(found)
 
     def get_by_id(self, id):
         """Get the card with the given id."""
@@ -124,12 +179,135 @@ class CardCollection(list):
 
     def get_except_ids(self, *ids):
         """Get all cards except those with the given ids,"""
-        return CardCollection([c for c in self if not c.id in ids])
+        return _trusted_collection([c for c in self if not c.id in ids])
+
+
+class IndexedCardCollection(CardCollection):
+    """
+    A card collection that additionally keeps a hash index of its cards.
+
+    Membership tests (and thus the duplicate checks of `append()`, `insert()` and `extend()`)
+    as well as `get_by_id()` and `get_by_ids()` take constant time per card instead of scanning
+    the whole collection. Use this for large collections, e.g. the supply piles of deck-builders.
+
+    The cards' ids must be unique within the collection (cards without an id can only be found
+    by membership, not by id).
+    """
+
+    def __init__(self, iterable=None):
+        self._counts = {}
+        self._by_id = {}
+        super().__init__(iterable)
+        self._reindex()
+
+    def _index(self, card):
+        self._counts[card] = self._counts.get(card, 0) + 1
+        if card.id is not None:
+            self._by_id[card.id] = card
+
+    def _unindex(self, card):
+        # Unchecked collections may hold a card more than once; keep it indexed until the last copy is gone.
+        count = self._counts.get(card, 0) - 1
+        if count > 0:
+            self._counts[card] = count
+            return
+        self._counts.pop(card, None)
+        if self._by_id.get(card.id) is card:
+            del self._by_id[card.id]
+
+    def _reindex(self):
+        self._counts = {}
+        for card in self:
+            self._counts[card] = self._counts.get(card, 0) + 1
+        self._by_id = {card.id: card for card in self if card.id is not None}
+
+    def __contains__(self, card):
+        return card in self._counts
+
+    def __setitem__(self, key, card):
+        if isinstance(key, slice):
+            super().__setitem__(key, card)
+            self._reindex()
+        else:
+            old = list.__getitem__(self, key)
+            super().__setitem__(key, card)
+            self._index(card)
+            self._unindex(old)
+
+    def __delitem__(self, key):
+        removed = self[key]
+        if not isinstance(key, slice):
+            removed = [removed]
+        super().__delitem__(key)
+        for card in removed:
+            self._unindex(card)
+
+    def __iadd__(self, iterable):
+        self.extend(iterable)
+        return self
+
+    def append(self, card):
+        super().append(card)
+        self._index(card)
+
+    def clear(self):
+        super().clear()
+        self._counts = {}
+        self._by_id = {}
+
+    def extend(self, iterable):
+        iterable = list(iterable)
+        super().extend(iterable)
+        for card in iterable:
+            self._index(card)
+
+    def insert(self, index, card):
+        super().insert(index, card)
+        self._index(card)
+
+    def pop(self, index=-1):
+        card = super().pop(index)
+        self._unindex(card)
+        return card
+
+    def remove(self, card):
+        super().remove(card)
+        self._unindex(card)
+
+    def shuffle(self, rng=None):
+        """Shuffle the collection (without touching the index, as the cards stay the same)."""
+        cards = self[:]
+        (rng or random).shuffle(cards)
+        list.__setitem__(self, slice(None), cards)
+
+    def get_by_ids(self, *ids):
+        """Get the cards with the given ids (in the order of `ids`)."""
+        try:
+            return _trusted_collection([self._by_id[id] for id in ids])
+        except (KeyError, TypeError):
+            raise KeyError([id for id in ids if not self._has_id(id)])
+
+    def get_by_id(self, id):
+        """Get the card with the given id."""
+        if not self._has_id(id):
+            raise KeyError([id])
+        return self._by_id[id]
+
+    def _has_id(self, id):
+        try:
+            return id in self._by_id
+        except TypeError:  # unhashable ids (e.g. from malformed client responses) never match
+            return False
+
+    def get_except_ids(self, *ids):
+        """Get all cards except those with the given ids,"""
+        ids = set(ids)
+        return _trusted_collection([c for c in self if not c.id in ids])
 
 
 class LocationCardCollection(CardCollection):
     def __init__(self, iterable=None):
-        if iterable is not None:
+        if iterable is not None and self.checked:
             assert all(card.location is None for card in iterable)
         super().__init__(iterable)
         for card in self:
@@ -155,16 +333,19 @@ class LocationCardCollection(CardCollection):
         super().__delitem__(key)
 
         for card in value:
-            assert card.location == self, "Location is {}.".format(card.location)
+            if self.checked:
+                assert card.location == self, "Location is {}.".format(card.location)
             card.location = None
 
     def append(self, card):
-        assert card.location is None, "Location is {}.".format(card.location)
+        if self.checked:
+            assert card.location is None, "Location is {}.".format(card.location)
         super().append(card)
         card.location = self
 
     def clear(self):
-        assert all(card.location == self for card in self)
+        if self.checked:
+            assert all(card.location == self for card in self)
         for card in self:
             card.location = None
         super().clear()
@@ -175,27 +356,86 @@ class LocationCardCollection(CardCollection):
             card.location = self
 
     def insert(self, index, card):
-        assert card.location is None, "Location is {}.".format(card.location)
+        if self.checked:
+            assert card.location is None, "Location is {}.".format(card.location)
         super().insert(index, card)
         card.location = self
 
     def pop(self, index=-1):
         card = super().pop(index)
-        assert card.location is self
+        if self.checked:
+            assert card.location is self
         card.location = None
         return card
 
     def remove(self, card):
-        assert card.location == self
+        if self.checked:
+            assert card.location == self
         super().remove(card)
         card.location = None
 
 
+class CardCollectionSync:
+    """
+    Keep track of which cards of a collection a client has already been sent.
+
+    Instead of sending the whole collection on every change, `update()` only returns the ids
+    of the added and removed cards. The client renders the cards from a table of their HTML
+    which is sent once (e.g. on init). After `reset()` (e.g. when the client rebuilds its UI
+    on a reconnect) the next update contains the full collection again.
+    """
+
+    def __init__(self):
+        self._sent = None
+
+    def reset(self):
+        """The client forgot what it was sent. Send the full collection with the next update."""
+        self._sent = None
+
+    def update(self, cards):
+        """
+        Return the changes since the last update.
+
+        The client is expected to drop the removed cards and append the added ones. If this
+        would not reproduce the order of `cards`, the full collection is sent instead.
+
+        :param cards: The current content of the collection.
+        :return: Either ``{"reset": ids}`` or ``{"add": ids, "remove": ids}``.
+        :rtype: dict
+        """
+        ids = [c.id for c in cards]
+        sent, self._sent = self._sent, ids
+        if sent is not None:
+            current = set(ids)
+            kept = [id_ for id_ in sent if id_ in current]
+            known = set(kept)
+            added = [id_ for id_ in ids if id_ not in known]
+            if kept + added == ids:
+                return {"add": added, "remove": [id_ for id_ in sent if id_ not in current]}
+        return {"reset": ids}
+
+
 class PlayerRelatedCardCollection(CardCollection):
+    """
+    A card collection whose changes are shown in the UI of a player.
+
+    Every change triggers a UI update. To send only a single update for a number of changes,
+    wrap them in a `batch()`. If `coalesce_ui_updates` is True, then all updates triggered
+    outside of a batch are coalesced until the end of the current event loop iteration. (This is off
+    by default, as the update then arrives after any messages sent in the meantime, e.g. a query.)
+    """
+
+    coalesce_ui_updates = False
+
     def __init__(self, player, iterable=None):
         """
         :type player: games.base.game.Player
         """
+        self._batch_depth = 0
+        self._ui_update_pending = False
+        checked = getattr(player.game, "check_invariants", None)
+        if checked is not None:
+            self.checked = checked
         super().__init__(iterable)
         self.player = player
 
@@ -206,32 +446,65 @@ class PlayerRelatedCardCollection(CardCollection):
         """
         pass
 
+    def _request_ui_update(self):
+        if self._batch_depth:
+            self._ui_update_pending = True
+        elif self.coalesce_ui_updates:
+            if not self._ui_update_pending:
+                self._ui_update_pending = True
+                asyncio.get_event_loop().call_soon(self.flush_ui_update)
+        else:
+            self._trigger_ui_update()
+
+    def flush_ui_update(self):
+        """Send a pending UI update right away (unless we are inside a batch)."""
+        if self._ui_update_pending and not self._batch_depth:
+            self._ui_update_pending = False
+            self._trigger_ui_update()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Context manager to group changes into a single UI update.
+
+        The update is sent when the outermost batch is left (if anything changed).
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            self.flush_ui_update()
+
     def append(self, card):
         """Trigger a UI update on adding a card to the collection."""
         super().append(card)
-        self._trigger_ui_update()
+        self._request_ui_update()
 
     def clear(self):
         super().clear()
-        self._trigger_ui_update()
+        self._request_ui_update()
 
     def extend(self, iterable):
         super().extend(iterable)
-        self._trigger_ui_update()
+        self._request_ui_update()
 
     def insert(self, index, card):
         super().insert(index, card)
-        self._trigger_ui_update()
+        self._request_ui_update()
 
     def pop(self, index=-1):
         card = super().pop(index)
-        self._trigger_ui_update()
+        self._request_ui_update()
         return card
 
     def remove(self, card):
-        # todo: a remove_collection() call will trigger a separate ui update for each card.
         super().remove(card)
-        self._trigger_ui_update()
+        self._request_ui_update()
+
+    def remove_collection(self, iterable):
+        with self.batch():
+            super().remove_collection(iterable)
 
 
 class Hand(PlayerRelatedCardCollection, LocationCardCollection):
@@ -240,8 +513,7 @@ class Hand(PlayerRelatedCardCollection, LocationCardCollection):
     def _trigger_ui_update(self):
         self.player.trigger_private_ui_update()
 
-    @coroutine
-    def select(self, prompt, minimum=1, maximum=None):
+    async def select(self, prompt, minimum=1, maximum=None):
         """
         Select between `minimum` and `maximum` cards in the hand.
 
@@ -272,7 +544,7 @@ class Hand(PlayerRelatedCardCollection, LocationCardCollection):
             else:
                 prompt = prompt.format(mintomax="between {} and {}".format(minimum, maximum), s="s")
 
-            reply = yield self.player.client.query(
+            reply = await self.player.client.query(
                 "games.base.cards.select",
                 prompt=prompt, minimum=minimum, maximum=maximum
             )
@@ -287,8 +559,7 @@ class Hand(PlayerRelatedCardCollection, LocationCardCollection):
 
         return choices
 
-    @coroutine
-    def discard(self, minimum=1, maximum=None, reason=None):
+    async def discard(self, minimum=1, maximum=None, reason=None):
         """
         Discard between `minimum` and `maximum` cards.
 
@@ -298,7 +569,7 @@ class Hand(PlayerRelatedCardCollection, LocationCardCollection):
         @param maximum: Maximum amount of cards to discard. (This work as in `select`.)
         @return: List of discarded cards.
         """
-        choices = yield self.select('Choose {mintomax} card{s} to discard.', minimum, maximum)
+        choices = await self.select('Choose {mintomax} card{s} to discard.', minimum, maximum)
 
         self.log_discard(choices, reason=reason)
 
@@ -344,11 +615,24 @@ class Tableau(PlayerRelatedCardCollection, LocationCardCollection):
 
 
 class Deck(LocationCardCollection):
-    """A deck of cards (from which one can draw a card)."""
+    """
+    A deck of cards (from which one can draw a card).
+
+    The deck is a list whose end is the top of the deck. Drawing takes time linear in the number
+    of drawn cards (they are copied into the returned collection), but not in the size of the deck.
+    Putting cards at the bottom moves all other cards, i.e. takes time linear in the size of the deck.
+    """
     def __init__(self, game, iterable=None):
+        checked = getattr(game, "check_invariants", None)
+        if checked is not None:
+            self.checked = checked
         super().__init__(iterable)
         self.game = game
 
+    def shuffle(self, rng=None):
+        """Shuffle the deck (with the game's random number generator unless `rng` is given)."""
+        super().shuffle(rng or self.game.random)
+
     def _on_empty_deck(self, player):
         """Called if a player tries to draw from an empty deck.
 
@@ -358,9 +642,15 @@ class Deck(LocationCardCollection):
         pass
 
     def extend_bottom(self, iterable):
-        assert all(isinstance(card, Card) for card in iterable)
-        self[:] = iterable + self
-        assert len(self) == len(set(self))
+        """
+        Put cards at the bottom of the deck (the first one ends up at the very bottom).
+
+        This inserts in place, but still moves all cards already in the deck.
+        """
+        iterable = list(iterable)
+        self[:0] = iterable
+        if self.checked:
+            assert len(self) == len(set(self))
 
     def draw(self, amount=1, collection=False, log=False, player=None, reason=None):
         """Draw one or more cards from the supply.
@@ -382,10 +672,13 @@ class Deck(LocationCardCollection):
         if amount == 0:
             return CardCollection() if collection else None
 
-        cards = CardCollection(self[-amount:])
-        del self[-amount:]
-        for card in cards:
-            card.location = None
+        # The top of the deck is the end of the list, so drawing does not move any other cards
+        # (only the drawn ones are copied).
+        if amount == 1 and not collection and not log:
+            return self.pop()
+
+        cards = _trusted_collection(self[-amount:])
+        del self[-amount:]  # This also resets the cards' locations.
 
         if log:
             assert player, "If [log] == True, a [player] must be given."
@@ -417,5 +710,10 @@ class Deck(LocationCardCollection):
             )
 
 
+class IndexedLocationCardCollection(IndexedCardCollection, LocationCardCollection):
+    """An `IndexedCardCollection` which is the location of its cards."""
+    pass
+
+
 class Discard(LocationCardCollection):
     pass
\ No newline at end of file
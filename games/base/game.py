@@ -5,16 +5,22 @@ Base classes for games.
 import random
 import logging
 import functools
+import inspect
 
 import server
 import base.client
+import base.commands
 import base.locations
 import games.base.log
 from games.base.log import PlayerLogFacade, GameLogEntry
-from base.tools import english_join_list, singular_s, iscoroutine, decorator, coroutine
+from base.tools import english_join_list, singular_s
 
 logger = logging.getLogger(__name__)
 
+base.commands.register_commands(
+    "games.base", "init", "display_end_message", "show_waiting_message", "remove_waiting_message"
+)
+
 
 def activity(func):
     """
@@ -34,17 +40,18 @@ def activity_with_message(message):
 
 
 def _make_activity(func, message=None):
-    if not iscoroutine(func):
-        func = coroutine(func)
-
     @functools.wraps(func)
-    def wrapper(player, *args, **kwargs):
+    async def wrapper(player, *args, **kwargs):
         player.start_activity(message)
-        future = func(player, *args, **kwargs)
-        future.add_done_callback(player.end_activity)
-        return future
-
-    wrapper.decorators = func.decorators.copy()
+        try:
+            result = func(player, *args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        finally:
+            player.end_activity()
+
+    wrapper.decorators = getattr(func, "decorators", []).copy()
     wrapper.decorators.append("activity")
 
     return wrapper
@@ -101,7 +108,8 @@ class Player():
 
     def trigger_private_ui_update(self):
         """Something in private data shown in our UI changed (eg. the hand). Refresh the UI."""
-        self.client.send_message(self._get_private_ui_update_command())
+        if not self.game.headless:
+            self.client.send_message(self._get_private_ui_update_command())
 
     def trigger_public_ui_update(self):
         """Something in data shown in other peoples (and our) UI about us changed (eg. a tableau). Refresh everyone's UI.
@@ -109,9 +117,11 @@ class Player():
         This always also triggers a private UI update for this player.
         """
         self.trigger_private_ui_update()
+        if self.game.headless:
+            return
         cmd = self.get_public_ui_update_command()
         if cmd:
-            [p.client.send_message(cmd) for p in self.game.all_players if p != self]
+            base.locations.broadcast([p.client for p in self.game.all_players if p != self], cmd)
 
     def get_public_ui_update_command(self):
         raise NotImplementedError()
@@ -196,29 +206,47 @@ class PlayerResignedException(base.client.InteractionCancelledException):
 
 
 class Game(base.locations.Location):
-    def __init__(self, game_identifier, clients):
+    #: Check the invariants of the game's card collections (True or False), or use the global
+    #: setting if None (see `games.base.cards.set_invariant_checks()`).
+    check_invariants = None
+    #: Nobody watches the game (e.g. in simulations), so do not keep a log, update the UI
+    #: or show waiting messages.
+    headless = False
+
+    def __init__(self, game_identifier, clients, seed=None):
         """
         Initialize the game.
 
+        All randomness in the game should come from `self.random`, so that a game can
+        be reproduced from its seed.
+
         :param game_identifier: The module name of the game.
         :param clients: The players.
+        :param seed: Seed for the game's random number generator (a random seed is chosen if None).
         """
         super().__init__()
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.random = random.Random(seed)
         self.players = [self.create_player(c) for c in clients]
-        random.shuffle(self.players)
+        self.random.shuffle(self.players)
         self.all_players = self.players.copy()  # Resigned players will be removed from self.players,
                                                 # but stay in self.all_players
         self.game_identifier = game_identifier
         self.running = False
+        self.winners = []
         self._log = None
         self.waiting_messages_manager = WaitingMessagesManager(self)
+        if self.headless:
+            self.waiting_messages_manager.enabled = False
 
         # Move clients as late sa possible, so that variables are already set when
         # `send_init()` is called.
         for client in clients:
             client.move_to(self)
 
-        logger.info("Started a game of {}.".format(game_identifier))
+        logger.info("Started a game of {} (seed {}).".format(game_identifier, seed))
 
     def create_player(self, client):
         """
@@ -246,6 +274,8 @@ class Game(base.locations.Location):
     def log(self, value):
         assert self.log is None, "There is already a log object set"
         assert isinstance(value, games.base.log.Log)
+        if self.headless:
+            value.enabled = False
         self._log = value
         [p.set_log(value) for p in self.players]
 
@@ -270,14 +300,16 @@ class Game(base.locations.Location):
 
     def start(self, main_func):
         self.running = True
-        self.anchor_coroutine(main_func)
+        self.task = self.anchor_coroutine(main_func)
         [p.client.ui.set_variable("games.base", "running", True) for p in self.all_players]
 
     def trigger_game_ui_update(self):
         """The overall game UI should be updated."""
+        if self.headless:
+            return
         cmd = self.get_game_ui_update_command()
         if cmd:
-            [p.client.send_message(cmd) for p in self.all_players]
+            base.locations.broadcast([p.client for p in self.all_players], cmd)
 
     def get_game_ui_update_command(self):
         """Command to update the overall game UI."""
@@ -294,6 +326,7 @@ class Game(base.locations.Location):
     def do_game_end(self, *winners):
         """The game has ended. Declare the winners."""
         assert not self.running
+        self.winners = list(winners)
         if winners:
             self.log.add_paragraph()
             self.log.add_entry(GameLogEntry(
@@ -355,6 +388,9 @@ class Game(base.locations.Location):
 
 
 class WaitingMessagesManager:
+    #: Keep track of the activities? Headless games switch this off, as nobody sees the messages.
+    enabled = True
+
     def __init__(self, game):
         self.game = game
         self._messages = {player: [] for player in game.all_players}
@@ -400,6 +436,8 @@ class WaitingMessagesManager:
                         name. If ̀Nonè, then either the last message (if this is a sub-activity)
                         or the default message will be used.
         """
+        if not self.enabled:
+            return
         if message:
             message = message.format(player)
         if self._messages[player]:
@@ -429,6 +467,8 @@ class WaitingMessagesManager:
         self._send_messages_to_all()
 
     def end_activity(self, player):
+        if not self.enabled:
+            return
         if self.several_players_are_active:
             self._messages[player].pop()
             if not self._messages[player]:
@@ -1,10 +1,15 @@
-import hashlib
-import time
 import os
+import uuid
 
 from configuration import config
+import base.commands
+import base.locations
 import base.tools
 
+base.commands.register_commands(
+    "log", "new_message", "replace_message", "start_simultaneous", "end_simultaneous"
+)
+
 
 class LogEntry():
     """Base class for log entries."""
@@ -101,6 +106,9 @@ class HeaderLogEntry(SimpleLogEntry):
 class Log:
     """A very basic log class."""
 
+    #: Keep and send the entries? Headless games switch this off, as nobody reads their log.
+    enabled = True
+
     def __init__(self, players):
         super().__init__()
         self.next_id = 0
@@ -118,16 +126,37 @@ class Log:
 
         :type entry: games.base.log.LogEntry
         """
+        if not self.enabled:
+            return
         if entry.id == -1:
             entry.id = self.get_next_id()
         self.entries.append(entry)
-        for player in self.players:
-            self.send_entry(player, entry)
+        self.send_entry_to_all(entry)
 
     def add_paragraph(self):
         """Add a paragraph to the log."""
         self.add_entry(SimpleLogEntry(""))
 
+    def _get_entry_command(self, entry, message=None):
+        cmd = {
+            "command": "log.new_message",
+            "message_id": entry.id,
+            "message": message
+        }
+        if hasattr(entry, "player") and not entry.player is None:
+            cmd["player"] = entry.player.client.id
+        return cmd
+
+    def _broadcast_entry(self, cmd, entry):
+        """Send `cmd` with the message of `entry` rendered for every player."""
+        messages = {player.client: entry.get_message(player) for player in self.players}
+        if len(set(messages.values())) == 1:
+            cmd["message"] = next(iter(messages.values()))
+            overrides = None
+        else:
+            overrides = {client: {"message": message} for client, message in messages.items()}
+        base.locations.broadcast(list(messages), cmd, overrides)
+
     def send_entry(self, player, entry):
         """
         Send an entry to a clients.
@@ -137,25 +166,21 @@ class Log:
         :param entry: The entry being sent.
         :type entry: games.base.log.LogEntry
         """
-        cmd = {
-            "command": "log.new_message",
-            "message_id": entry.id,
-            "message": entry.get_message(player)
-        }
-        if hasattr(entry, "player") and not entry.player is None:
-            cmd["player"] = entry.player.client.id
-        player.client.send_message(cmd)
+        player.client.send_message(self._get_entry_command(entry, entry.get_message(player)))
+
+    def send_entry_to_all(self, entry):
+        """Send an entry to all players."""
+        self._broadcast_entry(self._get_entry_command(entry), entry)
 
     def resend_entry_to_all(self, entry):
         """Resend and entry to all players and replace any previous message sent for that entry."""
-        for player in self.players:
-            player.client.send_message({
-                "command": "log.replace_message",
-                "message_id": entry.id,
-                "message": entry.get_message(player),
-                "indentation": entry.indentation,
-                "reason": entry.reason
-            })
+        self._broadcast_entry({
+            "command": "log.replace_message",
+            "message_id": entry.id,
+            "message": None,
+            "indentation": entry.indentation,
+            "reason": entry.reason
+        }, entry)
 
     def resend(self, player):
         """Resend the whole log to a player. This is currently done in a very suboptimal way."""
@@ -170,7 +195,8 @@ class Log:
 
     def send_command_to_all(self, command):
         """Send a command to all players."""
-        [player.client.send_message(command) for player in self.players]
+        if self.enabled:
+            base.locations.broadcast([player.client for player in self.players], command)
 
     def render_to_file(self, player=None, game="", template="log.html"):
         """Render the log to a file.
@@ -180,7 +206,7 @@ class Log:
         :return: name of the file where the log was stored.
         :rtype : str
         """
-        filename = game + "_" + hashlib.sha1(str(time.clock()).encode()).hexdigest() + ".html"
+        filename = game + "_" + uuid.uuid4().hex + ".html"
         entries = "\n".join([entry.get_message(player) for entry in self.entries])
         t = base.tools.template_loader.load(template)
         with open(os.path.join(config["game_log_path"], filename), 'wb') as file:
@@ -257,7 +283,7 @@ class SimultaneousLog(TurnLog):
             if entry.id == -1:
                 entry.id = self.get_next_id()
             self.simultaneous_entries[entry.player].append(entry)
-            [self.send_entry(player, entry) for player in self.players]
+            self.send_entry_to_all(entry)
         else:
             super().add_entry(entry)
 
@@ -324,6 +350,8 @@ class PlayerLogFacade:
         :param kwargs: All other keyword arguments will simply be passed through to the `format` calls
                        on the messages.
         """
+        if not self.log.enabled:
+            return
         if message_other is None:
             message_other = message
         if message_other_tmp is None:
@@ -6,30 +6,31 @@ class Suit:
     def __init__(self, symbol, color):
         self.symbol = symbol
         self.color = color
+        self._html = """<span class="suit-{color}">{suit}</span>""".format(color=color, suit=symbol)
 
     def __repr__(self):
         return "<" + self.symbol + ">"
 
     def __str__(self):
-        return """<span class="suit-{color}">{suit}</span>""".format(
-            color=self.color,
-            suit=self.symbol)
+        return self._html
 
 SPADE = Suit("♠", "black")
 HEART = Suit("♥", "red")
 DIAMOND = Suit("♦", "red")
 CLUB = Suit("♣", "black")
-SUITS = {SPADE, HEART, DIAMOND, CLUB}
+SUITS = (SPADE, HEART, DIAMOND, CLUB)  # A tuple, so that the order of the cards (and thus shuffling) is reproducible.
+_SUITS_BY_SYMBOL = {suit.symbol: suit for suit in SUITS}
 
 
 def get_suit(symbol):
-    return [s for s in SUITS if s.symbol == symbol][0]
+    return _SUITS_BY_SYMBOL[symbol]
 
 
 RANKS = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
+RANK_NAMES = {"A": "Ace", "K": "King", "Q": "Queen", "J": "Jack"}
 
 UNICODE = {}
-for _i, _suit in enumerate([SPADE, HEART, DIAMOND, CLUB]):
+for _i, _suit in enumerate(SUITS):
     UNICODE[_suit] = {}
     for _j, _rank in enumerate(RANKS):
         if _rank == "Q" or _rank == "K":
@@ -37,46 +38,106 @@ for _i, _suit in enumerate([SPADE, HEART, DIAMOND, CLUB]):
         UNICODE[_suit][_rank] = chr(0x1F0A1 + 16*_i + _j)
 
 
+class CardFace:
+    """
+    The immutable face (rank and suit) of a playing card.
+
+    There is exactly one face for each rank and suit (see `get_face()`), which is shared by all
+    cards showing it. Its id, HTML and hash are computed once.
+    """
+    __slots__ = ("rank", "suit", "id", "html", "_hash")
+
+    def __init__(self, rank, suit):
+        for attr, value in (("rank", rank), ("suit", suit), ("id", suit.symbol + rank)):
+            object.__setattr__(self, attr, value)
+        object.__setattr__(self, "html", """<span class="card suit-{color}" id="{id}">{symbol}</span>""".format(
+            color=suit.color,
+            symbol=UNICODE[suit][rank],
+            id=self.id,
+        ))
+        object.__setattr__(self, "_hash", hash(self.id))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Card faces are immutable.")
+
+    def __repr__(self):
+        return "<{} of {}>".format(self.rank, self.suit)
+
+    def __str__(self):
+        return self.html
+
+    def __hash__(self):
+        return self._hash
+
+
+_FACES = {}
+for _suit in SUITS:
+    for _rank in RANKS:
+        _face = CardFace(_rank, _suit)
+        _FACES[_face.id] = _face
+
+
+def get_face(rank, suit):
+    """
+    Return the face of the given rank and suit.
+
+    :param rank: One of `RANKS` (numerical ranks may also be given as int, 1 is an ace).
+    :type suit: Suit
+    :rtype: CardFace
+    """
+    rank = str(rank).upper()
+    if rank == "1":
+        rank = "A"
+    assert rank in RANKS
+    assert isinstance(suit, Suit)
+    return _FACES[suit.symbol + rank]
+
+
+def get_face_by_id(id):
+    """
+    Return the face with the given id (which is also the id of the cards showing it).
+
+    :rtype: CardFace
+    """
+    return _FACES[id]
+
+
 class Card(games.base.cards.Card):
+    """
+    A playing card in a game.
+
+    The card itself only holds the per game state (location, value). Everything about its
+    face is delegated to the shared `CardFace`.
+    """
     def __init__(self, rank, suit, value=0):
         super().__init__()
-        self.rank = str(rank).upper()
-        if self.rank == "1":
-            self.rank = "A"
-        assert self.rank in RANKS
-        self.suit = suit
-        assert isinstance(self.suit, Suit)
+        self.face = get_face(rank, suit)
         self.value = value
-        self.id = self.suit.symbol + self.rank
+        self.id = self.face.id
+
+    @property
+    def rank(self):
+        return self.face.rank
+
+    @property
+    def suit(self):
+        return self.face.suit
 
     def rank_name(self):
-        if self.rank == "A":
-            return "Ace"
-        elif self.rank == "K":
-            return "King"
-        elif self.rank == "Q":
-            return "Queen"
-        elif self.rank == "J":
-            return "Jack"
-        else:
-            return self.rank
+        return RANK_NAMES.get(self.face.rank, self.face.rank)
 
     def __repr__(self):
-        return "<{} of {}>".format(self.rank, self.suit)
+        return repr(self.face)
 
     def __str__(self):
-        return """<span class="card suit-{color}" id="{id}">{symbol}</span>""".format(
-            color=self.suit.color,
-            symbol=UNICODE[self.suit][self.rank],
-            id=self.id,
-        )
+        return self.face.html
 
     def __eq__(self, other):
         assert type(other) is Card, "other is not a card."
-        return self.suit == other.suit and self.rank == other.rank
+        return self.face is other.face
 
     def __hash__(self):
-        return hash(self.id)
+        return self.face._hash
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -0,0 +1,131 @@
+"""
+Play complete games in-process without any network (for benchmarks and regression tests).
+
+All players are `SimulatedClient`s, which answer every query immediately by asking a policy.
+Since `SimulatedClient.query()` never has to wait, a whole game runs in the first step of the
+game's task, i.e. in a single iteration of the event loop.
+"""
+
+import asyncio
+import time
+
+from base.client import Client
+
+
+class SimulationError(Exception):
+    """A simulated game did not finish."""
+    def __init__(self, game):
+        self.game = game
+
+    def __str__(self):
+        return "The simulated game of {} did not finish.".format(self.game.game_identifier)
+
+
+class SimulatedClient(Client):
+    """
+    A client whose queries are answered by a policy.
+
+    A policy is a callable `policy(client, command, parameters)` returning the response
+    to the query, just like the JS side would.
+    """
+    def __init__(self, policy, id_=0, name=None):
+        super().__init__(id_, name or "Simulated Client {}".format(id_))
+        self.policy = policy
+
+    # Nobody is looking at the UI, so we do not keep any messages around.
+    def send_message(self, msg):
+        pass
+
+    def send_chat_message(self, item):
+        pass
+
+    def send_permanent_message(self, group, message):
+        pass
+
+    async def query(self, command, **kwargs):
+        return self.policy(self, command, kwargs)
+
+    @property
+    def player(self):
+        """
+        The player object representing this client in its current game.
+
+        :rtype: games.base.game.Player
+        """
+        return self.location.get_player_by_client(self)
+
+
+class ScriptedPolicy:
+    """A policy that gives a fixed sequence of responses (e.g. to replay a recorded game)."""
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self._next = 0
+
+    def __call__(self, client, command, parameters):
+        response = self.responses[self._next]
+        self._next += 1
+        return response
+
+
+class Simulation:
+    """Play a number of games and collect per game results."""
+
+    def __init__(self, game_factory, policies):
+        """
+        :param game_factory: A callable `game_factory(clients)` that creates and starts a game.
+        :param policies: A list with a policy for each seat (or a callable `policies(number)` returning
+                         such a list for the `number`-th game).
+        """
+        self.game_factory = game_factory
+        self.policies = policies
+        self.games_played = 0
+        self.duration = 0
+
+    def _get_policies(self, number):
+        if callable(self.policies):
+            return self.policies(number)
+        return self.policies
+
+    def play(self, number=0, **kwargs):
+        """
+        Play a single game.
+
+        This runs the event loop, so it cannot be called from a coroutine.
+
+        :param number: The number of the game (passed to `policies` if it is callable).
+        :param kwargs: Passed on to `game_factory` (e.g. the seed).
+        :return: The finished game.
+        :rtype: games.base.game.Game
+        """
+        clients = [SimulatedClient(policy, id_) for id_, policy in enumerate(self._get_policies(number))]
+        game = self.game_factory(clients, **kwargs)
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(asyncio.sleep(0))
+        if game.running:
+            game.task.cancel()
+            loop.run_until_complete(asyncio.wait([game.task]))
+            raise SimulationError(game)
+        self.games_played += 1
+        return game
+
+    def run(self, games, on_result=None):
+        """
+        Play `games` games.
+
+        :param games: The number of games to play.
+        :param on_result: Called with each finished game. Its return value is collected.
+        :return: A list with the return values of `on_result` (or the games themselves if it is None).
+        """
+        results = []
+        start = time.perf_counter()
+        for i in range(games):
+            game = self.play(i)
+            results.append(on_result(game) if on_result else game)
+        self.duration += time.perf_counter() - start
+        return results
+
+    @property
+    def games_per_second(self):
+        if not self.duration:
+            return 0
+        return self.games_played / self.duration
@@ -1,17 +1,19 @@
 """Lobbies and proposing/creating games."""
 
+import asyncio
 from collections import defaultdict
 # import copy
 # import random
 # import logging
 
-from tornado.gen import coroutine
-import toro
-
 from base.tools import plural_s, english_join_list
-# import base.client
+import base.client
+import base.commands
 import base.locations
-# from configuration import config
+from base.presence import Presence
+from configuration import config
+
+base.commands.register_commands("games.lobby", "init", "clients", "presence")
 #
 # logger = logging.getLogger(__name__)
 
@@ -79,16 +81,14 @@ class GameProposal():
         """
         pass
 
-    @coroutine
-    def _do_proposal(self):
+    async def _do_proposal(self):
         """
         Propose a game to everyone.
         """
-        yield [self._do_proposal_for(client) for client in self.clients]
+        await asyncio.gather(*[self._do_proposal_for(client) for client in self.clients])
         self.lobby.proposals.remove(self)
 
-    @coroutine
-    def _do_proposal_for(self, client):
+    async def _do_proposal_for(self, client):
         """
         Propose the game to a specific client.
 
@@ -96,17 +96,17 @@ class GameProposal():
 
         :type client: base.client.Client
         """
-        with (yield self.lobby.proposal_locks[client].acquire()):
+        async with self.lobby.proposal_locks[client]:
             if self.is_declined:
                 return
             self.invited.add(client)
             try:
-                result = yield client.ui.ask_yes_no(
+                result = await client.ui.ask_yes_no(
                     self._get_invitation_prompt(client),
                     leave_question=True
                 )
                 if result:
-                    yield self.accept(client)
+                    await self.accept(client)
                 else:
                     self.decline(client)
             except ClientDeclinedFlag:
@@ -115,7 +115,7 @@ class GameProposal():
 #
     def _get_invitation_prompt(self, client):
         if len(self.clients) == 1:
-            return self._get_solitaire_prompt(client),
+            return self._get_solitaire_prompt(client)
         else:
             return self._get_multiplayer_prompt(client)
 
@@ -128,8 +128,7 @@ class GameProposal():
             players=english_join_list([str(c) for c in self.clients if c != client])
         )
 
-    @coroutine
-    def accept(self, client):
+    async def accept(self, client):
         """
         A client accepts the proposal.
 
@@ -151,7 +150,7 @@ class GameProposal():
                 if c != client:
                     c.ui.say("{} accepts.".format(client))
             try:
-                yield client.ui.link("Cancel", pre_text="You accept.")
+                await client.ui.link("Cancel", pre_text="You accept.")
                 self.decline(client)
             except GameStartingFlag:
                 pass
@@ -396,29 +395,32 @@ class Lobby(base.locations.Lobby):
         self.proposal_class = proposal_class
         # self.automatcher = automatcher(self)
         self.proposals = set()
-        self.proposal_locks = defaultdict(toro.Lock)
+        self.proposal_locks = defaultdict(asyncio.Lock)
         self.games = set()
+        self.presence = Presence(self, "games.lobby.presence")
 
     def join(self, client):
-        """Announce to everyone that the client joined and send it the init command.
+        """Add the client to the membership list and send it the init command.
+
+        Everyone else learns about the new client with the next presence diff.
 
         :param client: The joining client.
         """
-        d = {"command": "games.lobby.client_joins", "client_id": client.id, "client_name": str(client)}
-        for c in self.clients:
-            c.send_message(d)
+        self.presence.add(client)
         super().join(client)
         # self.automatcher.client_joins_lobby(client)
 
     def send_init(self, client):
-        """Send the setup command to a client."""
+        """Send the setup command (including the first page of the membership list) to a client."""
         super().send_init(client)
-        client.send_message({
+        cmd = {
             "command": "games.lobby.init",
-            "clients": {c.id: str(c) for c in self.clients},
             "min_players": self.min_players,
             "max_players": self.max_players,
-        })
+            "page_size": config["lobby_page_size"],
+        }
+        cmd.update(self.presence.get_snapshot(limit=config["lobby_page_size"]))
+        client.send_message(cmd)
 
     def leave(self, client, reason=None):
         for proposal in self.proposals:
@@ -430,10 +432,7 @@ class Lobby(base.locations.Lobby):
         # self.automatcher.client_leaves_lobby(client)
 
         super().leave(client, reason)
-
-        d = {"command": "games.lobby.client_leaves", "client_id": client.id}
-        for c in self.clients:
-            c.send_message(d)
+        self.presence.remove(client)
 
     def handle_reconnect(self, client):
         super().handle_reconnect(client)
@@ -445,15 +444,27 @@ class Lobby(base.locations.Lobby):
         """
         Possible commands:
           * games.lobby.propose_game: Propose to start a game with some other players.
+          * games.lobby.get_clients: Get a page of the membership list (parameter "offset").
         """
         if command == "games.lobby.propose_game":
             self.propose_game(client, data["players"], data["options"])
             return True
+        if command == "games.lobby.get_clients":
+            self.send_clients(client, data.get("offset", 0))
+            return True
 
         handled = super().handle_request(client, command, data)
     #     handled = self.automatcher.handle_request(client, command, data) or handled
         return handled
 
+    def send_clients(self, client, offset):
+        """Send a page of the membership list to a client."""
+        if not isinstance(offset, int) or offset < 0:
+            raise base.client.ClientCommunicationError(client, offset, "Invalid offset.")
+        cmd = {"command": "games.lobby.clients"}
+        cmd.update(self.presence.get_snapshot(offset, config["lobby_page_size"]))
+        client.send_message(cmd)
+
     def propose_game(self, client, player_ids, options):
         """Propose a new game."""
         try:
@@ -0,0 +1,177 @@
+"""
+Play large numbers of simulated Schnapsen games in parallel (for balance analysis and benchmarks).
+
+The games are split into chunks, which are played by a pool of worker processes. Every game
+has its own deterministic seed (derived from the batch seed and the number of the game), so
+any single game of a batch can be replayed with `play_game()`.
+
+Run `python -m games.schnapsen.batch --games 1000000` to play a batch on all cores.
+"""
+
+import argparse
+import collections
+import multiprocessing
+import random
+import time
+
+from games.base.simulation import Simulation
+from games.schnapsen.simulation import SimulatedGame, RandomPolicy, get_result
+
+
+Record = collections.namedtuple("Record", ["number", "winner", "points_0", "points_1", "tricks", "duration"])
+Record.__doc__ = """The result of a single game (`winner` is the seat of the winner, `duration` in seconds)."""
+
+
+def get_game_seed(batch_seed, number):
+    """The seed of game number `number` in the batch with seed `batch_seed`."""
+    return batch_seed * 2**32 + number
+
+
+def _get_policies(batch_seed, number, option_probability):
+    rng = random.Random(get_game_seed(batch_seed, number))
+    return [RandomPolicy(rng, option_probability), RandomPolicy(rng, option_probability)]
+
+
+def _play(simulation, batch_seed, number):
+    start = time.perf_counter()
+    game = simulation.play(number, seed=get_game_seed(batch_seed, number))
+    duration = time.perf_counter() - start
+    winner, points, tricks = get_result(game)
+    return Record(number, winner, points[0], points[1], tricks, duration)
+
+
+def _get_simulation(batch_seed, option_probability):
+    return Simulation(SimulatedGame, lambda number: _get_policies(batch_seed, number, option_probability))
+
+
+def play_game(batch_seed, number, option_probability=0.1):
+    """
+    (Re)play a single game of a batch.
+
+    :return: The finished game.
+    :rtype: SimulatedGame
+    """
+    return _get_simulation(batch_seed, option_probability).play(number, seed=get_game_seed(batch_seed, number))
+
+
+def play_chunk(chunk):
+    """
+    Play the games `start, ..., start + count - 1` of a batch.
+
+    This is run in the worker processes.
+
+    :param chunk: A tuple (batch_seed, start, count, option_probability).
+    :return: A list of `Record`s.
+    """
+    batch_seed, start, count, option_probability = chunk
+    simulation = _get_simulation(batch_seed, option_probability)
+    return [_play(simulation, batch_seed, number) for number in range(start, start + count)]
+
+
+class Aggregate:
+    """Aggregate statistics over a stream of records."""
+
+    def __init__(self):
+        self.games = 0
+        self.wins = [0, 0]
+        self.points = [0, 0]
+        self.tricks = collections.Counter()
+        self.cpu_time = 0
+
+    def add(self, record):
+        """:type record: Record"""
+        self.games += 1
+        if record.winner is not None:
+            self.wins[record.winner] += 1
+        self.points[0] += record.points_0
+        self.points[1] += record.points_1
+        self.tricks[record.tricks] += 1
+        self.cpu_time += record.duration
+
+    def __str__(self):
+        if not self.games:
+            return "No games played."
+        return "\n".join([
+            "Games:            {}".format(self.games),
+            "Wins by seat:     {} / {} ({:.2%} / {:.2%})".format(
+                self.wins[0], self.wins[1], self.wins[0] / self.games, self.wins[1] / self.games),
+            "Average points:   {:.2f} / {:.2f}".format(self.points[0] / self.games, self.points[1] / self.games),
+            "Tricks:           " + ", ".join(
+                "{}: {:.2%}".format(t, n / self.games) for t, n in sorted(self.tricks.items())),
+            "Time per game:    {:.3f} ms".format(1000 * self.cpu_time / self.games),
+        ])
+
+
+def get_chunks(games, batch_seed=0, chunk_size=500, option_probability=0.1):
+    """Split a batch of `games` games into chunks for `play_chunk()`."""
+    return [
+        (batch_seed, start, min(chunk_size, games - start), option_probability)
+        for start in range(0, games, chunk_size)
+    ]
+
+
+def run_batch(games, batch_seed=0, processes=None, chunk_size=500, option_probability=0.1, on_record=None):
+    """
+    Play a batch of games on a process pool.
+
+    :param games: Number of games to play.
+    :param batch_seed: The seed of the batch.
+    :param processes: Number of worker processes (defaults to the number of cores).
+                      If it is 1, then the games are played in this process.
+    :param chunk_size: Number of games each worker plays before sending back its results.
+    :param option_probability: See `RandomPolicy`.
+    :param on_record: If given, this is called with each `Record` as the results come in.
+    :rtype: Aggregate
+    """
+    aggregate = Aggregate()
+    chunks = get_chunks(games, batch_seed, chunk_size, option_probability)
+
+    def collect(records):
+        for record in records:
+            aggregate.add(record)
+            if on_record:
+                on_record(record)
+
+    if processes == 1:
+        for chunk in chunks:
+            collect(play_chunk(chunk))
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            for records in pool.imap_unordered(play_chunk, chunks):
+                collect(records)
+
+    return aggregate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a batch of simulated Schnapsen games on all cores.")
+    parser.add_argument("--games", type=int, default=100000, help="Number of games to play.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the batch.")
+    parser.add_argument("--processes", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Games per work unit.")
+    parser.add_argument("--options", type=float, default=0.1,
+                        help="Probability to exchange, close or play a marriage when possible.")
+    parser.add_argument("--output", default=None, help="Write all records to this CSV file.")
+    args = parser.parse_args()
+
+    output = open(args.output, "w") if args.output else None
+    if output:
+        output.write(",".join(Record._fields) + "\n")
+
+    def write(record):
+        output.write(",".join(str(v) for v in record) + "\n")
+
+    start = time.perf_counter()
+    aggregate = run_batch(args.games, args.seed, args.processes, args.chunk_size, args.options,
+                          write if output else None)
+    wall_time = time.perf_counter() - start
+
+    if output:
+        output.close()
+    print(aggregate)
+    print("Wall time:        {:.2f} s ({:.0f} games/s with {} processes)".format(
+        wall_time, aggregate.games / wall_time, args.processes or multiprocessing.cpu_count()))
+
+
+if __name__ == "__main__":
+    main()
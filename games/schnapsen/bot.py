@@ -0,0 +1,300 @@
+"""
+A computer opponent for Schnapsen.
+
+The bot uses perfect information Monte Carlo search: it repeatedly samples the cards it cannot
+see (the opponent's hand and the order of the stock), solves each sample with alpha-beta search
+and plays the card that won the most samples. While the stock is open the search only looks a
+few tricks ahead and scores the positions it reaches by the difference in points; once the stock
+is closed or empty it searches to the end of the game.
+
+All cards are represented by their position in the game's `card_index`, so that a set of cards is
+an int. The search generates its moves with the deal's `MoveGenerator` and runs on plain integers
+and tuples, which can be sent to a worker process.
+The bot always exchanges the trump jack when it can, announces every marriage it leads and never
+closes the stock itself.
+"""
+
+import asyncio
+import random
+import time
+
+from games.base.card_sets import iter_bits
+from games.schnapsen.game import Player
+
+
+WIN = 1000
+INFINITY = 10 * WIN
+
+_EXACT, _LOWER, _UPPER = 0, 1, 2
+
+
+class Solver:
+    """
+    Alpha-beta search for a single sample (with all cards known).
+
+    Player 0 is the bot. Values are from its point of view: +-`WIN` for won or lost games and
+    the difference in points for positions at the depth limit. Positions are cached in a
+    transposition table.
+    """
+
+    def __init__(self, moves, stock, closer, depth):
+        """
+        :type moves: games.schnapsen.moves.MoveGenerator
+        :param stock: The cards of the stock in the order they are drawn.
+        :param closer: The player who closed the stock (or None).
+        :param depth: The maximal number of cards played in the search.
+        """
+        self.moves = moves
+        self.stock = stock
+        self.closer = closer
+        self.depth = depth
+        self.table = {}
+        self.nodes = 0
+
+    def legal_moves(self, hand, lead, drawn):
+        """The cards the player with `hand` may play (as a set)."""
+        if lead < 0:
+            return hand
+        return self.moves.follow(hand, lead, strict=self.closer is not None or drawn >= len(self.stock))
+
+    def evaluate(self, state, card):
+        """Return the value of playing `card` in `state` (a tuple h0, h1, drawn, p0, p1, leader, lead)."""
+        return self._play(*state, card=card, depth=self.depth, alpha=-INFINITY, beta=INFINITY)
+
+    def _search(self, h0, h1, drawn, p0, p1, leader, lead, depth, alpha, beta):
+        if depth == 0:
+            return p0 - p1
+        self.nodes += 1
+
+        key = (h0, h1, drawn, p0, p1, leader, lead)
+        entry = self.table.get(key)
+        if entry is not None and entry[0] >= depth:
+            value, flag = entry[1], entry[2]
+            if flag == _EXACT or (flag == _LOWER and value >= beta) or (flag == _UPPER and value <= alpha):
+                return value
+
+        player = leader if lead < 0 else 1 - leader
+        moves = self.legal_moves(h1 if player else h0, lead, drawn)
+        original_alpha, original_beta = alpha, beta
+        if player == 0:
+            best = -INFINITY
+            for card in iter_bits(moves):
+                value = self._play(h0, h1, drawn, p0, p1, leader, lead, card, depth, alpha, beta)
+                if value > best:
+                    best = value
+                    if best > alpha:
+                        alpha = best
+                        if alpha >= beta:
+                            break
+        else:
+            best = INFINITY
+            for card in iter_bits(moves):
+                value = self._play(h0, h1, drawn, p0, p1, leader, lead, card, depth, alpha, beta)
+                if value < best:
+                    best = value
+                    if best < beta:
+                        beta = best
+                        if alpha >= beta:
+                            break
+
+        if best <= original_alpha:
+            flag = _UPPER
+        elif best >= original_beta:
+            flag = _LOWER
+        else:
+            flag = _EXACT
+        self.table[key] = (depth, best, flag)
+        return best
+
+    def _play(self, h0, h1, drawn, p0, p1, leader, lead, card, depth, alpha, beta):
+        moves = self.moves
+        bit = 1 << card
+        player = leader if lead < 0 else 1 - leader
+        if player:
+            h1 ^= bit
+        else:
+            h0 ^= bit
+
+        if lead < 0:
+            # Leading a queen or king with its partner still in hand announces the marriage.
+            if moves.partner[card] & (h1 if player else h0):
+                if player:
+                    p1 += moves.marriage_points[card]
+                    if p1 > 65:
+                        return -WIN
+                else:
+                    p0 += moves.marriage_points[card]
+                    if p0 > 65:
+                        return WIN
+            return self._search(h0, h1, drawn, p0, p1, leader, card, depth - 1, alpha, beta)
+
+        winner = 1 - leader if moves.beaten_by[lead] & bit else leader
+        points = moves.values[lead] + moves.values[card]
+        if winner:
+            p1 += points
+        else:
+            p0 += points
+        if not h0 or (p1 if winner else p0) > 65:
+            return self._result(winner, p0, p1)
+
+        if self.closer is None and drawn < len(self.stock):
+            first, second = 1 << self.stock[drawn], 1 << self.stock[drawn + 1]
+            if winner:
+                h1 |= first
+                h0 |= second
+            else:
+                h0 |= first
+                h1 |= second
+            drawn += 2
+        return self._search(h0, h1, drawn, p0, p1, winner, -1, depth - 1, alpha, beta)
+
+    def _result(self, last_trick, p0, p1):
+        """The value of the end of the game (see `Game.determine_winner()`)."""
+        if self.closer is None:
+            winner = last_trick
+        elif (p1 if self.closer else p0) >= 66:
+            winner = self.closer
+        else:
+            winner = 1 - self.closer
+        return -WIN if winner else WIN
+
+
+def sample(position, rng):
+    """
+    Sample the unknown cards of a position.
+
+    :return: A tuple (opponent's hand, stock in drawing order).
+    """
+    unknown = list(iter_bits(position["unknown"]))
+    rng.shuffle(unknown)
+    count = position["opponent_cards"]
+    opponent = 0
+    for card in unknown[:count]:
+        opponent |= 1 << card
+    stock = unknown[count:]
+    # The bottom card was shown face up, so it is known to be drawn last.
+    if position["bottom"] is not None:
+        stock.append(position["bottom"])
+    assert len(stock) == position["stock_size"], "Inconsistent position."
+    return opponent, tuple(stock)
+
+
+def choose_card(moves, position, time_budget, seed=None, open_depth=4, max_samples=500):
+    """
+    Choose the card to play.
+
+    This is run in a worker process, so all arguments have to be picklable.
+
+    :type moves: games.schnapsen.moves.MoveGenerator
+    :param position: A dict describing what the bot knows (see `BotPlayer.get_position()`).
+    :param time_budget: Stop sampling after this many seconds (at least one sample is searched).
+    :param seed: Seed for sampling.
+    :param open_depth: Number of cards to look ahead while the stock is open.
+    :param max_samples: Stop after this many samples.
+    :return: The position (in the card index) of the card to play.
+    """
+    deadline = time.perf_counter() + time_budget
+    rng = random.Random(seed)
+    hand, lead = position["hand"], position["lead"]
+    leader = 1 if lead >= 0 else 0
+    stock_open = position["closer"] is None and position["stock_size"] > 0
+
+    candidates = list(iter_bits(position["moves"]))
+    if len(candidates) == 1:
+        return candidates[0]
+
+    scores = dict.fromkeys(candidates, 0)
+    samples = 0
+    while samples < max_samples and (samples == 0 or time.perf_counter() < deadline):
+        opponent, stock = sample(position, rng)
+        solver = Solver(moves, stock, position["closer"], open_depth if stock_open else 2 * moves.size)
+        state = (hand, opponent, 0, position["points"], position["opponent_points"], leader, lead)
+        for card in candidates:
+            scores[card] += solver.evaluate(state, card)
+        samples += 1
+
+    # Prefer cheaper cards on ties.
+    return max(candidates, key=lambda card: (scores[card], -moves.values[card]))
+
+
+class BotPlayer(Player):
+    """A Schnapsen player whose moves are chosen by `choose_card()`."""
+
+    def __init__(self, client, game):
+        """
+        :type client: base.client.BotClient
+        """
+        super().__init__(client, game)
+        self._lead_card = None
+        self._planned_card = None
+        self._random = random.Random(game.random.getrandbits(64))
+
+    @property
+    def opponent(self):
+        """:rtype: Player"""
+        return [p for p in self.game.all_players if p is not self][0]
+
+    def get_position(self, cards):
+        """
+        Describe what this player knows about the game (in terms of `self.game.card_index`).
+
+        :param cards: The ids of the cards which may be played.
+        """
+        index = self.game.card_index
+        deck = self.game.deck
+        opponent = self.opponent
+
+        hand = self.hand_mask()
+        known = hand | index.mask(self.taken_cards) | index.mask(opponent.taken_cards)
+        lead = -1
+        if self._lead_card is not None:
+            lead = index.position(self._lead_card)
+            known |= index.bit(self._lead_card)
+        bottom = None
+        if deck:
+            bottom = index.position(deck[0])
+            known |= index.bit(deck[0])
+
+        return {
+            "hand": hand,
+            "moves": index.mask_of_ids(cards),
+            "lead": lead,
+            "unknown": index.all & ~known,
+            "opponent_cards": len(opponent.hand),
+            "stock_size": len(deck),
+            "bottom": bottom,
+            "closer": None if deck.closing_player is None else (0 if deck.closing_player is self else 1),
+            "points": self.points,
+            "opponent_points": opponent.points,
+        }
+
+    def reset(self):
+        super().reset()
+        self._lead_card = None
+        self._planned_card = None
+
+    async def _play_card(self, lead_card=None):
+        self._lead_card = lead_card
+        return await super()._play_card(lead_card)
+
+    async def _query_play(self, options, cards):
+        if self._planned_card in cards:
+            card, self._planned_card = self._planned_card, None
+            return {"type": "card", "card": card}
+        if [o for o in options if o["type"] == "exchange"]:
+            return {"type": "exchange"}
+
+        position = await self.client.think(
+            choose_card, self.game.moves, self.get_position(cards), self.client.time_budget, self._random.getrandbits(64)
+        )
+        card = self.game.cards[position]
+
+        marriages = [o for o in options if o["type"] == "marriage" and o["suit"] == card.suit.symbol]
+        if marriages and card.rank in ("Q", "K"):
+            self._planned_card = card.id
+            return {"type": "marriage", "suit": card.suit.symbol}
+        return {"type": "card", "card": card.id}
+
+    def display_end_message(self, log_file=None):
+        # Leave the game, so that it can be cleaned up once everyone left.
+        asyncio.get_event_loop().call_soon(self.client.move_to, None)
@@ -1,13 +1,22 @@
 games.schnapsen = function() {
+    // The HTML of all cards by id (sent on init). All other commands only refer to card ids.
+    var cards = {};
+
+    var add_to_hand = function (hand, id) {
+        hand.append($(cards[id]));
+        hand.append("&nbsp;");
+    };
 
 	return {
 		
-		init : function() {
+		init : function(params) {
+            cards = params["cards"];
 			$("#main").empty();
             $("#main").removeClass().addClass("schnapsen");
             $("#main").append($("<div />", {id: "buttons"}));
             $("#buttons").append(games.base.get_info_box_button());
             $("#main").append($("<div />", {id : "play_area"}));
+            $("#play_area").append($("<div />", {id: "score"}));
             $("#play_area").append($("<div />", {id: "deck"}));
             $("#play_area").append($("<div />", {id: "current_trick"}));
 			$("#main").append($("<pre />", {id : "log"}));
@@ -22,7 +31,7 @@ games.schnapsen = function() {
             if (params["deck_size"]) {
                 deck += '<span class="open-card">';
 				if (params["open_card"]) {
-					deck += params["open_card"];
+					deck += cards[params["open_card"]];
 				} else {
 					deck += '<span class="card">🂠</span>';
 				}
@@ -30,15 +39,34 @@ games.schnapsen = function() {
                 deck += '<span class="deck-card card">🂠</span>';
 			}
 			$("#deck").html(deck);
+            if (params["score"]) {
+                $("#score").text(params["score"]);
+            }
         },
 
         update_player_ui : function(params) {
 			var h = $("#hand");
-			h.empty();
-			for (var i=0; i<params["hand"].length; i++) {
-				h.append($(params["hand"][i]));
-				h.append("&nbsp;");
-			}
+            var i;
+            var update = params["hand"];
+            if (update["reset"]) {
+                h.empty();
+                for (i=0; i < update["reset"].length; i++) {
+                    add_to_hand(h, update["reset"][i]);
+                }
+                return;
+            }
+            h.children(".card").filter(function () {
+                return update["remove"].indexOf(this.id) !== -1;
+            }).each(function () {
+                // Also remove the space after the card.
+                if (this.nextSibling && this.nextSibling.nodeType === 3) {
+                    $(this.nextSibling).remove();
+                }
+                $(this).remove();
+            });
+            for (i=0; i < update["add"].length; i++) {
+                add_to_hand(h, update["add"][i]);
+            }
 		},
 
         populate_info_box : function(container, data) {
@@ -48,7 +76,7 @@ games.schnapsen = function() {
             container.append("<strong>Points:</strong> " + data["points"] + "<br/>");
             container.append("<strong>Taken cards: </strong> ");
             for (var i=0; i < data["taken_cards"].length; i++) {
-                container.append(data["taken_cards"][i]);
+                container.append(cards[data["taken_cards"][i]]);
             }
         },
 
@@ -58,7 +86,7 @@ games.schnapsen = function() {
                 $("#current_trick").empty();
                 $("#current_trick").show();
             }
-            $("#current_trick").append(params["card"]);
+            $("#current_trick").append(cards[params["card"]]);
             if (!params["is_lead"]) {
                 $("#current_trick").fadeOut(5000);
             }
@@ -112,9 +140,17 @@ games.schnapsen = function() {
 		},
     };
 }();
+commands.register("games.schnapsen", games.schnapsen);
 
 games.schnapsen.lobby = function() {
     return {
+        init : function() {
+            var options = $("#lobby_propose_options");
+            options.empty();
+            options.append($("<input />", {type: "checkbox", id: "schnapsen_bummerl", name: "bummerl"}));
+            options.append($("<label />", {"for": "schnapsen_bummerl", text: "Play a Bummerl (first to 7 game points)"}));
+        },
+
         about_text :
             '<p><a href="http://en.wikipedia.org/wiki/Schnapsen">Schnapsen</a> is traditional Austrian trick-taking card game.</p>' +
             '<a href="http://www.boardgamegeek.com/boardgame/11582/schnapsen">BBG entry</a>; <a href="http://www.pagat.com/marriage/schnaps.html">Rules</a>',
@@ -1,12 +1,44 @@
-from tornado.gen import coroutine
-
+import base.client
+import base.commands
+from base.tools import english_join_list, plural_s
 import games.lobby
 import games.base.game
 from games.base.game import CheaterException, EndGameException, PlayerResignedException, activity
-from games.base.log import TurnLog, GameLogEntry
+from games.base.log import TurnLog, GameLogEntry, HeaderLogEntry
 import games.base.cards
 import games.base.playing_cards
-from games.base.playing_cards import Card, SUITS
+from games.base.playing_cards import Card, get_suit
+from games.base.card_sets import PlayingCardDeckIndex
+from games.schnapsen.moves import MoveGenerator
+
+
+base.commands.register_commands(
+    "games.schnapsen", "init", "update_game_ui", "update_player_ui", "card_played", "play_turn"
+)
+
+CARD_VALUES = {"A": 11, "10": 10, "K": 4, "Q": 3, "J": 2}
+
+# The bit index of the cards. It only depends on the card set, so all games share it (and the move
+# generators, which only depend on the trump). Its cards are not those of any game, use `Game.cards`.
+CARD_INDEX = PlayingCardDeckIndex(games.base.playing_cards.get_cards(CARD_VALUES))
+MOVE_GENERATORS = {trump: MoveGenerator(CARD_INDEX, trump) for trump in CARD_INDEX.suit_masks}
+
+# The HTML of all cards by id. It is sent once on init, afterwards the UI only receives card ids.
+CARD_HTML = {c.id: str(c) for c in CARD_INDEX.cards}
+
+# The number of game points needed to win a Bummerl.
+BUMMERL_POINTS = 7
+
+
+def get_game_points(points, tricks):
+    """
+    The game points for winning a deal against an opponent with `points` points and `tricks` tricks.
+    """
+    if not tricks:
+        return 3
+    if points < 33:
+        return 2
+    return 1
 
 
 class Deck(games.base.cards.Deck):
@@ -14,6 +46,22 @@ class Deck(games.base.cards.Deck):
         super().__init__(game, *args)
         self.closed = False
         self.closing_player = None
+        # The opponent's points and tricks when the stock was closed (they decide the game points).
+        self.opponent_points = None
+        self.opponent_tricks = None
+
+    def reset(self, cards):
+        """
+        Put all cards back into the deck for the next deal.
+
+        :param cards: All cards of the game. None of them may be in another location.
+        """
+        self.clear()
+        self.extend(cards)
+        self.closed = False
+        self.closing_player = None
+        self.opponent_points = None
+        self.opponent_tricks = None
 
     def determine_open_card(self):
         """Determine trump during set up."""
@@ -26,7 +74,7 @@ class Deck(games.base.cards.Deck):
 
         :rtype: Card
         """
-        if self.closed:
+        if self.closed or not self:
             return None
         return self[0]
 
@@ -51,6 +99,9 @@ class Deck(games.base.cards.Deck):
         assert self.can_draw
         self.closed = True
         self.closing_player = player
+        opponent = [p for p in self.game.players if p is not player][0]
+        self.opponent_points = opponent.points
+        self.opponent_tricks = len(opponent.taken_cards) // 2
         self.game.trigger_game_ui_update()
 
     def exchange_open(self, card):
@@ -74,34 +125,113 @@ class Deck(games.base.cards.Deck):
         return open_trump
 
 
+class Hand(games.base.cards.Hand):
+    """A hand that remembers its mask in the game's card index until it changes."""
+
+    def __init__(self, player, *args):
+        self._mask = None
+        super().__init__(player, *args)
+
+    def _request_ui_update(self):
+        self._mask = None
+        super()._request_ui_update()
+
+    def __setitem__(self, key, card):
+        self._mask = None
+        super().__setitem__(key, card)
+
+    def __delitem__(self, key):
+        self._mask = None
+        super().__delitem__(key)
+
+    def mask(self):
+        """Return the cards in hand as a set of the game's `card_index`."""
+        if self._mask is None:
+            self._mask = self.player.game.card_index.mask(self)
+        return self._mask
+
+
 class Game(games.base.game.Game):
-    def __init__(self, clients):
+    def __init__(self, clients, seed=None, bummerl=False):
+        """
+        :param bummerl: Play a Bummerl, i.e. deals until someone has `BUMMERL_POINTS` game points,
+                        instead of a single deal.
+        """
         assert len(clients) == 2, "Must have exactly two players."
-        super().__init__("schnapsen", clients)
+        super().__init__("schnapsen", clients, seed)
         self.log = TurnLog(self.players)
 
-        self.deck = Deck(
-            self,
-            games.base.playing_cards.get_cards({"A": 11, "10": 10, "K": 4, "Q": 3, "J": 2})
-        )
+        self.deck = Deck(self, games.base.playing_cards.get_cards(CARD_VALUES))
+        self.cards = tuple(self.deck)  # In the order of `card_index`.
+        self.card_index = CARD_INDEX
         self.trump = None
+        self.moves = None  # The MoveGenerator of the deal (once the trump is known).
+        self.bummerl = bummerl
+        self.deal_number = 0
 
         self.start(self.run)
 
     def create_player(self, client):
+        if isinstance(client, base.client.BotClient):
+            from games.schnapsen.bot import BotPlayer  # avoid a circular import
+            return BotPlayer(client, self)
         return Player(client, self)
 
-    @coroutine
-    def run(self):
+    async def run(self):
+        if self.bummerl:
+            winner = await self.play_bummerl()
+        else:
+            winner = await self.play_deal()
+
+        self.running = False
+        assert not winner.resigned
+
+        self.do_game_end(winner)
+
+    async def play_bummerl(self):
+        """
+        Play deals until a player has enough game points.
+
+        All deals are played with the same cards, collections and log, so the whole Bummerl ends up
+        in a single log file.
+
+        :return: The winner of the Bummerl.
+        """
+        while True:
+            winner = await self.play_deal()
+            # If someone resigned, the other player wins the Bummerl.
+            if len(self.players) != 2:
+                return winner
+
+            loser = [p for p in self.players if p is not winner][0]
+            points = self.get_game_points(winner, loser)
+            winner.game_points += points
+            self.log.add_paragraph()
+            self.log.add_entry(GameLogEntry("{} wins the deal and scores {} game point{}.".format(
+                winner, points, plural_s(points)
+            )))
+            self.log.add_entry(GameLogEntry("Score: " + self.get_score()))
+            self.trigger_game_ui_update()
+            if winner.game_points >= BUMMERL_POINTS:
+                return winner
+
+            self._prepare_next_deal()
+
+    async def play_deal(self):
+        """
+        Play a single deal.
+
+        :return: The winner of the deal.
+        """
         lead, follow = self._set_up()
 
         try:
             while self.running:
                 self.log.new_turn()
 
-                lead_card = yield lead.play_card()
+                lead_card = await lead.play_card()
                 self._send_card_play(lead_card, True)
-                follow_card = yield follow.play_card(lead_card)
+                follow_card = await follow.play_card(lead_card)
                 self._send_card_play(follow_card, False)
 
                 lead, follow = self.evaluate_trick(lead, lead_card, follow, follow_card)
@@ -120,12 +250,7 @@ class Game(games.base.game.Game):
         except PlayerResignedException:
             pass
 
-        self.running = False
-
-        winner = self.determine_winner(lead, follow)
-        assert not winner.resigned
-
-        self.do_game_end(winner)
+        return self.determine_winner(lead, follow)
 
     def _set_up(self):
         """
@@ -133,6 +258,10 @@ class Game(games.base.game.Game):
 
         :return: A tuple (lead, follow) consisting of the players in order for the first trick.
         """
+        if self.bummerl:
+            self.deal_number += 1
+            self.log.add_entry(HeaderLogEntry("Deal {}".format(self.deal_number), level=1))
+            self.log.current_turn = 0
         lead, follow = self.players
         lead.log.simple_add_entry("{Player} lead{s} the first trick.")
 
@@ -142,6 +271,7 @@ class Game(games.base.game.Game):
 
         self.deck.determine_open_card()
         self.trump = self.deck.open_card.suit
+        self.moves = MOVE_GENERATORS[self.trump]
         self.log.add_entry(GameLogEntry("{} is trump".format(self.trump)))
         self.trigger_game_ui_update()
 
@@ -160,12 +290,7 @@ class Game(games.base.game.Game):
         :param follow_card: The card the second player played.
         :return: A tuple (new_lead, new_follow).
         """
-        if lead_card.suit == follow_card.suit:
-            follow_won = follow_card.value > lead_card.value
-        else:
-            follow_won = self.trump == follow_card.suit
-
-        if follow_won:
+        if self.moves.wins(self.card_index.position(lead_card), self.card_index.position(follow_card)):
             lead, follow = follow, lead
 
         lead.take_trick(lead_card, follow_card)
@@ -207,6 +332,37 @@ class Game(games.base.game.Game):
         # or took the last trick.
         return lead
 
+    def get_game_points(self, winner, loser):
+        """
+        The game points `winner` scores for a deal.
+
+        Usually this depends on the loser's points and tricks (see `get_game_points()`), but
+        winning with the last trick only scores 1 point. If the stock was closed, the opponent
+        of the closing player at the time of closing counts, and if the closing player loses,
+        the winner scores at least 2 points.
+        """
+        deck = self.deck
+        if deck.closed:
+            if winner is deck.closing_player:
+                return get_game_points(deck.opponent_points, deck.opponent_tricks)
+            return 3 if not deck.opponent_tricks else 2
+        if winner.points < 66:
+            return 1
+        return get_game_points(loser.points, len(loser.taken_cards) // 2)
+
+    def get_score(self):
+        """The game points of both players as a string."""
+        return ", ".join("{} {}".format(p, p.game_points) for p in self.all_players)
+
+    def _prepare_next_deal(self):
+        """Gather the cards of the last deal and let the other player lead the next one."""
+        for player in self.players:
+            player.reset()
+        self.deck.reset(self.cards)
+        self.trump = None
+        self.moves = None
+        self.players.reverse()
+
     def player_has_resigned(self, player):
         """
         A player has resigned.
@@ -223,37 +379,42 @@ class Game(games.base.game.Game):
         other.client.cancel_interactions(PlayerResignedException(player))
 
     def get_game_ui_update_command(self):
-        return {
+        cmd = {
             "command": "games.schnapsen.update_game_ui",
             "trump": str(self.trump),
             "deck_size": len(self.deck),
-            "open_card": str(self.deck.open_card) if self.deck.open_card else None,
+            "open_card": self.deck.open_card.id if self.deck.open_card else None,
         }
+        if self.bummerl:
+            cmd["score"] = self.get_score()
+        return cmd
 
     def send_init(self, client):
         super().send_init(client)
         client.send_message({
             "command": "games.schnapsen.init",
+            "cards": CARD_HTML,
         })
+        # The UI is rebuilt from scratch, so the next hand update has to contain the whole hand.
+        self.get_player_by_client(client).hand_sync.reset()
 
     def handle_reconnect(self, client):
         super().handle_reconnect(client)
 
     def _send_card_play(self, card, is_lead):
         """Update the UI to show played cards."""
-        for client in self.clients:
-            if is_lead:
-                client.send_permanent_message("card_played", {
-                    "command": "games.schnapsen.card_played",
-                    "is_lead": True,
-                    "card": str(card)
-                })
-            else:
-                client.send_message({
-                    "command": "games.schnapsen.card_played",
-                    "is_lead": False,
-                    "card": str(card)
-                })
+        if self.headless:
+            return
+        cmd = {
+            "command": "games.schnapsen.card_played",
+            "is_lead": is_lead,
+            "card": card.id
+        }
+        if is_lead:
+            self.broadcast(cmd, permanent_group="card_played")
+        else:
+            self.broadcast(cmd)
+            for client in self.clients:
                 client.remove_permanent_messages("card_played")
 
 
@@ -261,24 +422,34 @@ class Player(games.base.game.Player):
     def __init__(self, client, game: Game):
         super().__init__(client, game)
         self.game = game  # for pycharm
-        self.hand = games.base.cards.Hand(self)
+        self.hand = Hand(self)
         self.points = 0
         self.taken_cards = games.base.cards.CardCollection()
+        self.hand_sync = games.base.cards.CardCollectionSync()
+        self.game_points = 0  # Only used in a Bummerl.
+
+    def reset(self):
+        """Return the cards and points of the last deal (before the next deal of a Bummerl)."""
+        with self.hand.batch():
+            self.hand.clear()
+            self.taken_cards.clear()
+            self.points = 0
 
     def get_public_ui_update_command(self):
         return None
 
     def _get_private_ui_update_command(self):
+        # This is only called to send the command, so we can mark the hand as sent.
         return {
             "command": "games.schnapsen.update_player_ui",
-            "hand": [str(c) for c in self.hand],
+            "hand": self.hand_sync.update(self.hand),
             "points": self.points
         }
 
     def get_info(self):
         return {
             "points": self.points,
-            "taken_cards": [str(c) for c in self.taken_cards],
+            "taken_cards": self.taken_cards.ids(),
             "trump": str(self.game.trump),
             "deck_size": len(self.game.deck),
         }
@@ -288,20 +459,19 @@ class Player(games.base.game.Player):
         self.hand.extend(cards)
 
     @activity
-    def play_card(self, lead_card=None):
+    async def play_card(self, lead_card=None):
         """Play the trick"""
-        return (yield self._play_card(lead_card))
+        return await self._play_card(lead_card)
 
-    @coroutine
-    def _play_card(self, lead_card=None):
+    async def _play_card(self, lead_card=None):
         options, cards = self._get_follow_options(lead_card) if lead_card else self._get_lead_options()
         cards = [c.id for c in cards]
 
-        return (yield self._do_play(options, cards))
+        return await self._do_play(options, cards)
 
     def _get_lead_options(self):
         options = []
-        if self.game.deck.open_card and Card("J", self.game.trump) in self.hand:
+        if self.game.deck.open_card and self.game.moves.can_exchange(self.hand_mask()):
             options.append({"type": "exchange"})
         if self.game.deck.open_card:
             options.append({"type": "close"})
@@ -311,29 +481,38 @@ class Player(games.base.game.Player):
 
     def _get_follow_options(self, lead_card):
         if self.game.deck.open_card:
-            cards = self.hand
-        else:
-            cards = [card for card in self.hand if card.suit == lead_card.suit and card.value > lead_card.value]
-            if not cards:
-                cards = [card for card in self.hand if card.suit == lead_card.suit]
-            if not cards:
-                cards = [card for card in self.hand if card.suit == self.game.trump]
-            if not cards:
-                cards = self.hand
-        return [], cards
+            return [], self.hand
+
+        index = self.game.card_index
+        hand = self.hand_mask()
+        allowed = self.game.moves.follow(hand, index.position(lead_card), strict=True)
+        if allowed == hand:
+            return [], self.hand
+        return [], index.filter(self.hand, allowed)
+
+    def hand_mask(self):
+        """Return the cards in hand as a set of `self.game.card_index`."""
+        return self.hand.mask()
 
     def available_marriages(self):
         """Return any suits for possible marriages in hand."""
-        return [suit for suit in SUITS if Card("Q", suit) in self.hand and Card("K", suit) in self.hand]
+        return [get_suit(symbol) for symbol in self.game.moves.available_marriages(self.hand_mask())]
+
+    async def _query_play(self, options, cards):
+        """
+        Ask the client what to play.
 
-    @coroutine
-    def _do_play(self, options, cards):
-        response = yield self.client.query(
+        :return: The response.
+        """
+        return await self.client.query(
             "games.schnapsen.play_turn",
             options=options,
             cards=cards
         )
 
+    async def _do_play(self, options, cards):
+        response = await self._query_play(options, cards)
+
         if response["type"] == "card":
             if response["card"] not in cards:
                 raise CheaterException(self, "Tried to play invalid card.")
@@ -355,23 +534,23 @@ class Player(games.base.game.Player):
             self.trigger_private_ui_update()
             if self.points > 65:
                 raise EndGameException()
-            cards = [Card("Q", suit).id, Card("K", suit).id]
-            return (yield self._do_play([], cards))
+            return await self._do_play([], self.game.card_index.ids(self.game.moves.marriages[suit.symbol]))
 
         if len([o for o in options if o["type"] == response["type"]]) == 0:
             raise CheaterException(self, "Tried to do an invalid play.")
 
         if response["type"] == "exchange":
             self.log.simple_add_entry("{Player} do{es} an exchange for " + str(self.game.deck.open_card) + ".")
-            jack = self.hand.get_by_id(Card("J", self.game.trump).id)
-            self.hand.remove(jack)
-            self.hand.append(self.game.deck.exchange_open(jack))
-            return (yield self._play_card())
+            jack = self.hand.get_by_id(self.game.card_index.ids(self.game.moves.trump_jack)[0])
+            with self.hand.batch():
+                self.hand.remove(jack)
+                self.hand.append(self.game.deck.exchange_open(jack))
+            return await self._play_card()
 
         if response["type"] == "close":
             self.log.simple_add_entry("{Player} close{s} the stock.")
             self.game.deck.close(self)
-            return (yield self._play_card())
+            return await self._play_card()
 
     def take_trick(self, *cards):
         self.log.simple_add_entry("{Player} take{s} the trick.")
@@ -382,12 +561,36 @@ class Player(games.base.game.Player):
 
 class Lobby(games.lobby.Lobby):
     def __init__(self):
-        super().__init__("schnapsen", 2, 2, PlayerGameProposal)
+        # A single player plays against the computer.
+        super().__init__("schnapsen", 1, 2, PlayerGameProposal)
 
 
 class BaseGameProposal(games.lobby.GameProposal):
+    """
+    Available options:
+      * bummerl: Play deals until someone has `BUMMERL_POINTS` game points.
+    """
+    def _validate_and_set_options(self, options):
+        super()._validate_and_set_options(options)
+        self.options["bummerl"] = bool(options.get("bummerl", False))
+
+    def _get_solitaire_prompt(self, client):
+        if self.options["bummerl"]:
+            return "Do you want to play a Bummerl against the computer?"
+        return "Do you want to play against the computer?"
+
+    def _get_multiplayer_prompt(self, client):
+        if self.options["bummerl"]:
+            return "Do you want to play a Bummerl with {}?".format(
+                english_join_list([str(c) for c in self.clients if c != client])
+            )
+        return super()._get_multiplayer_prompt(client)
+
     def _create_game(self):
-        return Game(self.clients)
+        clients = list(self.clients)
+        if len(clients) == 1:
+            clients.append(base.client.BotClient())
+        return Game(clients, bummerl=self.options["bummerl"])
 
 
 class PlayerGameProposal(BaseGameProposal, games.lobby.PlayerCreatedProposal):
@@ -0,0 +1,65 @@
+"""
+Legal moves of Schnapsen on sets of cards.
+
+A `MoveGenerator` precomputes everything that decides which cards may be played for a single
+deal (i.e. with a fixed trump): the higher cards of the same suit, the suits, the trumps and the
+marriages. Hands are sets of the game's card index (see `games.base.card_sets`), so generating
+moves only takes a few bit operations. It is used by the players of the live game (and thus by
+the simulations) as well as by the bot's search. As it only consists of ints and tuples, it can
+be sent to worker processes.
+"""
+
+
+class MoveGenerator:
+    def __init__(self, index, trump):
+        """
+        :type index: games.base.card_sets.PlayingCardDeckIndex
+        :type trump: games.base.playing_cards.Suit
+        """
+        queens_and_kings = index.rank_masks["Q"] | index.rank_masks["K"]
+        self.size = len(index.cards)
+        self.values = index.values
+        # higher[i]: The cards of the same suit as card i with a higher value.
+        self.higher = index.higher
+        # beaten_by[i]: The cards that win a trick led by card i.
+        self.beaten_by = index.beaten_by[trump]
+        self.same_suit = tuple(index.suit_masks[card.suit] for card in index.cards)
+        self.trumps = index.suit_masks[trump]
+        self.trump_jack = self.trumps & index.rank_masks["J"]
+        # The queen and king of each suit (by suit symbol).
+        self.marriages = {suit.symbol: mask & queens_and_kings for suit, mask in index.suit_masks.items()}
+        # partner[i]: The other card of a marriage (0 if card i is not part of one).
+        self.partner = tuple(
+            index.suit_masks[card.suit] & queens_and_kings & ~index.bits[card.id]
+            if index.bits[card.id] & queens_and_kings else 0
+            for card in index.cards
+        )
+        self.marriage_points = tuple(40 if card.suit == trump else 20 for card in index.cards)
+
+    def follow(self, hand, lead, strict):
+        """
+        The cards in `hand` which may be played to a trick led by card `lead`.
+
+        :param strict: Whether the stock is closed or empty. Then the player has to follow suit with a
+                       higher card if possible, then with any card of the same suit, then with a trump.
+        """
+        if not strict:
+            return hand
+        return (
+            hand & self.higher[lead]
+            or hand & self.same_suit[lead]
+            or hand & self.trumps
+            or hand
+        )
+
+    def can_exchange(self, hand):
+        """Does `hand` contain the trump jack?"""
+        return bool(hand & self.trump_jack)
+
+    def available_marriages(self, hand):
+        """The symbols of the suits of which `hand` contains the queen and king."""
+        return [symbol for symbol, mask in self.marriages.items() if hand & mask == mask]
+
+    def wins(self, lead, follow):
+        """Does card `follow` win a trick led by card `lead`?"""
+        return bool(self.beaten_by[lead] & (1 << follow))
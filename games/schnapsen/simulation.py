@@ -0,0 +1,102 @@
+"""
+Headless simulation of Schnapsen games.
+
+Run `python -m games.schnapsen.simulation --games 10000` to benchmark the game engine
+(add `--unchecked` to measure it without the invariant checks of card collections and `--bummerl`
+to play whole Bummerls instead of single deals).
+"""
+
+import argparse
+import functools
+import random
+import sys
+
+from games.base.cards import set_invariant_checks
+from games.base.simulation import Simulation
+from games.schnapsen.game import Game
+
+
+class SimulatedGame(Game):
+    """A game of Schnapsen without UI, log or log file."""
+    headless = True
+
+    def _write_log(self):
+        return None
+
+
+class RandomPolicy:
+    """
+    Play random legal cards.
+
+    With probability `option_probability` we choose one of the other options (exchange,
+    closing the stock or a marriage) instead, if there are any.
+    """
+    def __init__(self, rng=None, option_probability=0.0):
+        self.random = rng or random.Random()
+        self.option_probability = option_probability
+
+    def __call__(self, client, command, parameters):
+        assert command == "games.schnapsen.play_turn", "Unexpected query {}.".format(command)
+        options = parameters["options"]
+        if options and self.random.random() < self.option_probability:
+            return dict(self.random.choice(options))
+        return {"type": "card", "card": self.random.choice(parameters["cards"])}
+
+
+def get_result(game):
+    """
+    Summarize a finished game.
+
+    :type game: Game
+    :return: A tuple (winner, points, tricks), where `winner` is the seat (client id) of the winner
+             and `points` a tuple with the points of each seat.
+    """
+    players = sorted(game.all_players, key=lambda p: p.client.id)
+    return (
+        game.winners[0].client.id if game.winners else None,
+        tuple(p.points for p in players),
+        game.log.current_turn,
+    )
+
+
+def get_simulation(rng=None, option_probability=0.1, bummerl=False):
+    """Return a `Simulation` of two random players (playing Bummerls if `bummerl` is True)."""
+    rng = rng or random.Random()
+    return Simulation(
+        functools.partial(SimulatedGame, bummerl=bummerl),
+        [RandomPolicy(rng, option_probability), RandomPolicy(rng, option_probability)]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Schnapsen engine with simulated games.")
+    parser.add_argument("--games", type=int, default=1000, help="Number of games to play.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the players' random decisions.")
+    parser.add_argument("--options", type=float, default=0.1,
+                        help="Probability to exchange, close or play a marriage when possible.")
+    parser.add_argument("--min-rate", type=float, default=None,
+                        help="Exit with an error if fewer games per second are played (for CI).")
+    parser.add_argument("--unchecked", action="store_true",
+                        help="Switch off the invariant checks of card collections.")
+    parser.add_argument("--bummerl", action="store_true", help="Play Bummerls instead of single deals.")
+    args = parser.parse_args()
+
+    if args.unchecked:
+        set_invariant_checks(False)
+
+    simulation = get_simulation(random.Random(args.seed), args.options, args.bummerl)
+    results = simulation.run(args.games, get_result)
+
+    wins = [len([r for r in results if r[0] == seat]) for seat in (0, 1)]
+    print("Played {} games in {:.2f} s ({:.0f} games/s).".format(
+        simulation.games_played, simulation.duration, simulation.games_per_second))
+    print("Wins by seat: {} / {}, average tricks: {:.2f}".format(
+        wins[0], wins[1], sum(r[2] for r in results) / len(results)))
+
+    if args.min_rate is not None and simulation.games_per_second < args.min_rate:
+        print("Too slow: expected at least {} games/s.".format(args.min_rate))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
+import asyncio
 import json
 import logging
 import importlib
+import collections
+import gzip
+import hashlib
+import mimetypes
 import os
+import time
 
-import tornado.ioloop
 import tornado.web
 # import tornado.auth
 # import tornado.gen
@@ -14,12 +19,56 @@ from configuration import config
 # # Set up the log
 # # noinspection PyUnresolvedReferences
 # import base.log
+import base.assets
 import base.client
 import base.locations
+import base.ratelimit
+import base.scheduler
+from base.tools import json_for_script
 
 logger = logging.getLogger(__name__)
 
 
+def get_accepted_encodings(request):
+    """The content encodings (e.g. "gzip") the client of `request` accepts."""
+    return {e.split(";")[0].strip() for e in request.headers.get("Accept-Encoding", "").split(",")}
+
+
+class CompressionStats:
+    """How much the compression of responses saves and what it costs."""
+    def __init__(self):
+        self.responses = 0  # All responses.
+        self.compressed = 0  # Compressed responses.
+        self.original_bytes = 0  # Size of the compressed responses before compression.
+        self.compressed_bytes = 0  # Size of the compressed responses after compression.
+        self.seconds = 0.0  # Time spent compressing.
+
+    def record(self, size, compressed_size=None, seconds=0.0):
+        """
+        Record a response.
+
+        :param size: The size of the response (in bytes).
+        :param compressed_size: The compressed size (or None if the response was not compressed).
+        :param seconds: The time it took to compress the response.
+        """
+        self.responses += 1
+        if compressed_size is not None:
+            self.compressed += 1
+            self.original_bytes += size
+            self.compressed_bytes += compressed_size
+            self.seconds += seconds
+
+    @property
+    def ratio(self):
+        """The compressed size divided by the original size (of the compressed responses)."""
+        return self.compressed_bytes / self.original_bytes if self.original_bytes else 1.0
+
+    def __str__(self):
+        return "{} of {} responses compressed from {} to {} bytes (ratio {:.2f}) in {:.3f} seconds.".format(
+            self.compressed, self.responses, self.original_bytes, self.compressed_bytes, self.ratio, self.seconds
+        )
+
+
 class BaseHandler(tornado.web.RequestHandler):
     def get_current_user(self):
         """
@@ -38,10 +87,19 @@ class BaseHandler(tornado.web.RequestHandler):
 
 
 class PollHandler(BaseHandler):
-    """The long polling URI where we wait for new messages."""
+    """
+    The long polling URI where we wait for new messages.
+
+    Responses of at least `config["poll_compression_threshold"]` bytes (e.g. the log and chat
+    history after a reconnect) are gzipped, if the client accepts it. Smaller ones are not worth
+    the CPU time. Every poll gets a separate response, so there is no compression context which
+    could be kept between the batches.
+    """
+    compression_stats = CompressionStats()
+    _done = None  # Resolved when the response is sent or the connection is closed.
+
     @tornado.web.authenticated
-    @tornado.web.asynchronous
-    def get(self):
+    async def get(self):
         self.set_header("Content-Type", "application/json")
 
         session_id = int(self.get_query_argument("session_id"))
@@ -51,7 +109,21 @@ class PollHandler(BaseHandler):
             self.disconnect_old_connection()
             return
 
+        encoding = self.get_query_argument("encoding", "json") if config["compact_encoding"] else "json"
+        self.current_user.messages.set_encoding(encoding)
+        self._done = asyncio.Future()
         self.current_user.messages.wait_for_messages(self)
+        await self._done
+
+    def on_finish(self):
+        self._resolve()
+
+    def on_connection_close(self):
+        self._resolve()
+
+    def _resolve(self):
+        if self._done is not None and not self._done.done():
+            self._done.set_result(None)
 
     def send_messages(self):
         """Send all waiting messages."""
@@ -59,9 +131,30 @@ class PollHandler(BaseHandler):
             return
         msgs = self.current_user.messages.get_all()
         try:
-            self.finish(json.dumps(msgs).encode())
+            data = self.current_user.messages.encoder.dumps(msgs).encode()
         except TypeError:
             raise TypeError("Can't serialize {}.".format(msgs))
+        self.finish(self.compress(data))
+
+    def compress(self, data):
+        """Compress the response body `data` (and set the headers), if it is worth it."""
+        threshold = config["poll_compression_threshold"]
+        self.set_header("Vary", "Accept-Encoding")
+        if threshold is None or len(data) < threshold or "gzip" not in get_accepted_encodings(self.request):
+            self.compression_stats.record(len(data))
+            return data
+
+        start = time.perf_counter()
+        compressed = gzip.compress(data, compresslevel=config["poll_compression_level"])
+        seconds = time.perf_counter() - start
+        self.compression_stats.record(len(data), len(compressed), seconds)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Compressed a poll response from {} to {} bytes in {:.4f} seconds.".format(
+                len(data), len(compressed), seconds
+            ))
+
+        self.set_header("Content-Encoding", "gzip")
+        return compressed
 
     def disconnect_old_connection(self):
         """This is an old connection. Disconnect and show an error message to the user."""
@@ -71,7 +164,13 @@ class PollHandler(BaseHandler):
 
 
 class ClientRequestHandler(BaseHandler):
-    """The client sends a request."""
+    """
+    The client sends a request (which is handled later, see `base.scheduler`).
+
+    Requests above the client's rate limit (see `base.ratelimit`) are rejected with status 429.
+    Idempotent requests (see `config["deduplicate_requests"]`) that are identical to a waiting
+    request of the same client are dropped.
+    """
     @tornado.web.authenticated
     def post(self):
 
@@ -84,7 +183,15 @@ class ClientRequestHandler(BaseHandler):
             request = json.loads(self.request.body.decode())
             if logger.isEnabledFor(logging.DEBUG):
                 logger.debug("Got request: {}.".format(request))
-            self.current_user.handle_request(request)
+            command = str(request.get("command"))
+            if not self.current_user.rate_limiter.allow(command):
+                logger.warning("Rate limit of {} exceeded by {}.".format(self.current_user, command))
+                self.send_error(429)
+                return
+            key = None
+            if base.ratelimit.get_command_class(command, config["deduplicate_requests"]) is not None:
+                key = (self.current_user.id, json.dumps(request, sort_keys=True))
+            get_instance().scheduler.put(self.current_user, self.current_user.handle_request, request, key=key)
             self.set_status(202)
             self.write("OK")
         except Exception as e:
@@ -94,7 +201,7 @@ class ClientRequestHandler(BaseHandler):
 
 
 class ClientResponseHandler(BaseHandler):
-    """The client sends a response."""
+    """The client sends a response (which is handled later, see `base.scheduler`)."""
     @tornado.web.authenticated
     def post(self):
         session_id = int(self.get_query_argument("session_id"))
@@ -106,7 +213,7 @@ class ClientResponseHandler(BaseHandler):
             response = json.loads(self.request.body.decode())
             if logger.isEnabledFor(logging.DEBUG):
                 logger.debug("Got response: {}.".format(response))
-            self.current_user.post_response(response)
+            get_instance().scheduler.put(self.current_user, self.current_user.post_response, response)
             self.set_status(202)
             self.write("OK")
         except Exception as e:
@@ -120,7 +227,12 @@ class StartHandler(BaseHandler):
     This is the entry point to the application.
 
     We either redirect to the login page or display the game area.
+
+    The page already contains the messages of the (re)connection and the HTML fragments the client
+    needs first, so that it does not have to wait for the first poll and fetch the fragments.
     """
+    #: The HTML fragments (relative to the static path) embedded in the page.
+    inline_fragments = ["welcome.html", "lobby.html"]
     @tornado.web.authenticated
     def get(self):
         # todo: Move this code to the correct place.
@@ -134,11 +246,112 @@ class StartHandler(BaseHandler):
 
         self.current_user.handle_new_connection()
 
+        fragments = list(self.inline_fragments)
+        if self.current_user.is_admin:
+            fragments.append("admin.html")
+
         self.render("client.html",
                     client=self.current_user,
                     config=config,
+                    asset_url=base.assets.url,
+                    json_for_script=json_for_script,
+                    assets=base.assets.get_manifest(),
+                    initial_commands=self.current_user.messages.get_all(),
+                    fragments=self.get_fragments(fragments),
                     )
 
+    def get_fragments(self, names):
+        """Return a dict mapping the URLs of the HTML fragments to their contents."""
+        fragments = {}
+        for name in names:
+            path = os.path.join(config.static_path, name)
+            if os.path.isfile(path):
+                fragments["/static/" + name] = StaticFileHandler.get_content(path).decode()
+        return fragments
+
+
+_CachedFile = collections.namedtuple("_CachedFile", ["modified", "content", "etag"])
+
+
+class StaticFileHandler(tornado.web.StaticFileHandler):
+    """
+    Serve static files from memory, with strong ETags and precompressed versions.
+
+    If the client accepts it, we send the .br or .gz sibling of a file instead of the file itself
+    (see `base.assets.compress()`). Files are kept in memory until they change on disk.
+    """
+    #: Files up to this size (in bytes) are kept in memory.
+    max_cached_size = 1024 * 1024
+
+    _cache = {}  # absolute path -> _CachedFile
+
+    def initialize(self, path, default_filename=None, immutable=False):
+        """
+        :param immutable: Whether the files never change (e.g. because they have content-hashed names).
+        """
+        super().initialize(path, default_filename)
+        self.immutable = immutable
+        self.original_path = None
+        self.content_encoding = None
+
+    def validate_absolute_path(self, root, absolute_path):
+        absolute_path = super().validate_absolute_path(root, absolute_path)
+        self.original_path = absolute_path
+        if absolute_path is None:
+            return None
+
+        accepted = get_accepted_encodings(self.request)
+        for encoding in ("br", "gzip"):
+            compressed = absolute_path + base.assets.ENCODING_EXTENSIONS[encoding]
+            if encoding in accepted and os.path.isfile(compressed):
+                self.content_encoding = encoding
+                return compressed
+        return absolute_path
+
+    @classmethod
+    def _get_cached(cls, abspath):
+        """Return the cached file (or None if it is too large)."""
+        stat = os.stat(abspath)
+        if stat.st_size > cls.max_cached_size:
+            return None
+        entry = cls._cache.get(abspath)
+        if entry is None or entry.modified != stat.st_mtime:
+            with open(abspath, "rb") as file:
+                content = file.read()
+            entry = _CachedFile(stat.st_mtime, content, hashlib.sha1(content).hexdigest())
+            cls._cache[abspath] = entry
+        return entry
+
+    @classmethod
+    def get_content(cls, abspath, start=None, end=None):
+        entry = cls._get_cached(abspath)
+        if entry is None:
+            return super().get_content(abspath, start, end)
+        return entry.content[start:end]
+
+    def compute_etag(self):
+        entry = self._get_cached(self.absolute_path)
+        if entry is None:
+            return super().compute_etag()
+        return '"{}"'.format(entry.etag)
+
+    #: The types of compressed files that are requested directly.
+    compressed_types = {"gzip": "application/gzip", "br": "application/x-brotli"}
+
+    def get_content_type(self):
+        # The type of the original file, not of its compressed version.
+        mime_type, encoding = mimetypes.guess_type(self.original_path)
+        if encoding:
+            return self.compressed_types.get(encoding, "application/octet-stream")
+        return mime_type or "application/octet-stream"
+
+    def set_extra_headers(self, path):
+        self.set_header("Vary", "Accept-Encoding")
+        if self.content_encoding:
+            self.set_header("Content-Encoding", self.content_encoding)
+        if self.immutable:
+            self.set_header("Cache-Control", "public, max-age=31536000, immutable")
+
 
 class LoginHandler(BaseHandler):
     def get(self, auth_service=None):
@@ -247,15 +460,36 @@ _application = tornado.web.Application(
 #         (r"/login/local", UnregisteredLoginHandler),
 #         (r"/login/google", GoogleLoginHandler),
 #         (r"/quit.*", QuitHandler),
-        (r"/logs/(.*)", tornado.web.StaticFileHandler, {"path": config["game_log_path"]})
+        (r"/logs/(.*)", tornado.web.StaticFileHandler, {"path": config["game_log_path"]}),
+        (base.assets.ASSET_URL + "(.*)", StaticFileHandler, {"path": config["asset_path"], "immutable": True}),
     ],
     login_url="/login",
     template_path=config.template_path,
     static_path=config.static_path,
+    static_handler_class=StaticFileHandler,
     cookie_secret=config.cookie_secret,
     xheaders=True,
 )
-_application.listen(config.port)
+
+
+def set_event_loop_policy():
+    """
+    Install the event loop policy `config["event_loop_policy"]` (e.g. "uvloop.EventLoopPolicy").
+
+    This has to happen before the first event loop is created. If the policy cannot be imported,
+    asyncio's default loop is used.
+    """
+    name = config["event_loop_policy"]
+    if not name:
+        return
+    module_name, _, class_name = name.rpartition(".")
+    try:
+        policy = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError):
+        logger.debug("Event loop policy {} is not available, using the default.".format(name))
+        return
+    asyncio.set_event_loop_policy(policy())
+    logger.debug("Using the event loop policy {}.".format(name))
 
 
 class Server:
@@ -267,6 +501,10 @@ class Server:
         self._config_overrides = {}
         configuration.add_override(self._config_overrides)
         self.games = {}
+        self.scheduler = base.scheduler.RequestScheduler()
+        set_event_loop_policy()
+        self.loop = asyncio.get_event_loop()  # The loop the application listens on.
+        _application.listen(config.port)
         self._create_dynamic_files()
 
 #         self.sweeper = tornado.ioloop.PeriodicCallback(base.client.remove_inactive, 60000)
@@ -284,21 +522,27 @@ class Server:
         if not os.path.isdir(config.game_log_path):
             os.makedirs(config.game_log_path)
 
+        if not os.path.isdir(config.asset_path):
+            os.makedirs(config.asset_path)
+
     def start(self):
         logger.debug("Starting the server.")
         self.clients = base.client.ClientManager()
         self.locations = base.locations.LocationManager()
         for game in self.games.values():
             game["lobby"] = game["lobby_class"]()
+        if config.build_assets:
+            base.assets.build(self.games)
         self.started = True
 #         self.sweeper.start()
-        tornado.ioloop.IOLoop.instance().start()
+        self.loop.run_forever()
 
     def stop(self):
         logger.debug("Stopping the server.")
+        logger.info("Poll responses: {}".format(PollHandler.compression_stats))
         self.started = False
 #         self.sweeper.stop()
-        tornado.ioloop.IOLoop.instance().stop()
+        self.loop.stop()
 
     def reset(self):
         if self.started:
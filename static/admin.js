@@ -29,3 +29,4 @@ admin = function() {
         },
     }
 }();
+commands.register("admin", admin);
@@ -25,6 +25,8 @@ $(window).on("beforeunload", function() {waiter.disconnect()});
 $(document).ready(function() {
     chat.init();
 
+    // The commands of the connection are part of the page, so that we do not have to wait for the first poll.
+    command_loop.add_several(initial_commands);
 	waiter.connect();
 
 	$(window).on("resize", function() { chat.set_size(); if (on_resize) {on_resize();}});
@@ -52,20 +54,43 @@ function quit(data) {
 //    window.location.href = "/";
 }
 
+/*
+ * The handlers of the commands the server sends, by namespace.
+ *
+ * Every module registers itself after it is defined, e.g. commands.register("games.base", games.base),
+ * and "games.base.init" runs games.base.init(). Commands without a dot belong to the namespace "".
+ */
+var commands = (function() {
+    var namespaces = {};
+
+    return {
+        register: function(namespace, handlers) {
+            namespaces[namespace] = handlers;
+        },
+        get_namespace: function(namespace) {
+            return namespaces[namespace];
+        },
+        get: function(command) {
+            var i = command.lastIndexOf(".");
+            var handlers = namespaces[i === -1 ? "" : command.substring(0, i)];
+            if (!handlers || !handlers.hasOwnProperty(command.substring(i + 1))) {
+                return null;
+            }
+            var fn = handlers[command.substring(i + 1)];
+            return typeof fn === "function" ? fn : null;
+        }
+    };
+}());
+
 var command_loop = (function() {
     var queue = [];
+    var head = 0;  // Index of the next message in the queue (this is cheaper than queue.shift()).
     var frozen = false;
-    var in_iteration = false;
-
-    var run_iteration = function() {
-        if (frozen || in_iteration || queue.length == 0) {
-            return
-        }
+    var running = false;
 
-        in_iteration = true;
-        var message = queue.shift();
+    var run_command = function(message) {
         var command = message["command"];
-        var fn = eval(command);
+        var fn = commands.get(command);
         if (fn) {
             // console.log("Running command: " + command);
             if ("query_id" in message) {
@@ -78,8 +103,29 @@ var command_loop = (function() {
         } else {
             console.log("Unknown command: " + command);
         }
-        in_iteration = false;
-        run_iteration();
+    };
+
+    // Process the queue until it is empty or frozen. Commands added by a running command are
+    // processed by the same loop instead of a nested one.
+    var run = function() {
+        if (running) {
+            return;
+        }
+        running = true;
+        try {
+            while (!frozen && head < queue.length) {
+                var message = queue[head];
+                queue[head] = undefined;
+                head++;
+                run_command(message);
+            }
+        } finally {
+            running = false;
+            if (head === queue.length) {
+                queue = [];
+                head = 0;
+            }
+        }
     };
 
     function send_response(query_id, retVal) {
@@ -91,31 +137,73 @@ var command_loop = (function() {
     }
 
     return {
-        add: function(command) {
-            queue.push(command);
-            run_iteration();
+        add: function(message) {
+            queue.push(message);
+            run();
         },
-        add_several: function(commands) {
-            queue = queue.concat(commands);
-            run_iteration();
+        add_several: function(messages) {
+            for (var i = 0; i < messages.length; i++) {
+                queue.push(messages[i]);
+            }
+            run();
         },
         freeze: function() {
             frozen = true;
         },
         thaw: function() {
             frozen = false;
-            run_iteration();
+            run();
         }
     }
 }());
 
+/*
+ * Decode the compact wire encoding (see base/encoding.py): the server interns the shapes
+ * (command and keys) of the messages and sends messages as [shape id, value, value, ...].
+ */
+var decoder = (function() {
+    var shapes = [];
+
+    // We missed a response (see base/encoding.py), so start over with a fresh page.
+    var out_of_sync = function() {
+        console.error("Lost the message shapes, reloading.");
+        window.location.reload();
+        return [];
+    };
+
+    return {
+        decode: function(data) {
+            if ($.isArray(data)) {
+                return data;  // plain JSON
+            }
+            var ids = Object.keys(data["s"]).map(Number).sort(function(a, b) { return a - b; });
+            for (var i = 0; i < ids.length; i++) {
+                if (ids[i] != shapes.length) return out_of_sync();
+                shapes.push(data["s"][ids[i]]);
+            }
+            var messages = [];
+            for (var i = 0; i < data["m"].length; i++) {
+                var values = data["m"][i];
+                if (values[0] >= shapes.length) return out_of_sync();
+                var shape = shapes[values[0]];
+                var message = {command: shape[0]};
+                for (var j = 1; j < shape.length; j++) {
+                    message[shape[j]] = values[j];
+                }
+                messages.push(message);
+            }
+            return messages;
+        }
+    };
+}());
+
 var waiter = (function() {
     var request = null;
 
     var connect = function() {
         if (request) return;
         request = $.ajax({
-            url: "/poll?session_id=" + session_id,
+            url: "/poll?session_id=" + session_id + "&encoding=compact",
             dataType: "json",
             success: waitcomplete,
             cache: false,
@@ -130,7 +218,7 @@ var waiter = (function() {
 
     var waitcomplete = function(commands) {
         request = null;
-        command_loop.add_several(commands);
+        command_loop.add_several(decoder.decode(commands));
         connect();
     };
 
@@ -145,8 +233,12 @@ var waiter = (function() {
 }());
 
 function set_variable(params) {
-    var c = eval(params["context"]);
+    var c = commands.get_namespace(params["context"]);
 
+    if (c === undefined) {
+        console.error(params["context"] + " does not exist.");
+        return;
+    }
     if (c[params["variable"]] === undefined) {
         console.error(params["context"] + "." + params["variable"] + " does not exist.");
         return;
@@ -155,12 +247,26 @@ function set_variable(params) {
     c[params["variable"]] = params["value"];
 }
 
+commands.register("", {
+    set_client_info: set_client_info,
+    set_games_info: set_games_info,
+    quit: quit,
+    set_variable: set_variable,
+    // cancel_interactions is replaced while interactions are running.
+    cancel_interactions: function(data) { cancel_interactions(data); }
+});
+
 function send_request(data) {
 	$.ajax({
 		type : "POST",
 		url : "/request?session_id=" + session_id,
 		data : JSON.stringify(data)
-	});
+	})
+        .fail(function(jqXHR) {
+            if (jqXHR.status == 429) {
+                console.log("Too many requests, dropped " + data["command"] + ".");
+            }
+        });
 }
 
 var loader = (function() {
@@ -168,15 +274,24 @@ var loader = (function() {
     var cache_control = null;
     var currently_loading = [];
 
+    // Use the built (content-hashed) file if there is one, otherwise add the cache control string.
+    var get_url = function(location) {
+        if (assets[location])
+            return assets[location];
+        if (cache_control)
+            return location + "?_=" + cache_control;
+        return location;
+    };
+
     var do_ajax = function(location, datatype, callback) {
         command_loop.freeze();
-        if (cache_control)
-            location += "?_=" + cache_control;
+        location = get_url(location);
         currently_loading.push(location);
 
+        // The server sends ETags, so the browser may always cache (and revalidate).
         var a =  $.ajax(location, {
             dataType: datatype,
-            cache: Boolean(cache_control)
+            cache: true
         });
         if (callback)
             a.done(callback);
@@ -210,6 +325,14 @@ var loader = (function() {
             do_ajax(location, "json", callback);
         },
         html: function(location, target, callback) {
+            if (fragments[location] !== undefined) {
+                // The fragment is embedded in the page.
+                if (target)
+                    target.html(fragments[location]);
+                if (callback)
+                    callback();
+                return;
+            }
             do_ajax(location, "html", function(data) {
                 if (target)
                     target.html(data);
@@ -221,10 +344,7 @@ var loader = (function() {
             if (loaded_css.indexOf(location) !== -1)
                 return;
             loaded_css.push(location);
-            if (cache_control)
-                location += "?_" + cache_control;
-            else
-                location += "?_" + Math.random();
+            location = get_url(location);
 
             $("<link />", {
                 "rel": "stylesheet",
@@ -322,6 +442,7 @@ ui = function () {
         }
     };
 }();
+commands.register("ui", ui);
 
 ui.title = function() {
     var current_title = "";
@@ -348,6 +469,7 @@ ui.title = function() {
         notify_of_activity : highlight,
     };
 }();
+commands.register("ui.title", ui.title);
 
 
 /*
@@ -387,6 +509,7 @@ welcome = function () {
         invalid_name: invalid_name,
     }
 }();
+commands.register("welcome", welcome);
 
 
 /*
@@ -478,6 +601,7 @@ chat = function() {
     };
 
 }();
+commands.register("chat", chat);
 
 
 /*
@@ -547,6 +671,7 @@ lobby = function () {
         },
     };
 }();
+commands.register("lobby", lobby);
 
 
 /*
@@ -604,6 +729,40 @@ games.lobby = function () {
 
 	var layout = [];
 
+    // The version of the membership list we have (see base/presence.py).
+    var version = 0;
+    var loaded = 0;
+    var resyncing = false;
+
+    var clear_clients = function () {
+        layout = [];
+        loaded = 0;
+        $("#lobby_player_table").empty();
+    };
+
+    var add_clients = function (params) {
+        for (var p in params["clients"]) {
+            if (!params["clients"].hasOwnProperty(p)) continue;
+            if (p != client_id) {
+                games.lobby.client_leaves({client_id : p});  // a diff may have added it already
+                games.lobby.client_joins({client_id : p, client_name : params["clients"][p]});
+            }
+        }
+        loaded = params["offset"] + Object.keys(params["clients"]).length;
+        $("#lobby_more_clients").remove();
+        if (loaded < params["total"]) {
+            $("#lobby_player_table").after($("<a />", {
+                id: "lobby_more_clients",
+                href: "#",
+                text: "Show more players (" + (params["total"] - loaded) + ")",
+                click: function () {
+                    send_request({command: "games.lobby.get_clients", offset: loaded});
+                    return false;
+                }
+            }));
+        }
+    };
+
 	return {
         game_specific_lobby : {},
 
@@ -621,13 +780,10 @@ games.lobby = function () {
                 $("#lobby_propose_button").prop('disabled', true);
             }
 
-            layout = [];
-            for (var p in params["clients"]) {
-                if (!params["clients"].hasOwnProperty(p)) continue;
-                if (p != client_id) {
-                    games.lobby.client_joins({client_id : p, client_name : params["clients"][p]});
-                }
-            }
+            clear_clients();
+            resyncing = false;
+            version = params["version"];
+            add_clients(params);
 
             games.lobby.game_specific_lobby = {};
             loader.script("/static/" + games_static_path + "/" + lobby.current + "/game.js",
@@ -642,6 +798,44 @@ games.lobby = function () {
             );
 		},
 
+        // A page of the membership list (as requested by "games.lobby.get_clients").
+        clients : function(params) {
+            if (params["offset"] == 0) {
+                clear_clients();
+                version = params["version"];
+            } else if (resyncing || params["version"] != version) {
+                // The page does not match the list we have, so start over.
+                if (!resyncing) {
+                    resyncing = true;
+                    send_request({command: "games.lobby.get_clients", offset: 0});
+                }
+                return;
+            }
+            resyncing = false;
+            add_clients(params);
+        },
+
+        // The joins and leaves since the last version.
+        presence : function(params) {
+            var id;
+            if (resyncing || params["version"] <= version) return;
+            if (params["version"] != version + 1) {
+                // We missed a diff, so start over.
+                resyncing = true;
+                send_request({command: "games.lobby.get_clients", offset: 0});
+                return;
+            }
+            version = params["version"];
+            for (var i = 0; i < params["remove"].length; i++) {
+                games.lobby.client_leaves({client_id: params["remove"][i]});
+            }
+            for (id in params["add"]) {
+                if (!params["add"].hasOwnProperty(id) || id == client_id) continue;
+                games.lobby.client_leaves({client_id: id});  // in case the name changed
+                games.lobby.client_joins({client_id: id, client_name: params["add"][id]});
+            }
+        },
+
 		client_joins : function(params) {
 			var added = false;
             var col, row;
@@ -691,6 +885,7 @@ games.lobby = function () {
 		},
 	};
 }();
+commands.register("games.lobby", games.lobby);
 /*
 games.lobby.automatch = function() {
 
@@ -898,6 +1093,7 @@ games.base = function() {
         remove_waiting_message: remove_waiting_message,
     };
 }();
+commands.register("games.base", games.base);
 
 games.base.cards = (function() {
     /*
@@ -920,6 +1116,7 @@ games.base.cards = (function() {
          },
     }
 }());
+commands.register("games.base.cards", games.base.cards);
 
 games.base.dice = (function() {
     return {
@@ -928,6 +1125,7 @@ games.base.dice = (function() {
         }
     }
 }());
+commands.register("games.base.dice", games.base.dice);
 
 
 /*
@@ -1018,6 +1216,7 @@ games.tools = function() {
 		select_one : select_one,
 	}
 }();
+commands.register("games.tools", games.tools);
 
 /*
  * The default log functionality
@@ -1073,3 +1272,4 @@ log = function() {
         end_simultaneous: end_simultaneous,
     }
 }();
+commands.register("log", log);
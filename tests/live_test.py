@@ -13,8 +13,6 @@ from selenium.webdriver.support.ui import Select, WebDriverWait
 
 from pyvirtualdisplay import Display
 
-import tornado.ioloop
-
 from configuration import config
 import server
 
@@ -39,7 +37,7 @@ class LiveTestCase(unittest.TestCase):
 
     def _post_tearDown(self):
         """Stop and reset the server after each test."""
-        tornado.ioloop.IOLoop.instance().add_callback(server.get_instance().stop)
+        server.get_instance().loop.call_soon_threadsafe(server.get_instance().stop)
         self._server_thread.join()
         server.get_instance().reset()
 
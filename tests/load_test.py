@@ -0,0 +1,367 @@
+"""
+A headless load generator that talks to a running server through the real HTTP protocol.
+
+Every bot logs in via the login form, opens the long polling connection (`/poll`) and
+answers requests (`/request`) and queries (`/response`) just like `static/client.js` does.
+Bots are paired up: in each pair one bot proposes a game of Schnapsen to the other one,
+both accept and then play random legal cards until the game ends. Afterwards they return
+to the lobby and start over.
+
+Start the server (`python main.py`) and then run, e.g.,
+
+    python -m tests.load_test --bots 2000 --duration 120 --server-pid <pid of the server>
+
+At the end we report the number of messages per second, the round trip latency
+(time between sending a request or response and receiving the first message batch
+afterwards) and, if the server pid is given, the server's memory usage per client.
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+import urllib.parse
+
+import tornado.gen
+import tornado.ioloop
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest, HTTPError
+
+from configuration import config
+
+
+class Statistics:
+    """Collect the numbers reported at the end of a load test run."""
+    def __init__(self):
+        self.messages = 0
+        self.polls = 0
+        self.bytes = 0
+        self.round_trips = []
+        self.games_finished = 0
+        self.errors = 0
+        self.started = None
+        self.stopped = None
+
+    def percentile(self, q):
+        """Return the `q`-th percentile (0 <= q <= 1) of the round trip times in seconds."""
+        if not self.round_trips:
+            return None
+        samples = sorted(self.round_trips)
+        return samples[int(round(q * (len(samples) - 1)))]
+
+    @property
+    def duration(self):
+        return (self.stopped or time.time()) - self.started
+
+    def report(self, clients, memory_per_client=None):
+        lines = [
+            "Clients:              {}".format(clients),
+            "Duration:             {:.1f} s".format(self.duration),
+            "Games finished:       {}".format(self.games_finished),
+            "Messages received:    {} ({:.1f}/s)".format(self.messages, self.messages / self.duration),
+            "Poll responses:       {} ({:.1f}/s)".format(self.polls, self.polls / self.duration),
+            "Bytes received:       {}".format(self.bytes),
+            "Errors:               {}".format(self.errors),
+        ]
+        if self.round_trips:
+            lines.append("Round trip p50:       {:.1f} ms".format(self.percentile(0.5) * 1000))
+            lines.append("Round trip p99:       {:.1f} ms".format(self.percentile(0.99) * 1000))
+        if memory_per_client is not None:
+            lines.append("Memory per client:    {:.1f} KiB".format(memory_per_client / 1024))
+        return "\n".join(lines)
+
+
+def parse_start_page(page):
+    """
+    Read the session id and the initial commands from the start page.
+
+    The server embeds the first batch of messages (e.g. `set_client_info` and `lobby.init`) in
+    the page instead of sending it with the first poll.
+
+    :param page: The HTML of the start page.
+    :return: The session id and the list of initial commands.
+    """
+    session_id = re.search(r"var session_id = (\d+);", page)
+    commands = re.search(r"var initial_commands = (.*);\n", page)
+    if not session_id or not commands:
+        raise RuntimeError("The start page does not contain the session id and the initial commands.")
+    return int(session_id.group(1)), json.loads(commands.group(1))
+
+
+class Bot:
+    """A headless client that joins the Schnapsen lobby and plays random legal cards."""
+
+    def __init__(self, runner, name, partner_name=None, game="schnapsen"):
+        """
+        :param runner: The load test this bot belongs to.
+        :type runner: LoadTest
+        :param name: The name to log in with.
+        :param partner_name: If given, this bot proposes games to the bot with this name.
+        :param game: Identifier of the game lobby to join.
+        """
+        self.runner = runner
+        self.name = name
+        self.partner_name = partner_name
+        self.game = game
+        self.random = random.Random(name)
+
+        self.cookie = None
+        self.session_id = None
+        self.id = None
+        self.lobby_clients = {}
+        self.lobby_version = 0
+        self.resyncing = False
+        self.in_lobby = False
+        self.in_game = False
+        self.proposing = False
+        self.running = False
+        self._waiting_since = None
+
+    @property
+    def stats(self):
+        return self.runner.stats
+
+    def _url(self, path):
+        return self.runner.url + path
+
+    @tornado.gen.coroutine
+    def login(self):
+        """Log in through the login form and load the start page (with the session id and the first messages)."""
+        response = yield self.runner.http.fetch(HTTPRequest(
+            self._url("/login"),
+            method="POST",
+            body=urllib.parse.urlencode({"name": self.name}),
+            follow_redirects=False,
+        ), raise_error=False)
+        if response.code != 302:
+            raise RuntimeError("Login of {} failed with status {}.".format(self.name, response.code))
+        for header in response.headers.get_list("Set-Cookie"):
+            if header.startswith("client_id="):
+                self.cookie = header.split(";")[0]
+        if not self.cookie:
+            raise RuntimeError("Login of {} did not set a cookie.".format(self.name))
+
+        response = yield self.runner.http.fetch(HTTPRequest(
+            self._url("/"),
+            headers={"Cookie": self.cookie},
+        ))
+        self.session_id, commands = parse_start_page(response.body.decode())
+        self.stats.messages += len(commands)
+        for message in commands:
+            self.handle_message(message)
+        if self.id is None:
+            raise RuntimeError("{} did not receive its client info.".format(self.name))
+
+    @tornado.gen.coroutine
+    def run(self):
+        """The poll loop."""
+        self.running = True
+        while self.running and self.runner.running:
+            try:
+                response = yield self.runner.http.fetch(HTTPRequest(
+                    self._url("/poll?session_id={}".format(self.session_id)),
+                    headers={"Cookie": self.cookie},
+                    request_timeout=3600,
+                ))
+            except HTTPError as e:
+                if e.code == 504:
+                    continue
+                self.stats.errors += 1
+                return
+            except Exception:
+                if self.runner.running:
+                    self.stats.errors += 1
+                return
+            if not self.runner.running:
+                return
+
+            if self._waiting_since is not None:
+                self.stats.round_trips.append(time.time() - self._waiting_since)
+                self._waiting_since = None
+
+            messages = json.loads(response.body.decode())
+            self.stats.polls += 1
+            self.stats.messages += len(messages)
+            self.stats.bytes += len(response.body)
+            for message in messages:
+                self.handle_message(message)
+
+    def _post(self, path, data):
+        if not self.runner.running:
+            return
+        if self._waiting_since is None:
+            self._waiting_since = time.time()
+        future = self.runner.http.fetch(HTTPRequest(
+            self._url("{}?session_id={}".format(path, self.session_id)),
+            method="POST",
+            body=json.dumps(data),
+            headers={"Cookie": self.cookie},
+        ), raise_error=False)
+        tornado.ioloop.IOLoop.current().add_future(future, lambda f: self._post_done(f, path, data))
+
+    def _post_done(self, future, path, data):
+        if not future.exception() and future.result().code == 429:
+            # Over the rate limit (see base/ratelimit.py), so try again later.
+            tornado.ioloop.IOLoop.current().call_later(1, self._post, path, data)
+        elif future.exception() or future.result().code != 202:
+            self.stats.errors += 1
+
+    def send_request(self, data):
+        self._post("/request", data)
+
+    def send_response(self, query_id, value):
+        self._post("/response", {"id": query_id, "value": value})
+
+    def handle_message(self, message):
+        command = message["command"]
+        if command == "set_client_info":
+            self.id = message["id"]
+        elif command == "lobby.init":
+            self.in_game = False
+            if message["this_lobby"] != self.game:
+                self.in_lobby = False
+                self.send_request({"command": "lobby.switch", "to": self.game})
+        elif command == "games.lobby.init":
+            self.in_lobby = True
+            self.proposing = False
+            self.lobby_clients = {}
+            self.lobby_version = message["version"]
+            self._add_lobby_clients(message)
+        elif command == "games.lobby.clients":
+            if message["offset"] == 0:
+                self.lobby_clients = {}
+                self.lobby_version = message["version"]
+            elif self.resyncing or message["version"] != self.lobby_version:
+                # The page does not match the list we have, so start over.
+                if not self.resyncing:
+                    self.resyncing = True
+                    self.send_request({"command": "games.lobby.get_clients", "offset": 0})
+                return
+            self._add_lobby_clients(message)
+        elif command == "games.lobby.presence":
+            if self.resyncing or message["version"] <= self.lobby_version:
+                return
+            if message["version"] != self.lobby_version + 1:
+                # We missed a diff, so start over.
+                self.resyncing = True
+                self.send_request({"command": "games.lobby.get_clients", "offset": 0})
+                return
+            self.lobby_version = message["version"]
+            for id_ in message["remove"]:
+                self.lobby_clients.pop(int(id_), None)
+            self.lobby_clients.update((int(id_), name) for id_, name in message["add"].items())
+            self._propose()
+        elif command == "ui.say" and "decline" in message["message"]:
+            self.proposing = False
+            self._propose()
+        elif command == "ui.choice":
+            # Accept all invitations, but never click on "Cancel".
+            if message["parameters"]["answers"] == ["Yes", "No"]:
+                self.send_response(message["query_id"], 0)
+        elif command == "games.base.init":
+            self.in_lobby = False
+            self.in_game = True
+        elif command == "games.schnapsen.play_turn":
+            card = self.random.choice(message["parameters"]["cards"])
+            self.send_response(message["query_id"], {"type": "card", "card": card})
+        elif command == "games.base.display_end_message":
+            if self.partner_name:
+                self.stats.games_finished += 1
+            self.in_game = False
+            self.send_request({"command": "game.leave"})
+        elif command == "quit":
+            self.running = False
+
+    def _add_lobby_clients(self, message):
+        """Add a page of the lobby's membership list and fetch the next page."""
+        self.resyncing = False
+        self.lobby_clients.update((int(id_), name) for id_, name in message["clients"].items())
+        loaded = message["offset"] + len(message["clients"])
+        if loaded < message["total"]:
+            self.send_request({"command": "games.lobby.get_clients", "offset": loaded})
+        self._propose()
+
+    def _propose(self):
+        if not self.partner_name or not self.in_lobby or self.proposing:
+            return
+        partners = [id_ for id_, name in self.lobby_clients.items() if name == self.partner_name]
+        if partners:
+            self.proposing = True
+            self.send_request({"command": "games.lobby.propose_game", "players": partners, "options": {}})
+
+
+class LoadTest:
+    """Log in a number of bots and let them play against each other for a given time."""
+
+    def __init__(self, url, bots, duration, name_prefix="Bot", logins_per_second=200, server_pid=None):
+        self.url = url.rstrip("/")
+        self.duration = duration
+        self.logins_per_second = logins_per_second
+        self.server_pid = server_pid
+        self.stats = Statistics()
+        self.running = False
+        self.memory_per_client = None
+
+        AsyncHTTPClient.configure(None, max_clients=2 * bots + 10)
+        self.http = AsyncHTTPClient()
+
+        self.bots = []
+        for i in range(0, bots - bots % 2, 2):
+            a, b = "{} {}".format(name_prefix, i), "{} {}".format(name_prefix, i + 1)
+            self.bots.append(Bot(self, a, partner_name=b))
+            self.bots.append(Bot(self, b))
+
+    @tornado.gen.coroutine
+    def run(self):
+        memory_before = get_rss(self.server_pid)
+
+        self.running = True
+        for i, bot in enumerate(self.bots):
+            yield bot.login()
+            if self.logins_per_second and i % self.logins_per_second == self.logins_per_second - 1:
+                yield tornado.gen.sleep(1)
+        if memory_before is not None and self.bots:
+            self.memory_per_client = (get_rss(self.server_pid) - memory_before) / len(self.bots)
+
+        self.stats.started = time.time()
+        for bot in self.bots:
+            bot.run()
+        yield tornado.gen.sleep(self.duration)
+        self.running = False
+        self.stats.stopped = time.time()
+        self.http.close()
+
+
+def get_rss(pid):
+    """Return the resident memory of process `pid` in bytes (or None if it is not available)."""
+    if pid is None:
+        return None
+    try:
+        with open("/proc/{}/status".format(pid)) as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:{}".format(config.port),
+                        help="Address of the server.")
+    parser.add_argument("--bots", type=int, default=100, help="Number of simulated clients.")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to play after all bots logged in.")
+    parser.add_argument("--name-prefix", default="Bot", help="Bots are named '<prefix> <number>'.")
+    parser.add_argument("--logins-per-second", type=int, default=200, help="Login rate (0 for no limit).")
+    parser.add_argument("--server-pid", type=int, default=None,
+                        help="Pid of the server process (for measuring memory per client).")
+    args = parser.parse_args()
+
+    test = LoadTest(args.url, args.bots, args.duration, args.name_prefix, args.logins_per_second, args.server_pid)
+    tornado.ioloop.IOLoop.current().run_sync(test.run)
+    print(test.stats.report(len(test.bots), test.memory_per_client))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from configuration import config
+import base.assets
+from base.assets import AssetBuilder, hashed_name, minify_css, minify_js, rewrite_css_urls
+
+
+class MinifyTestCase(unittest.TestCase):
+    @patch("base.assets.rjsmin", None)
+    def test_js(self):
+        source = "var f = function() {\n    // comment\n\n    return 1;\n};\n"
+        self.assertEqual("var f = function() {\nreturn 1;\n};\n", minify_js(source))
+
+    @patch("base.assets.rcssmin", None)
+    def test_css(self):
+        source = "/* comment */\n.a  .b,\n.c > .d {\n    color: red;\n    font-family: \"DejaVu Sans\";\n}\n"
+        self.assertEqual('.a .b,.c>.d{color: red;font-family: "DejaVu Sans";}\n', minify_css(source))
+
+    def test_rewrite_css_urls(self):
+        manifest = {"/static/fonts/a.woff": "/assets/fonts/a.123.woff"}
+        source = "src: url('/static/fonts/a.woff') format('woff'), url(/static/fonts/a.ttf), url(\"/static/fonts/a.woff?#x\");"
+        self.assertEqual(
+            "src: url('/assets/fonts/a.123.woff') format('woff'), url(/static/fonts/a.ttf), "
+            "url(\"/assets/fonts/a.123.woff?#x\");",
+            rewrite_css_urls(source, manifest)
+        )
+
+
+class AssetBuilderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.path, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def test_hashed_name(self):
+        self.assertNotEqual(hashed_name("a/b.js", b"1"), hashed_name("a/b.js", b"2"))
+        self.assertEqual(hashed_name("a/b.js", b"1"), hashed_name("a/b.js", b"1"))
+        self.assertTrue(hashed_name("a/b.js", b"1").startswith("a/b."))
+        self.assertTrue(hashed_name("a/b.js", b"1").endswith(".js"))
+
+    def test_bundle(self):
+        a = self.write("a.js", "var a = 1;\n")
+        b = self.write("b.js", "var b = 2\n")
+        builder = AssetBuilder(os.path.join(self.path, "out"))
+
+        builder.add_bundle("/static/bundle.js", "js/bundle.js", [a, b, os.path.join(self.path, "missing.js")])
+
+        url = builder.manifest["/static/bundle.js"]
+        self.assertTrue(url.startswith("/assets/js/bundle."))
+        with open(os.path.join(self.path, "out", url[len("/assets/"):])) as file:
+            content = file.read()
+        self.assertIn("var a = 1;", content)
+        self.assertIn("var b = 2", content)
+
+    def test_compress(self):
+        js = self.write("a.js", "var a = 1;\n" * 100)
+        small = self.write("b.js", "1")
+        font = self.write("c.woff", "x" * 1000)
+
+        for path in (js, small, font):
+            base.assets.compress(path)
+
+        with open(js + ".gz", "rb") as file:
+            self.assertEqual(b"var a = 1;\n" * 100, gzip.decompress(file.read()))
+        self.assertFalse(os.path.exists(small + ".gz"))
+        self.assertFalse(os.path.exists(font + ".gz"))
+
+    def test_build(self):
+        config.maps.insert(0, {"asset_path": self.path})
+        try:
+            manifest = base.assets.build(["schnapsen"])
+            self.assertIn("/static/client.js", manifest)
+            self.assertIn("/static/{}/schnapsen/game.js".format(config["games_static_path"]), manifest)
+            self.assertEqual(manifest["/static/client.css"], base.assets.url("/static/client.css"))
+            self.assertEqual("/static/other.js", base.assets.url("/static/other.js"))
+            with open(os.path.join(self.path, "manifest.json")) as file:
+                self.assertEqual(manifest, json.load(file))
+        finally:
+            del config.maps[0]
+            base.assets._manifest = None
+            base.assets._cache_control = None
@@ -1,10 +1,11 @@
 from unittest.mock import Mock, call
 from unittest import TestCase
+import asyncio
+import concurrent.futures
 
 from tornado.testing import AsyncTestCase, gen_test
 import tornado.ioloop
 import tornado.gen
-import tornado.concurrent
 
 import base.client
 import base.locations
@@ -98,11 +99,26 @@ class ClientTestCase(AsyncTestCase):
         c = base.client.Client(0, "foo")
         c.messages = Mock()
 
-        msg = {"foo": "bar"}
+        msg = {"command": "ui.say", "message": "bar"}
         c.send_message(msg)
 
         c.messages.put.assert_called_once_with(msg)
 
+    def test_send_unknown_command(self):
+        c = base.client.Client(0, "foo")
+        c.messages = Mock()
+
+        with self.assertRaises(base.client.UnknownCommandError):
+            c.send_message({"command": "iu.say", "message": "bar"})
+        with self.assertRaises(base.client.UnknownCommandError):
+            c.send_message({"command": "ui.title.set"})
+        with self.assertRaises(base.client.UnknownCommandError):
+            c.send_message({"command": "ui.nonexistent"})  # a known namespace is not enough
+        self.assertFalse(c.messages.put.called)
+
+        c.send_message({"command": "quit"})
+        c.messages.put.assert_called_once_with({"command": "quit"})
+
     def test_connect(self):
         c = base.client.Client(0, "foo")
         c.location = Mock()
@@ -138,7 +154,8 @@ class ClientTestCase(AsyncTestCase):
         c = base.client.Client(0, "foo")
         c.send_message = Mock()
 
-        f = c.query("a_command", param1="foo", param2="bar")
+        f = asyncio.ensure_future(c.query("a_command", param1="foo", param2="bar"))
+        yield tornado.gen.moment
 
         self.assertEqual("a_command", c.send_message.call_args[0][0]["command"])
         self.assertEqual("foo", c.send_message.call_args[0][0]["parameters"]["param1"])
@@ -155,7 +172,8 @@ class ClientTestCase(AsyncTestCase):
         c = base.client.Client(0, "foo")
         c.send_message = Mock()
 
-        f = c.query("a_command", param1="foo", param2="bar")
+        f = asyncio.ensure_future(c.query("a_command", param1="foo", param2="bar"))
+        yield tornado.gen.moment
         c.cancel_interactions()
 
         with self.assertRaises(base.client.InteractionCancelledException):
@@ -166,7 +184,8 @@ class ClientTestCase(AsyncTestCase):
         c = base.client.Client(0, "foo")
         c.send_message = Mock()
 
-        f = c.query("a_command", param1="foo", param2="bar")
+        f = asyncio.ensure_future(c.query("a_command", param1="foo", param2="bar"))
+        yield tornado.gen.moment
         e = Exception()
         c.cancel_interactions(e)
 
@@ -297,6 +316,22 @@ class MessageQueueTestCase(AsyncTestCase):
 
         self.assertFalse(ph.disconnect_old_connection.called)
 
+    def test_encoding(self):
+        self.mq.set_encoding("compact")
+        encoder = self.mq.encoder
+        encoder.dumps([{"command": "quit"}])
+
+        self.mq.set_encoding("compact")
+        self.assertIs(encoder, self.mq.encoder)
+
+        # The new page has to learn the shapes again.
+        self.mq.client_reconnected()
+        self.assertEqual("compact", self.mq.encoder.name)
+        self.assertEqual({0: ["quit"]}, self.mq.encoder.encode([{"command": "quit"}])["s"])
+
+        self.mq.set_encoding("json")
+        self.assertEqual("json", self.mq.encoder.name)
+
     def test_clear(self):
         self.mq.put({"foo": "bar"})
         self.mq.put({"foo2": "bar2"})
@@ -326,12 +361,12 @@ class MockClientTest(AsyncTestCase):
 
         f1 = c.query("foo", bar="foobar")
 
-        self.assertIsInstance(f1, tornado.concurrent.Future)
+        self.assertIsInstance(f1, asyncio.Future)
         self.assertFalse(f1.done())
 
         f2 = c.query("cmd", a=1, b=2)
 
-        self.assertIsInstance(f2, tornado.concurrent.Future)
+        self.assertIsInstance(f2, asyncio.Future)
         self.assertFalse(f2.done())
         self.assertEqual(2, len(c.messages))
 
@@ -389,3 +424,52 @@ class MockClientTest(AsyncTestCase):
         with self.assertRaises(AssertionError):
             c.assert_has_permanent_message(object(), {"command": "bla"})
 
+
+
+def _add(a, b):
+    return a + b
+
+
+class BotClientTestCase(AsyncTestCase):
+    def get_new_ioloop(self):
+        tornado.ioloop.IOLoop.clear_instance()
+        return tornado.ioloop.IOLoop.instance()
+
+    def test_ids(self):
+        c1, c2 = base.client.BotClient(), base.client.BotClient()
+        self.assertLess(c1.id, -1)
+        self.assertNotEqual(c1.id, c2.id)
+
+    def test_messages_discarded(self):
+        c = base.client.BotClient()
+        c.send_message({"command": "foo"})
+        c.send_permanent_message("foo", {"command": "foo"})
+        self.assertEqual([], c.messages.get_all())
+
+    def test_query(self):
+        c = base.client.BotClient()
+        self.assertTrue(self.io_loop.run_sync(lambda: c.ui.ask_yes_no("Play again?")))
+
+        with self.assertRaises(base.client.BotQueryError):
+            self.io_loop.run_sync(lambda: c.query("games.schnapsen.play_turn"))
+
+    def test_think_inline(self):
+        c = base.client.BotClient(inline=True)
+        future = c.think(_add, 1, 2)
+        self.assertEqual(3, future.result())
+
+    @gen_test
+    def test_think(self):
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            c = base.client.BotClient(executor=executor)
+            result = yield c.think(_add, 1, 2)
+        self.assertEqual(3, result)
+
+    @gen_test
+    def test_cancel(self):
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            c = base.client.BotClient(executor=executor)
+            future = c.think(_add, 1, 2)
+            c.cancel_interactions()
+            with self.assertRaises(base.client.InteractionCancelledException):
+                yield future
@@ -0,0 +1,79 @@
+import json
+import unittest
+
+from base.encoding import CompactEncoder, JsonEncoder, get_encoder
+
+
+def decode(shapes, data):
+    """What client.js does with a compact response."""
+    for id_, shape in sorted(data["s"].items(), key=lambda item: int(item[0])):
+        if int(id_) != len(shapes):
+            raise ValueError("Missing shape.")
+        shapes.append(shape)
+    messages = []
+    for values in data["m"]:
+        if values[0] >= len(shapes):
+            raise ValueError("Unknown shape.")
+        shape = shapes[values[0]]
+        message = {"command": shape[0]}
+        message.update(zip(shape[1:], values[1:]))
+        messages.append(message)
+    return messages
+
+
+class EncodingTestCase(unittest.TestCase):
+    def test_json(self):
+        messages = [{"command": "ui.say", "message": "Hi"}]
+        self.assertEqual(messages, json.loads(JsonEncoder().dumps(messages)))
+
+    def test_compact(self):
+        encoder = CompactEncoder()
+        shapes = []
+        first = [
+            {"command": "ui.say", "message": "Hi"},
+            {"command": "games.schnapsen.update_game_ui", "talon": 5, "trump": "H"},
+            {"command": "ui.say", "message": "Ho"},
+        ]
+        second = [
+            {"command": "games.schnapsen.update_game_ui", "talon": 3, "trump": None},
+            {"command": "quit"},
+        ]
+
+        data = json.loads(encoder.dumps(first))
+        self.assertEqual(2, len(data["s"]))
+        self.assertEqual([0, "Ho"], data["m"][2])
+        self.assertEqual(first, decode(shapes, data))
+
+        data = json.loads(encoder.dumps(second))
+        self.assertEqual({"2": ["quit"]}, data["s"])
+        self.assertEqual(second, decode(shapes, data))
+
+    def test_compact_failed_dump(self):
+        encoder = CompactEncoder()
+        shapes = []
+
+        with self.assertRaises(TypeError):
+            encoder.dumps([{"command": "ui.say", "message": object()}])
+
+        data = json.loads(encoder.dumps([{"command": "ui.say", "message": "Hi"}]))
+        self.assertEqual({"0": ["ui.say", "message"]}, data["s"])
+        self.assertEqual([{"command": "ui.say", "message": "Hi"}], decode(shapes, data))
+
+    def test_compact_lost_response(self):
+        encoder = CompactEncoder()
+        shapes = []
+
+        encoder.dumps([{"command": "ui.say", "message": "Hi"}])
+        data = json.loads(encoder.dumps([{"command": "quit"}]))
+
+        with self.assertRaises(ValueError):
+            decode(shapes, data)
+
+    def test_compact_is_smaller(self):
+        messages = [{"command": "games.schnapsen.update_game_ui", "talon": i, "trump": "H"} for i in range(10)]
+        self.assertLess(len(CompactEncoder().dumps(messages)), len(JsonEncoder().dumps(messages)) / 2)
+
+    def test_get_encoder(self):
+        self.assertIsInstance(get_encoder("compact"), CompactEncoder)
+        self.assertIsInstance(get_encoder("json"), JsonEncoder)
+        self.assertIsInstance(get_encoder("msgpack"), JsonEncoder)
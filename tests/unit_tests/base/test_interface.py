@@ -1,4 +1,7 @@
+import asyncio
+
 from tornado.testing import AsyncTestCase, gen_test
+import tornado.gen
 
 from base.interface import UI
 from base.client import MockClient
@@ -10,7 +13,8 @@ class InterfaceTestCase(AsyncTestCase):
         c = MockClient()
         ui = UI(c)
 
-        f = ui.ask_choice("Question?", ["x", "y", "z"])
+        f = asyncio.ensure_future(ui.ask_choice("Question?", ["x", "y", "z"]))
+        yield tornado.gen.moment
         c.mock_response(1)
 
         result = yield f
@@ -21,7 +25,8 @@ class InterfaceTestCase(AsyncTestCase):
         c = MockClient()
         ui = UI(c)
 
-        f = ui.ask_yes_no("Question?")
+        f = asyncio.ensure_future(ui.ask_yes_no("Question?"))
+        yield tornado.gen.moment
         c.mock_response(1)
 
         result = yield f
@@ -32,7 +37,8 @@ class InterfaceTestCase(AsyncTestCase):
         c = MockClient()
         ui = UI(c)
 
-        f = ui.ask_yes_no("Question?")
+        f = asyncio.ensure_future(ui.ask_yes_no("Question?"))
+        yield tornado.gen.moment
         c.mock_response(0)
 
         result = yield f
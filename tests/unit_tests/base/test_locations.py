@@ -1,7 +1,12 @@
+import asyncio
 import unittest
 from unittest.mock import Mock
 
+from tornado.testing import AsyncTestCase, gen_test
+import tornado.gen
+
 from configuration import config
+import base.client
 import base.locations
 from base.client import MockClient
 
@@ -100,5 +105,66 @@ class LocationTestCase(unittest.TestCase):
         l.on_last_client_leaves.assert_called_once_with()
 
 
+class BroadcastTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clients = [MockClient(i, str(i)) for i in range(3)]
+        self.location = base.locations.Location(self.clients)
+        for c in self.clients:
+            c.messages.clear()
+
+    def test_shared_payload(self):
+        payload = {"command": "ui.say", "message": "Hi"}
+        before = base.locations.fanout["ui.say"]
+
+        self.location.broadcast(payload)
+
+        for c in self.clients:
+            self.assertIs(payload, c.messages[0])
+        self.assertEqual(before + 3, base.locations.fanout["ui.say"])
+
+    def test_overrides(self):
+        c0, c1, c2 = self.clients
+        payload = {"command": "ui.say", "message": "Hi", "to": None}
+
+        self.location.broadcast(payload, overrides={c1: {"message": "Hello", "to": 1}}, exclude={c2})
+
+        self.assertEqual([payload], c0.messages)
+        self.assertEqual([{"command": "ui.say", "message": "Hello", "to": 1}], c1.messages)
+        self.assertEqual([], c2.messages)
+        self.assertEqual({"command": "ui.say", "message": "Hi", "to": None}, payload)
+
+    def test_chat(self):
+        payload = {"command": "chat.system_message", "message": "Hi"}
+
+        self.location.broadcast(payload, chat=True)
+
+        for c in self.clients:
+            c.send_chat_message.assert_called_once_with(payload)
+
+    def test_unknown_command(self):
+        with self.assertRaises(base.client.UnknownCommandError):
+            self.location.broadcast({"command": "nonexistent.say"})
+        self.assertEqual([], self.clients[0].messages)
+
+
+class AnchorCoroutineTestCase(AsyncTestCase):
+    @gen_test
+    def test_task(self):
+        location = base.locations.Location()
+        tasks = []
+
+        async def coroutine():
+            tasks.append(asyncio.current_task())
+            await asyncio.Future()
+
+        task = location.anchor_coroutine(coroutine)
+        yield tornado.gen.moment
+        self.assertEqual([task], tasks)
+
+        task.cancel()
+        yield tornado.gen.moment
+        self.assertTrue(task.cancelled())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from unittest.mock import Mock
+
+from tornado.testing import AsyncTestCase, gen_test
+import tornado.ioloop
+import tornado.gen
+
+import base.commands
+from base.client import MockClient
+from base.locations import Location
+from base.presence import Presence
+
+base.commands.register_commands("test", "presence")
+
+
+class PresenceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.location = Mock()
+        self.location.clients = set()
+        self.presence = Presence(self.location, "test.presence")
+        self.presence._schedule_flush = Mock()
+
+    def test_diff(self):
+        c1, c2 = MockClient(1, "Alice"), MockClient(2, "Bob")
+        self.presence.add(c1)
+        self.presence.add(c2)
+
+        diff = self.presence.get_diff()
+
+        self.assertEqual({"command": "test.presence", "version": 1, "add": {1: "Alice", 2: "Bob"}, "remove": []}, diff)
+        self.assertEqual({1: "Alice", 2: "Bob"}, self.presence.members)
+
+        self.presence.remove(c1)
+        diff = self.presence.get_diff()
+
+        self.assertEqual({"command": "test.presence", "version": 2, "add": {}, "remove": [1]}, diff)
+        self.assertIsNone(self.presence.get_diff())
+        self.assertEqual(2, self.presence.version)
+
+    def test_join_and_leave(self):
+        c = MockClient(1, "Alice")
+        self.presence.add(c)
+        self.presence.remove(c)
+
+        self.assertIsNone(self.presence.get_diff())
+        self.assertEqual(0, self.presence.version)
+
+    def test_snapshot(self):
+        for i in range(5):
+            self.presence.add(MockClient(i, str(i)))
+        self.presence.get_diff()
+        self.presence.add(MockClient(5, "5"))
+
+        snapshot = self.presence.get_snapshot()
+        self.assertEqual(1, snapshot["version"])
+        self.assertEqual(5, snapshot["total"])
+        self.assertEqual({i: str(i) for i in range(5)}, snapshot["clients"])
+
+        snapshot = self.presence.get_snapshot(offset=2, limit=2)
+        self.assertEqual(2, snapshot["offset"])
+        self.assertEqual({2: "2", 3: "3"}, snapshot["clients"])
+
+    def test_flush(self):
+        c1, c2 = MockClient(1, "Alice"), MockClient(2, "Bob")
+        self.presence.location = Location({c1, c2})
+        c1.messages.clear()
+        c2.messages.clear()
+        self.presence.add(c1)
+        self.presence.add(c2)
+
+        self.presence.flush()
+
+        self.assertEqual(1, len(c1.messages))
+        self.assertEqual(c1.messages, c2.messages)
+
+        self.presence.flush()
+        self.assertEqual(1, len(c1.messages))
+
+
+class PresenceBatchTestCase(AsyncTestCase):
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    @gen_test
+    def test_batch(self):
+        location = Location({MockClient(0, "Observer")})
+        messages = list(location.clients)[0].messages
+        messages.clear()
+        presence = Presence(location, "test.presence")
+        for i in range(1, 11):
+            presence.add(MockClient(i, str(i)))
+        presence.remove(MockClient(3, "3"))
+
+        self.assertEqual([], messages)
+
+        yield tornado.gen.moment
+        self.assertEqual(1, len(messages))
+        self.assertEqual(9, len(messages[0]["add"]))
+        self.assertEqual(1, messages[0]["version"])
@@ -0,0 +1,58 @@
+import unittest
+
+from configuration import config
+from base.ratelimit import RateLimiter, TokenBucket, get_command_class
+
+
+class Clock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+class TokenBucketTestCase(unittest.TestCase):
+    def test_bucket(self):
+        clock = Clock()
+        bucket = TokenBucket(2, 3, clock=clock)
+
+        self.assertEqual([True, True, True, False], [bucket.take() for _ in range(4)])
+
+        clock.time += 0.5
+        self.assertTrue(bucket.take())
+        self.assertFalse(bucket.take())
+
+        # The bucket holds at most `burst` tokens.
+        clock.time += 100
+        self.assertEqual([True, True, True, False], [bucket.take() for _ in range(4)])
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        config.maps.insert(0, {"rate_limits": {"": (10, 10), "chat": (1, 2), "chat.message": (1, 1)}})
+        self.clock = Clock()
+        self.limiter = RateLimiter(clock=self.clock)
+
+    def tearDown(self):
+        del config.maps[0]
+
+    def test_command_class(self):
+        classes = ["", "games.lobby", "games.lobby.propose_game"]
+        self.assertEqual("games.lobby.propose_game", get_command_class("games.lobby.propose_game", classes))
+        self.assertEqual("games.lobby", get_command_class("games.lobby.accept", classes))
+        self.assertEqual("", get_command_class("games.lobbyist", classes))
+        self.assertIsNone(get_command_class("chat.message", ["games"]))
+
+    def test_limits(self):
+        self.assertTrue(self.limiter.allow("chat.message"))
+        self.assertFalse(self.limiter.allow("chat.message"))
+
+        # Other classes have their own buckets.
+        self.assertTrue(self.limiter.allow("chat.history"))
+        self.assertTrue(self.limiter.allow("chat.history"))
+        self.assertFalse(self.limiter.allow("chat.history"))
+        self.assertTrue(self.limiter.allow("games.get_info"))
+
+        self.clock.time += 1
+        self.assertTrue(self.limiter.allow("chat.message"))
@@ -0,0 +1,80 @@
+from unittest.mock import Mock
+
+from tornado.testing import AsyncTestCase, gen_test
+import tornado.ioloop
+import tornado.gen
+
+from configuration import config
+from base.scheduler import RequestScheduler
+
+
+class RequestSchedulerTestCase(AsyncTestCase):
+    def setUp(self):
+        super().setUp()
+        config.maps.insert(0, {"request_batch_size": 2})
+        self.scheduler = RequestScheduler()
+        self.handled = []
+
+    def tearDown(self):
+        del config.maps[0]
+        super().tearDown()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    def client(self, location):
+        client = Mock()
+        client.location = location
+        return client
+
+    def handle(self, name):
+        self.handled.append(name)
+
+    @gen_test
+    def test_fairness(self):
+        busy, quiet = self.client("busy"), self.client("quiet")
+        for i in range(5):
+            self.scheduler.put(busy, self.handle, "busy {}".format(i))
+        self.scheduler.put(quiet, self.handle, "quiet")
+
+        self.assertEqual([], self.handled)
+        self.assertEqual(6, len(self.scheduler))
+
+        yield tornado.gen.moment
+        self.assertEqual(["busy 0", "busy 1", "quiet"], self.handled)
+
+        yield tornado.gen.moment
+        yield tornado.gen.moment
+        self.assertEqual(["busy 0", "busy 1", "quiet", "busy 2", "busy 3", "busy 4"], self.handled)
+        self.assertEqual(0, len(self.scheduler))
+
+    @gen_test
+    def test_exception(self):
+        client = self.client("location")
+        error = ValueError("Invalid request")
+
+        def fail():
+            raise error
+
+        self.scheduler.put(client, fail)
+        self.scheduler.put(client, self.handle, "next")
+
+        with self.assertLogs("base.scheduler", level="ERROR"):
+            yield tornado.gen.moment
+
+        client.notify_of_exception.assert_called_once_with(error)
+        self.assertEqual(["next"], self.handled)
+
+    @gen_test
+    def test_deduplication(self):
+        client = self.client("location")
+
+        self.assertTrue(self.scheduler.put(client, self.handle, "info", key="info"))
+        self.assertFalse(self.scheduler.put(client, self.handle, "info", key="info"))
+        self.assertTrue(self.scheduler.put(client, self.handle, "other", key="other"))
+
+        yield tornado.gen.moment
+        self.assertEqual(["info", "other"], self.handled)
+
+        # The first call has been handled, so the key is free again.
+        self.assertTrue(self.scheduler.put(client, self.handle, "info", key="info"))
@@ -1,7 +1,5 @@
+import json
 from unittest import TestCase
-from tornado.testing import AsyncTestCase, gen_test
-import tornado.gen
-import tornado.concurrent
 
 from base.tools import *
 
@@ -43,33 +41,9 @@ class DecoratorTest(TestCase):
         self.assertEqual(["b_decorator", "a_decorator"], foo.decorators)
 
 
-class TestCoroutine(AsyncTestCase):
-    @gen_test
-    def test_coroutine(self):
-        @coroutine
-        def test_func():
-            yield tornado.gen.moment
-            return 2
-
-        f = test_func()
-
-        self.assertTrue(isinstance(f, tornado.concurrent.Future))
-
-        r = yield f
-
-        self.assertEqual(2, r)
-
-    def test_decoration(self):
-        @coroutine
-        def foo():
-            pass
-
-        self.assertTrue(hasattr(foo, "decorators"))
-        self.assertEqual(["coroutine"], foo.decorators)
-
+class TestCoroutine(TestCase):
     def test_iscoroutine(self):
-        @coroutine
-        def test_func():
+        async def test_func():
             pass
 
         self.assertTrue(iscoroutine(test_func))
@@ -170,3 +144,14 @@ class TestAOrNumber(TestCase):
         self.assertEqual(0, a_or_number(0, "xx"))
         self.assertEqual("xx", a_or_number(1, "xx"))
         self.assertEqual(2, a_or_number(2, "xx"))
+
+
+class TestJsonForScript(TestCase):
+    def test_escaping(self):
+        encoded = json_for_script({"html": "</script><!-- & \u2028"})
+
+        self.assertNotIn("<", encoded)
+        self.assertNotIn(">", encoded)
+        self.assertNotIn("&", encoded)
+        self.assertNotIn("\u2028", encoded)
+        self.assertEqual({"html": "</script><!-- & \u2028"}, json.loads(encoded))
@@ -0,0 +1,58 @@
+import unittest
+
+from games.base.card_sets import *
+from games.base.playing_cards import get_cards, SPADE, HEART, CLUB
+
+
+class HelpersTestCase(unittest.TestCase):
+    def test_popcount(self):
+        self.assertEqual(0, popcount(0))
+        self.assertEqual(3, popcount(0b10101))
+
+    def test_iter_bits(self):
+        self.assertEqual([], list(iter_bits(0)))
+        self.assertEqual([0, 2, 4, 10], list(iter_bits(0b10000010101)))
+
+
+class DeckIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cards = get_cards({"A": 11, "10": 10, "K": 4, "Q": 3, "J": 2})
+        self.index = PlayingCardDeckIndex(self.cards)
+
+    def test_bits(self):
+        self.assertEqual(2**20 - 1, self.index.all)
+        self.assertEqual(self.index.all, self.index.mask(self.cards))
+        for i, card in enumerate(self.cards):
+            self.assertEqual(1 << i, self.index.bit(card))
+            self.assertEqual(i, self.index.position(card))
+
+    def test_roundtrip(self):
+        some = [self.cards[3], self.cards[7], self.cards[19]]
+        mask = self.index.mask(some)
+
+        self.assertEqual(3, popcount(mask))
+        self.assertEqual(some, self.index.get_cards(mask))
+        self.assertEqual([c.id for c in some], self.index.ids(mask))
+        self.assertEqual(mask, self.index.mask_of_ids(c.id for c in some))
+
+    def test_filter(self):
+        cards = [self.cards[5], self.cards[1], self.cards[9]]
+        mask = self.index.mask([self.cards[9], self.cards[5], self.cards[0]])
+
+        self.assertEqual([self.cards[5], self.cards[9]], self.index.filter(cards, mask))
+
+    def test_suit_and_rank_masks(self):
+        self.assertEqual(self.index.mask(self.cards.filter(suit=HEART)), self.index.suit_masks[HEART])
+        self.assertEqual(self.index.mask(self.cards.filter(rank="Q")), self.index.rank_masks["Q"])
+        self.assertEqual(self.index.all, sum(self.index.suit_masks.values()))
+
+    def test_value(self):
+        self.assertEqual(120, self.index.value(self.index.all))
+        self.assertEqual(30, self.index.value(self.index.suit_masks[SPADE]))
+
+    def test_higher(self):
+        queen = self.cards.filter(rank="Q", suit=CLUB)[0]
+        higher = self.index.higher[self.index.position(queen)]
+
+        self.assertEqual({"A", "10", "K"}, {c.rank for c in self.index.get_cards(higher)})
+        self.assertEqual({CLUB}, {c.suit for c in self.index.get_cards(higher)})
@@ -1,6 +1,11 @@
+import random
 import unittest
 from unittest.mock import Mock
 
+from tornado.testing import AsyncTestCase, gen_test
+import tornado.ioloop
+import tornado.gen
+
 from games.base.cards import *
 
 
@@ -15,6 +20,71 @@ class CardsTestCase(unittest.TestCase):
         self.assertEqual(loc, c.location)
         c._on_location_change.assert_called_once_with()
 
+    def test_location_hook_subclass(self):
+        class HookedCard(Card):
+            def __init__(self):
+                super().__init__()
+                self.changes = 0
+
+            def _on_location_change(self):
+                self.changes += 1
+
+        c = HookedCard()
+        c.location = object()
+
+        self.assertEqual(1, c.changes)
+        self.assertFalse(Card._has_location_hook)
+
+
+class InvariantChecksTestCase(unittest.TestCase):
+    def tearDown(self):
+        set_invariant_checks(True)
+
+    def test_global(self):
+        self.assertTrue(set_invariant_checks(False))
+        c = Card()
+        coll = CardCollection([c])
+
+        coll.append(c)
+
+        self.assertEqual(2, len(coll))
+        self.assertFalse(set_invariant_checks(True))
+        with self.assertRaises(AssertionError):
+            coll.append(c)
+
+    def test_instance(self):
+        c = Card()
+        coll = LocationCardCollection([c])
+        coll.checked = False
+
+        coll.append(c)
+
+        self.assertEqual(2, len(coll))
+        with self.assertRaises(AssertionError):
+            LocationCardCollection([c])  # other collections still check that c has no location
+
+    def test_game(self):
+        game = Mock()
+        game.check_invariants = False
+        c = Card()
+        deck = Deck(game, [c])
+
+        deck.append(c)
+
+        self.assertEqual(2, len(deck))
+        game.check_invariants = None
+        self.assertTrue(Deck(game).checked)
+
+    def test_player(self):
+        player = Mock()
+        player.game.check_invariants = False
+        c = Card()
+        coll = PlayerRelatedCardCollection(player, [c])
+
+        coll.append(c)
+
+        self.assertEqual(2, len(coll))
+
 
 class CardCollectionTest(unittest.TestCase):
     def test_init_empty(self):
@@ -152,6 +222,16 @@ class CardCollectionTest(unittest.TestCase):
         else:
             raise AssertionError("Shuffle does not seem to be random.")
 
+    def test_shuffle_rng(self):
+        cards = [Card() for i in range(10)]
+        coll1 = CardCollection(cards)
+        coll2 = CardCollection(cards)
+
+        coll1.shuffle(random.Random(5))
+        coll2.shuffle(random.Random(5))
+
+        self.assertEqual(list(coll1), list(coll2))
+
     def test_setitem(self):
         c1, c2, c3 = Card(), Card(), Card()
         coll = LocationCardCollection([c1, c2])
@@ -395,6 +475,212 @@ class LocationCardCollectionTest(unittest.TestCase):
             raise AssertionError("Shuffle does not seem to be random.")
 
 
+class IndexedCardCollectionTest(unittest.TestCase):
+    def _get_cards(self, amount):
+        cards = [Card() for _ in range(amount)]
+        for i, card in enumerate(cards):
+            card.id = "c{}".format(i)
+        return cards
+
+    def test_init_from(self):
+        c1, c2 = self._get_cards(2)
+        coll = IndexedCardCollection([c1, c2])
+
+        self.assertEqual([c1, c2], list(coll))
+        self.assertIn(c1, coll)
+        self.assertEqual(c2, coll.get_by_id("c1"))
+
+    def test_append(self):
+        c1, c2 = self._get_cards(2)
+        coll = IndexedCardCollection([c1])
+
+        coll.append(c2)
+
+        self.assertIn(c2, coll)
+        self.assertEqual(c2, coll.get_by_id("c1"))
+        with self.assertRaises(AssertionError):
+            coll.append(c1)
+
+    def test_extend(self):
+        c1, c2, c3 = self._get_cards(3)
+        coll = IndexedCardCollection([c1])
+
+        coll.extend(c for c in [c2, c3])
+
+        self.assertEqual([c1, c2, c3], list(coll))
+        self.assertEqual(c3, coll.get_by_id("c2"))
+        with self.assertRaises(AssertionError):
+            coll.extend([c1])
+
+    def test_insert(self):
+        c1, c2 = self._get_cards(2)
+        coll = IndexedCardCollection([c1])
+
+        coll.insert(0, c2)
+
+        self.assertEqual([c2, c1], list(coll))
+        self.assertIn(c2, coll)
+        with self.assertRaises(AssertionError):
+            coll.insert(0, c1)
+
+    def test_remove(self):
+        c1, c2 = self._get_cards(2)
+        coll = IndexedCardCollection([c1, c2])
+
+        coll.remove(c1)
+
+        self.assertNotIn(c1, coll)
+        with self.assertRaises(KeyError):
+            coll.get_by_id("c0")
+        coll.append(c1)
+        self.assertEqual([c2, c1], list(coll))
+
+    def test_pop(self):
+        c1, c2 = self._get_cards(2)
+        coll = IndexedCardCollection([c1, c2])
+
+        self.assertEqual(c2, coll.pop())
+        self.assertEqual(c1, coll.pop(0))
+        self.assertNotIn(c1, coll)
+        self.assertNotIn(c2, coll)
+
+    def test_delitem(self):
+        c1, c2, c3 = self._get_cards(3)
+        coll = IndexedCardCollection([c1, c2, c3])
+
+        del coll[0]
+        self.assertNotIn(c1, coll)
+        del coll[-2:]
+        self.assertEqual(0, len(coll))
+        self.assertNotIn(c2, coll)
+        self.assertNotIn(c3, coll)
+
+    def test_clear(self):
+        c1, c2 = self._get_cards(2)
+        coll = IndexedCardCollection([c1, c2])
+
+        coll.clear()
+
+        self.assertNotIn(c1, coll)
+        with self.assertRaises(KeyError):
+            coll.get_by_id("c1")
+
+    def test_setitem(self):
+        c1, c2, c3 = self._get_cards(3)
+        coll = IndexedCardCollection([c1, c2])
+
+        coll[0] = c3
+        self.assertNotIn(c1, coll)
+        self.assertEqual(c3, coll.get_by_id("c2"))
+
+        # Swapping cards must not drop them from the index.
+        coll[0], coll[1] = coll[1], coll[0]
+        self.assertEqual([c2, c3], list(coll))
+        self.assertIn(c2, coll)
+        self.assertIn(c3, coll)
+
+    def test_unchecked_duplicates(self):
+        c1, c2 = self._get_cards(2)
+        coll = IndexedCardCollection([c1])
+        coll.checked = False
+        coll.append(c1)
+
+        coll[0] = c2
+        self.assertIn(c1, coll)
+        self.assertEqual(c1, coll.get_by_id("c0"))
+
+        coll.remove(c1)
+        self.assertNotIn(c1, coll)
+        with self.assertRaises(KeyError):
+            coll.get_by_id("c0")
+
+    def test_setitem_slice(self):
+        c1, c2, c3 = self._get_cards(3)
+        coll = IndexedCardCollection([c1, c2])
+
+        coll[:] = [c3, c1]
+
+        self.assertNotIn(c2, coll)
+        self.assertEqual(c3, coll.get_by_id("c2"))
+
+    def test_shuffle(self):
+        cards = self._get_cards(20)
+        coll = IndexedCardCollection(cards)
+
+        coll.shuffle(random.Random(1))
+
+        self.assertNotEqual(cards, list(coll))
+        self.assertEqual(set(cards), set(coll))
+        self.assertTrue(all(card in coll for card in cards))
+
+    def test_get_by_ids(self):
+        c1, c2, c3 = self._get_cards(3)
+        coll = IndexedCardCollection([c1, c2, c3])
+
+        self.assertEqual([c1, c3], coll.get_by_ids("c0", "c2"))
+        self.assertEqual([c3, c1], coll.get_by_ids("c2", "c0"))
+        self.assertEqual([], coll.get_by_ids())
+        with self.assertRaises(KeyError):
+            coll.get_by_ids("c0", "x")
+        with self.assertRaises(KeyError):
+            coll.get_by_ids(["c0", "x"])
+        self.assertIsInstance(coll.get_by_ids("c0"), CardCollection)
+
+    def test_get_except_ids(self):
+        c1, c2, c3 = self._get_cards(3)
+        coll = IndexedCardCollection([c1, c2, c3])
+
+        self.assertEqual([c1, c3], coll.get_except_ids("c1"))
+        self.assertEqual([c1, c2, c3], coll.get_except_ids("x"))
+
+    def test_location(self):
+        c1, c2 = self._get_cards(2)
+        coll = IndexedLocationCardCollection([c1])
+
+        coll.append(c2)
+        self.assertEqual(coll, c2.location)
+        self.assertEqual(c2, coll.get_by_id("c1"))
+
+        coll.shuffle()
+        self.assertEqual(coll, c1.location)
+
+        coll.remove(c1)
+        self.assertIsNone(c1.location)
+        self.assertNotIn(c1, coll)
+
+
+class CardCollectionSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.cards = [Card() for _ in range(4)]
+        for i, card in enumerate(self.cards):
+            card.id = "c{}".format(i)
+        self.sync = CardCollectionSync()
+
+    def test_first_update(self):
+        self.assertEqual({"reset": ["c0", "c1"]}, self.sync.update(self.cards[:2]))
+
+    def test_delta(self):
+        c0, c1, c2, c3 = self.cards
+        self.sync.update([c0, c1, c2])
+
+        self.assertEqual({"add": [], "remove": []}, self.sync.update([c0, c1, c2]))
+        self.assertEqual({"add": [c3.id], "remove": [c1.id]}, self.sync.update([c0, c2, c3]))
+        self.assertEqual({"add": [], "remove": [c0.id, c2.id, c3.id]}, self.sync.update([]))
+
+    def test_reorder(self):
+        c0, c1, c2, c3 = self.cards
+        self.sync.update([c0, c1])
+
+        self.assertEqual({"reset": [c2.id, c0.id, c1.id]}, self.sync.update([c2, c0, c1]))
+        self.assertEqual({"reset": [c1.id, c2.id]}, self.sync.update([c1, c2]))
+
+    def test_reset(self):
+        self.sync.update(self.cards[:2])
+        self.sync.reset()
+
+        self.assertEqual({"reset": ["c0", "c1", "c2"]}, self.sync.update(self.cards[:3]))
+
+
 class TestPlayerRelatedCardCollection(unittest.TestCase):
     def setUp(self):
         self.coll = PlayerRelatedCardCollection(Mock(), [Card(), Card()])
@@ -432,6 +718,41 @@ class TestPlayerRelatedCardCollection(unittest.TestCase):
         self.coll.remove(self.coll[0])
         self.coll._trigger_ui_update.assert_called_once_with()
 
+    def test_remove_collection(self):
+        self.coll.remove_collection(self.coll[:])
+        self.assertEqual(0, len(self.coll))
+        self.coll._trigger_ui_update.assert_called_once_with()
+
+    def test_batch(self):
+        with self.coll.batch():
+            self.coll.append(Card())
+            self.coll.pop(0)
+            self.coll.insert(0, Card())
+            self.assertFalse(self.coll._trigger_ui_update.called)
+        self.coll._trigger_ui_update.assert_called_once_with()
+
+    def test_batch_nested(self):
+        with self.coll.batch():
+            with self.coll.batch():
+                self.coll.append(Card())
+            self.assertFalse(self.coll._trigger_ui_update.called)
+            self.coll.append(Card())
+        self.coll._trigger_ui_update.assert_called_once_with()
+
+    def test_batch_unchanged(self):
+        with self.coll.batch():
+            pass
+        self.assertFalse(self.coll._trigger_ui_update.called)
+
+    def test_batch_exception(self):
+        with self.assertRaises(ValueError):
+            with self.coll.batch():
+                self.coll.append(Card())
+                raise ValueError()
+        self.coll._trigger_ui_update.assert_called_once_with()
+        self.coll.append(Card())
+        self.assertEqual(2, self.coll._trigger_ui_update.call_count)
+
     def test_copy(self):
         c1, c2 = Card(), Card()
         coll = PlayerRelatedCardCollection(Mock(), [c1, c2])
@@ -445,6 +766,40 @@ class TestPlayerRelatedCardCollection(unittest.TestCase):
         self.assertIn(c2, copy)
 
 
+class CoalescedPlayerRelatedCardCollectionTest(AsyncTestCase):
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    def setUp(self):
+        super().setUp()
+        self.coll = PlayerRelatedCardCollection(Mock(), [Card(), Card()])
+        self.coll.coalesce_ui_updates = True
+        self.coll._trigger_ui_update = Mock()
+
+    @gen_test
+    def test_coalesce(self):
+        self.coll.append(Card())
+        self.coll.pop()
+        self.coll.pop()
+        self.assertFalse(self.coll._trigger_ui_update.called)
+
+        yield tornado.gen.moment
+        self.coll._trigger_ui_update.assert_called_once_with()
+
+        self.coll.append(Card())
+        yield tornado.gen.moment
+        self.assertEqual(2, self.coll._trigger_ui_update.call_count)
+
+    @gen_test
+    def test_flush(self):
+        self.coll.append(Card())
+        self.coll.flush_ui_update()
+        self.coll._trigger_ui_update.assert_called_once_with()
+
+        yield tornado.gen.moment
+        self.coll._trigger_ui_update.assert_called_once_with()
+
+
 class DeckTestCase(unittest.TestCase):
     def test_extend_bottom(self):
         coll = Deck(Mock(), [Card(), Card()])
@@ -456,4 +811,55 @@ class DeckTestCase(unittest.TestCase):
         self.assertEqual(c1, coll[0])
         self.assertEqual(c2, coll[1])
         self.assertEqual(coll, c1.location)
-        self.assertEqual(coll, c2.location)
\ No newline at end of file
+        self.assertEqual(coll, c2.location)
+
+    def test_shuffle(self):
+        game = Mock()
+        game.random = random.Random(3)
+        cards = [Card() for i in range(10)]
+        coll = Deck(game, cards)
+
+        coll.shuffle()
+
+        expected = cards.copy()
+        random.Random(3).shuffle(expected)
+        self.assertEqual(expected, list(coll))
+
+    def test_extend_bottom_duplicate(self):
+        c = Card()
+        coll = Deck(Mock(), [c])
+
+        with self.assertRaises(AssertionError):
+            coll.extend_bottom([Card(), c])
+
+    def test_draw(self):
+        c1, c2, c3 = Card(), Card(), Card()
+        coll = Deck(Mock(), [c1, c2, c3])
+
+        card = coll.draw()
+
+        self.assertEqual(c3, card)
+        self.assertIsNone(c3.location)
+        self.assertEqual([c1, c2], list(coll))
+
+    def test_draw_collection(self):
+        c1, c2, c3 = Card(), Card(), Card()
+        coll = Deck(Mock(), [c1, c2, c3])
+
+        cards = coll.draw(2)
+
+        self.assertIsInstance(cards, CardCollection)
+        self.assertNotIsInstance(cards, LocationCardCollection)
+        self.assertEqual([c2, c3], list(cards))
+        self.assertIsNone(c2.location)
+        self.assertIsNone(c3.location)
+        self.assertEqual([c1], list(coll))
+        self.assertEqual([c1], list(coll.draw(collection=True)))
+
+    def test_draw_too_many(self):
+        c1, c2 = Card(), Card()
+        coll = Deck(Mock(), [c1, c2])
+
+        self.assertEqual([c1, c2], list(coll.draw(5)))
+        self.assertIsNone(coll.draw())
+        self.assertEqual([], coll.draw(collection=True))
@@ -2,9 +2,9 @@ from unittest import TestCase
 from tornado.testing import AsyncTestCase, gen_test
 from unittest.mock import Mock, MagicMock, call
 
-import tornado.concurrent
-import tornado.gen
+import asyncio
 from base.client import MockClient
+import tornado.gen
 from base.tools import iscoroutine
 
 from games.base.game import Game, Player, WaitingMessagesManager, activity, activity_with_message
@@ -39,7 +39,7 @@ class PlayerTestCase(TestCase):
         game.waiting_messages_manager.end_activity.assert_called_once_with(player)
 
         game.waiting_messages_manager.end_activity.reset_mock()
-        player.end_activity(tornado.concurrent.Future())
+        player.end_activity(asyncio.Future())
 
         game.waiting_messages_manager.end_activity.assert_called_once_with(player)
 
@@ -47,10 +47,12 @@ class PlayerTestCase(TestCase):
 class ActivityDecoratorTest(AsyncTestCase):
     @gen_test
     def test_default(self):
+        proceed = asyncio.Future()
+
         class TestPlayer(Mock):
             @activity
-            def foo(self):
-                yield tornado.gen.moment
+            async def foo(self):
+                await proceed
                 return 2
 
         player = TestPlayer()
@@ -60,23 +62,26 @@ class ActivityDecoratorTest(AsyncTestCase):
         self.assertTrue(iscoroutine(player.foo))
         self.assertIn("activity", player.foo.decorators)
 
-        f = player.foo()
+        f = asyncio.ensure_future(player.foo())
+        yield tornado.gen.moment
 
-        self.assertTrue(isinstance(f, tornado.concurrent.Future))
         player.start_activity.assert_called_once_with(None)
         self.assertFalse(player.end_activity.called)
 
+        proceed.set_result(None)
         r = yield f
 
         self.assertEqual(2, r)
-        player.end_activity.assert_called_once_with(f)
+        player.end_activity.assert_called_once_with()
 
     @gen_test
     def test_override_message(self):
+        proceed = asyncio.Future()
+
         class TestPlayer(Mock):
             @activity_with_message("Foo")
-            def foo(self):
-                yield tornado.gen.moment
+            async def foo(self):
+                await proceed
                 return 2
 
         player = TestPlayer()
@@ -86,16 +91,63 @@ class ActivityDecoratorTest(AsyncTestCase):
         self.assertTrue(iscoroutine(player.foo))
         self.assertIn("activity", player.foo.decorators)
 
-        f = player.foo()
+        f = asyncio.ensure_future(player.foo())
+        yield tornado.gen.moment
 
-        self.assertTrue(isinstance(f, tornado.concurrent.Future))
         player.start_activity.assert_called_once_with("Foo")
         self.assertFalse(player.end_activity.called)
 
+        proceed.set_result(None)
         r = yield f
 
         self.assertEqual(2, r)
-        player.end_activity.assert_called_once_with(f)
+        player.end_activity.assert_called_once_with()
+
+    @gen_test
+    def test_function_returning_future(self):
+        future = asyncio.Future()
+
+        class TestPlayer(Mock):
+            @activity
+            def foo(self):
+                return future
+
+        player = TestPlayer()
+        player.start_activity = Mock()
+        player.end_activity = Mock()
+
+        f = asyncio.ensure_future(player.foo())
+        yield tornado.gen.moment
+        self.assertFalse(player.end_activity.called)
+
+        future.set_result(2)
+        r = yield f
+
+        self.assertEqual(2, r)
+        player.end_activity.assert_called_once_with()
+
+
+class GameTestCase(TestCase):
+    def test_seed(self):
+        clients = [MockClient(i, "Client {}".format(i)) for i in range(5)]
+        game = Game("dummy", clients, seed=123)
+
+        self.assertEqual(123, game.seed)
+        order = [p.client.id for p in game.players]
+
+        for c in clients:
+            c.location = None
+        other = Game("dummy", clients, seed=123)
+
+        self.assertEqual(order, [p.client.id for p in other.players])
+        self.assertEqual(game.random.random(), other.random.random())
+
+    def test_random_seed(self):
+        game1 = Game("dummy", [MockClient(1)])
+        game2 = Game("dummy", [MockClient(2)])
+
+        self.assertIsNotNone(game1.seed)
+        self.assertNotEqual(game1.seed, game2.seed)
 
 
 # noinspection PyUnresolvedReferences
@@ -0,0 +1,22 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from configuration import config
+from games.base.log import Log
+
+
+class LogTestCase(TestCase):
+    def test_render_to_file(self):
+        with tempfile.TemporaryDirectory() as path:
+            config.maps.insert(0, {"game_log_path": path})
+            try:
+                log = Log([])
+                first = log.render_to_file(game="test")
+                second = log.render_to_file(game="test")
+            finally:
+                del config.maps[0]
+
+            self.assertNotEqual(first, second)
+            self.assertTrue(first.startswith("test_"))
+            self.assertTrue(os.path.isfile(os.path.join(path, first)))
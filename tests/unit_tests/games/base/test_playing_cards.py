@@ -49,6 +49,35 @@ class CardTestCase(unittest.TestCase):
             Card(object(), SPADE)
 
 
+class CardFaceTestCase(unittest.TestCase):
+    def test_shared(self):
+        self.assertIs(Card("K", HEART).face, Card("K", HEART).face)
+        self.assertIs(get_face(10, CLUB), get_face("10", CLUB))
+        self.assertIsNot(get_face("K", HEART), get_face("Q", HEART))
+
+    def test_get_face_by_id(self):
+        card = Card("Q", DIAMOND)
+        self.assertIs(card.face, get_face_by_id(card.id))
+        with self.assertRaises(KeyError):
+            get_face_by_id("x")
+
+    def test_immutable(self):
+        face = get_face("A", SPADE)
+        with self.assertRaises(AttributeError):
+            face.rank = "K"
+        with self.assertRaises(AttributeError):
+            face.foo = 1
+
+    def test_card(self):
+        card = Card("J", CLUB, value=2)
+        self.assertEqual("J", card.rank)
+        self.assertEqual(CLUB, card.suit)
+        self.assertEqual(str(card.face), str(card))
+        self.assertIn('id="♣J"', str(card))
+        self.assertEqual(hash(Card("J", CLUB)), hash(card))
+        self.assertNotEqual(Card("J", SPADE), card)
+
+
 class DeckCreationTestCase(unittest.TestCase):
     def test_schnapsen(self):
         cards = get_cards({"A": 11, "10": 10, "K": 4, "Q": 3, "J": 2})
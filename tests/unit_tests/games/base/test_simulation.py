@@ -0,0 +1,83 @@
+import asyncio
+from unittest import TestCase
+from tornado.testing import AsyncTestCase
+
+from games.base.game import Game
+from games.base.log import Log
+from games.base.simulation import Simulation, SimulationError, SimulatedClient, ScriptedPolicy
+
+
+class DummyGame(Game):
+    def __init__(self, clients, finish=True):
+        super().__init__("dummy", clients)
+        self.log = Log(self.players)
+        self.answers = {}
+        self.finish = finish
+        self.start(self.run)
+
+    async def run(self):
+        for player in self.players:
+            self.answers[player.client.id] = await player.client.query("dummy.ask", question="Foo?")
+        if not self.finish:
+            await asyncio.Future()
+        self.running = False
+        self.do_game_end(self.players[0])
+
+    def get_game_ui_update_command(self):
+        return None
+
+    def _write_log(self):
+        return None
+
+
+class SimulatedClientTestCase(AsyncTestCase):
+    def test_query(self):
+        calls = []
+
+        def policy(client, command, parameters):
+            calls.append((client, command, parameters))
+            return 42
+
+        client = SimulatedClient(policy, 3)
+        result = self.io_loop.run_sync(lambda: client.query("foo", bar="baz"))
+
+        self.assertEqual(42, result)
+        self.assertEqual([(client, "foo", {"bar": "baz"})], calls)
+        self.assertEqual(3, client.id)
+
+    def test_scripted_policy(self):
+        policy = ScriptedPolicy([1, "a", {"b": 2}])
+
+        self.assertEqual(1, policy(None, "x", {}))
+        self.assertEqual("a", policy(None, "x", {}))
+        self.assertEqual({"b": 2}, policy(None, "x", {}))
+        with self.assertRaises(IndexError):
+            policy(None, "x", {})
+
+
+class SimulationTestCase(AsyncTestCase):
+    def test_play(self):
+        simulation = Simulation(DummyGame, [ScriptedPolicy(["a"]), ScriptedPolicy(["b"])])
+
+        game = simulation.play()
+
+        self.assertFalse(game.running)
+        self.assertEqual({0: "a", 1: "b"}, game.answers)
+        self.assertEqual([game.players[0]], game.winners)
+        self.assertEqual(1, simulation.games_played)
+
+    def test_play_unfinished(self):
+        simulation = Simulation(lambda clients: DummyGame(clients, finish=False),
+                                [ScriptedPolicy(["a"]), ScriptedPolicy(["b"])])
+
+        with self.assertRaises(SimulationError):
+            simulation.play()
+
+    def test_run(self):
+        simulation = Simulation(DummyGame, lambda number: [ScriptedPolicy([number]), ScriptedPolicy([-number])])
+
+        results = simulation.run(5, lambda game: game.answers)
+
+        self.assertEqual([{0: i, 1: -i} for i in range(5)], results)
+        self.assertEqual(5, simulation.games_played)
+        self.assertGreater(simulation.games_per_second, 0)
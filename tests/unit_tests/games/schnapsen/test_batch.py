@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+from games.schnapsen.batch import Aggregate, Record, get_chunks, play_chunk, play_game, run_batch, get_game_seed
+from games.schnapsen.simulation import get_result
+
+
+def without_duration(records):
+    return sorted(record[:-1] for record in records)
+
+
+class BatchTestCase(TestCase):
+    def test_game_seed(self):
+        self.assertNotEqual(get_game_seed(0, 1), get_game_seed(1, 1))
+        self.assertNotEqual(get_game_seed(1, 0), get_game_seed(1, 1))
+
+    def test_chunks(self):
+        self.assertEqual(
+            [(3, 0, 4, 0.5), (3, 4, 4, 0.5), (3, 8, 2, 0.5)],
+            get_chunks(10, 3, 4, 0.5)
+        )
+
+    def test_deterministic(self):
+        first = play_chunk((7, 0, 20, 0.1))
+        second = play_chunk((7, 0, 20, 0.1))
+
+        self.assertEqual(20, len(first))
+        self.assertEqual(without_duration(first), without_duration(second))
+        self.assertNotEqual(without_duration(first), without_duration(play_chunk((8, 0, 20, 0.1))))
+
+    def test_replay(self):
+        records = play_chunk((5, 10, 5, 0.1))
+        record = records[3]
+
+        game = play_game(5, record.number)
+
+        winner, points, tricks = get_result(game)
+        self.assertEqual((record.winner, record.points_0, record.points_1, record.tricks),
+                         (winner, points[0], points[1], tricks))
+
+    def test_process_pool(self):
+        serial = []
+        parallel = []
+
+        run_batch(30, 2, processes=1, chunk_size=7, on_record=serial.append)
+        aggregate = run_batch(30, 2, processes=2, chunk_size=7, on_record=parallel.append)
+
+        self.assertEqual(30, aggregate.games)
+        self.assertEqual(list(range(30)), sorted(r.number for r in parallel))
+        self.assertEqual(without_duration(serial), without_duration(parallel))
+
+
+class AggregateTestCase(TestCase):
+    def test_add(self):
+        aggregate = Aggregate()
+        aggregate.add(Record(0, 0, 70, 20, 6, 0.5))
+        aggregate.add(Record(1, 1, 30, 66, 6, 0.25))
+        aggregate.add(Record(2, 0, 80, 0, 5, 0.25))
+
+        self.assertEqual(3, aggregate.games)
+        self.assertEqual([2, 1], aggregate.wins)
+        self.assertEqual([180, 86], aggregate.points)
+        self.assertEqual({6: 2, 5: 1}, aggregate.tricks)
+        self.assertEqual(1, aggregate.cpu_time)
+        self.assertIn("Games:", str(aggregate))
@@ -0,0 +1,93 @@
+import asyncio
+import random
+from unittest import TestCase
+
+from base.client import BotClient
+from games.base.card_sets import PlayingCardDeckIndex
+from games.base.playing_cards import get_cards, SPADE, HEART, DIAMOND, CLUB
+from games.base.simulation import SimulatedClient
+from games.schnapsen.bot import Solver, BotPlayer, WIN, choose_card, sample
+from games.schnapsen.game import CARD_VALUES
+from games.schnapsen.moves import MoveGenerator
+from games.schnapsen.simulation import SimulatedGame, RandomPolicy
+
+
+class SolverTestCase(TestCase):
+    def setUp(self):
+        self.index = PlayingCardDeckIndex(get_cards(CARD_VALUES))
+        self.moves = MoveGenerator(self.index, HEART)
+
+    def pos(self, rank, suit):
+        return self.index.positions[suit.symbol + rank]
+
+    def mask(self, *cards):
+        return self.index.mask_of_ids(suit.symbol + rank for rank, suit in cards)
+
+    def test_lose_last_trick(self):
+        solver = Solver(self.moves, (), None, 20)
+        state = (self.mask(("J", SPADE)), self.mask(("A", SPADE)), 0, 30, 30, 0, -1)
+
+        self.assertEqual(-WIN, solver.evaluate(state, self.pos("J", SPADE)))
+
+    def test_marriage(self):
+        solver = Solver(self.moves, (), None, 20)
+        state = (self.mask(("Q", CLUB), ("K", CLUB)), self.mask(("A", SPADE), ("10", SPADE)), 0, 50, 0, 0, -1)
+
+        self.assertEqual(WIN, solver.evaluate(state, self.pos("Q", CLUB)))
+
+    def test_follow_rules(self):
+        solver = Solver(self.moves, (), None, 20)
+        hand = self.mask(("K", SPADE), ("A", SPADE), ("J", HEART), ("Q", CLUB))
+
+        self.assertEqual(self.mask(("A", SPADE)), solver.legal_moves(hand, self.pos("10", SPADE), 0))
+        self.assertEqual(self.mask(("J", HEART)), solver.legal_moves(hand, self.pos("A", DIAMOND), 0))
+        self.assertEqual(hand, solver.legal_moves(hand, -1, 0))
+        self.assertEqual(hand, Solver(self.moves, (1, 2), None, 20).legal_moves(hand, self.pos("10", SPADE), 0))
+
+    def test_choose_card(self):
+        # Leading the trump ace only gives 63 points and then the opponent takes the last trick.
+        # Leading the jack makes the opponent take the first trick and lets us trump the last one.
+        hand = self.mask(("A", HEART), ("J", SPADE))
+        position = {
+            "hand": hand,
+            "moves": hand,
+            "lead": -1,
+            "unknown": self.mask(("A", SPADE), ("J", CLUB)),
+            "opponent_cards": 2,
+            "stock_size": 0,
+            "bottom": None,
+            "closer": None,
+            "points": 50,
+            "opponent_points": 0,
+        }
+
+        self.assertEqual(self.pos("J", SPADE), choose_card(self.moves, position, 0, seed=0, max_samples=1))
+
+    def test_sample(self):
+        position = {
+            "unknown": self.mask(("A", SPADE), ("J", CLUB), ("K", CLUB), ("Q", CLUB), ("10", CLUB)),
+            "opponent_cards": 2,
+            "stock_size": 4,
+            "bottom": self.pos("A", HEART),
+        }
+
+        opponent, stock = sample(position, random.Random(0))
+
+        self.assertEqual(2, bin(opponent).count("1"))
+        self.assertEqual(4, len(stock))
+        self.assertEqual(self.pos("A", HEART), stock[-1])
+        self.assertFalse(opponent & self.index.mask(self.index.cards[i] for i in stock))
+
+
+class BotPlayerTestCase(TestCase):
+    def test_games(self):
+        wins = 0
+        for i in range(10):
+            bot = BotClient(time_budget=0, inline=True)
+            game = SimulatedGame([SimulatedClient(RandomPolicy(random.Random(i), 0.2)), bot], seed=i)
+            self.assertIsInstance(game.get_player_by_client(bot), BotPlayer)
+            asyncio.get_event_loop().run_until_complete(game.task)
+
+            self.assertFalse(game.running)
+            wins += isinstance(game.winners[0], BotPlayer)
+        self.assertGreater(wins, 5)
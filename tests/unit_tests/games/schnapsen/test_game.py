@@ -0,0 +1,182 @@
+import random
+import unittest
+from unittest.mock import Mock, patch
+
+from base.client import MockClient
+from games.base.card_sets import PlayingCardDeckIndex
+from games.base.playing_cards import get_cards, SUITS, SPADE, HEART, DIAMOND, CLUB
+from games.schnapsen.game import Game, Player, CARD_HTML, BUMMERL_POINTS, MOVE_GENERATORS, get_game_points
+from games.schnapsen.moves import MoveGenerator
+from games.schnapsen.simulation import SimulatedGame, get_simulation
+
+
+class PlayerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cards = get_cards({"A": 11, "10": 10, "K": 4, "Q": 3, "J": 2})
+        self.game = Mock()
+        self.game.card_index = PlayingCardDeckIndex(self.cards)
+        self.game.trump = HEART
+        self.game.moves = MoveGenerator(self.game.card_index, HEART)
+        self.game.deck.open_card = None
+        self.player = Player(MockClient(), self.game)
+        self.player.trigger_private_ui_update = Mock()
+
+    def card(self, rank, suit):
+        return self.cards.filter(rank=rank, suit=suit)[0]
+
+    def give(self, *cards):
+        self.player.hand.extend(cards)
+
+    def test_follow_higher(self):
+        self.give(self.card("A", SPADE), self.card("J", SPADE), self.card("Q", HEART))
+
+        options, cards = self.player._get_follow_options(self.card("10", SPADE))
+
+        self.assertEqual([], options)
+        self.assertEqual([self.card("A", SPADE)], cards)
+
+    def test_follow_suit(self):
+        self.give(self.card("K", SPADE), self.card("J", SPADE), self.card("Q", HEART))
+
+        options, cards = self.player._get_follow_options(self.card("10", SPADE))
+
+        self.assertEqual([self.card("K", SPADE), self.card("J", SPADE)], cards)
+
+    def test_follow_trump(self):
+        self.give(self.card("K", CLUB), self.card("J", HEART), self.card("Q", HEART))
+
+        options, cards = self.player._get_follow_options(self.card("10", SPADE))
+
+        self.assertEqual([self.card("J", HEART), self.card("Q", HEART)], cards)
+
+    def test_follow_anything(self):
+        self.give(self.card("K", CLUB), self.card("J", DIAMOND))
+
+        options, cards = self.player._get_follow_options(self.card("10", SPADE))
+
+        self.assertEqual([self.card("K", CLUB), self.card("J", DIAMOND)], list(cards))
+
+    def test_follow_open_stock(self):
+        self.game.deck.open_card = self.card("A", HEART)
+        self.give(self.card("K", CLUB), self.card("J", SPADE))
+
+        options, cards = self.player._get_follow_options(self.card("10", SPADE))
+
+        self.assertEqual([self.card("K", CLUB), self.card("J", SPADE)], list(cards))
+
+    def test_marriages(self):
+        self.give(self.card("K", CLUB), self.card("Q", CLUB), self.card("Q", SPADE), self.card("K", HEART))
+
+        self.assertEqual([CLUB], self.player.available_marriages())
+
+        self.give(self.card("Q", HEART))
+
+        self.assertEqual({CLUB, HEART}, set(self.player.available_marriages()))
+
+    def test_hand_update(self):
+        self.give(self.card("A", SPADE), self.card("J", SPADE))
+        cmd = self.player._get_private_ui_update_command()
+        self.assertEqual({"reset": ["♠A", "♠J"]}, cmd["hand"])
+
+        self.player.hand.remove(self.card("A", SPADE))
+        self.give(self.card("Q", HEART))
+        cmd = self.player._get_private_ui_update_command()
+        self.assertEqual({"add": ["♥Q"], "remove": ["♠A"]}, cmd["hand"])
+
+        self.player.hand_sync.reset()
+        cmd = self.player._get_private_ui_update_command()
+        self.assertEqual({"reset": ["♠J", "♥Q"]}, cmd["hand"])
+
+    def test_reset(self):
+        self.give(self.card("A", SPADE), self.card("J", SPADE))
+        self.player.points = 12
+        self.player.trigger_private_ui_update.reset_mock()
+
+        self.player.reset()
+
+        self.player.trigger_private_ui_update.assert_called_once_with()
+        self.assertEqual([], list(self.player.hand))
+        self.assertEqual(0, self.player.points)
+
+    def test_hand_mask(self):
+        index = self.game.card_index
+        ace, jack = self.card("A", SPADE), self.card("J", SPADE)
+        self.give(ace, jack)
+        self.assertEqual(index.mask([ace, jack]), self.player.hand_mask())
+
+        self.player.hand.remove(ace)
+        self.assertEqual(index.mask([jack]), self.player.hand_mask())
+
+        self.player.hand[0] = ace
+        self.assertEqual(index.mask([ace]), self.player.hand_mask())
+
+        del self.player.hand[0]
+        self.assertEqual(0, self.player.hand_mask())
+
+    def test_card_html(self):
+        self.assertEqual(20, len(CARD_HTML))
+        self.assertEqual(str(self.card("K", CLUB)), CARD_HTML[self.card("K", CLUB).id])
+
+
+class GamePointsTestCase(unittest.TestCase):
+    def test_game_points(self):
+        self.assertEqual(3, get_game_points(0, 0))
+        self.assertEqual(2, get_game_points(32, 2))
+        self.assertEqual(1, get_game_points(33, 3))
+
+    def test_deal(self):
+        game = Mock()
+        game.deck.closed = False
+        winner, loser = Mock(points=66), Mock(points=20, taken_cards=[1, 2])
+        self.assertEqual(2, Game.get_game_points(game, winner, loser))
+
+        # Winning with the last trick.
+        winner.points = 60
+        self.assertEqual(1, Game.get_game_points(game, winner, loser))
+
+    def test_closed(self):
+        game = Mock()
+        game.deck.closed = True
+        game.deck.opponent_points = 0
+        game.deck.opponent_tricks = 0
+        closer, other = Mock(points=70), Mock(points=40, taken_cards=[1, 2, 3, 4])
+        game.deck.closing_player = closer
+        self.assertEqual(3, Game.get_game_points(game, closer, other))
+
+        game.deck.opponent_tricks = 1
+        game.deck.opponent_points = 40
+        self.assertEqual(1, Game.get_game_points(game, closer, other))
+
+        # The closing player failed.
+        self.assertEqual(2, Game.get_game_points(game, other, closer))
+        game.deck.opponent_tricks = 0
+        self.assertEqual(3, Game.get_game_points(game, other, closer))
+
+
+class BummerlTestCase(unittest.TestCase):
+    def test_bummerl(self):
+        simulation = get_simulation(random.Random(0), option_probability=0.2, bummerl=True)
+        for i in range(10):
+            with patch.object(SimulatedGame, "_write_log", return_value=None) as write_log:
+                game = simulation.play(i, seed=i)
+
+            self.assertFalse(game.running)
+            write_log.assert_called_once_with()
+            winner = game.winners[0]
+            loser = [p for p in game.all_players if p is not winner][0]
+            self.assertGreaterEqual(winner.game_points, BUMMERL_POINTS)
+            self.assertLess(loser.game_points, BUMMERL_POINTS)
+            self.assertGreaterEqual(game.deal_number, 3)
+            self.assertIs(MOVE_GENERATORS[game.trump], game.moves)
+
+            # No cards got lost or duplicated over the deals.
+            cards = list(game.deck) + [c for p in game.all_players for c in list(p.hand) + list(p.taken_cards)]
+            self.assertEqual(20, len(cards))
+            self.assertEqual(20, len(set(cards)))
+            self.assertEqual(set(game.cards), set(cards))
+
+    def test_single_deal(self):
+        game = get_simulation(random.Random(0)).play(0, seed=0)
+
+        self.assertEqual(0, game.deal_number)
+        self.assertEqual([0, 0], [p.game_points for p in game.all_players])
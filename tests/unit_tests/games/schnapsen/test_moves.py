@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from games.base.card_sets import PlayingCardDeckIndex
+from games.base.playing_cards import get_cards, SPADE, HEART, DIAMOND, CLUB
+from games.schnapsen.game import CARD_VALUES
+from games.schnapsen.moves import MoveGenerator
+
+
+class MoveGeneratorTestCase(TestCase):
+    def setUp(self):
+        self.index = PlayingCardDeckIndex(get_cards(CARD_VALUES))
+        self.moves = MoveGenerator(self.index, HEART)
+
+    def pos(self, rank, suit):
+        return self.index.positions[suit.symbol + rank]
+
+    def mask(self, *cards):
+        return self.index.mask_of_ids(suit.symbol + rank for rank, suit in cards)
+
+    def test_follow(self):
+        hand = self.mask(("K", SPADE), ("A", SPADE), ("J", HEART), ("Q", CLUB))
+
+        self.assertEqual(self.mask(("A", SPADE)), self.moves.follow(hand, self.pos("10", SPADE), True))
+        self.assertEqual(self.mask(("K", SPADE), ("A", SPADE)), self.moves.follow(hand, self.pos("A", SPADE), True))
+        self.assertEqual(self.mask(("J", HEART)), self.moves.follow(hand, self.pos("A", DIAMOND), True))
+        self.assertEqual(hand, self.moves.follow(hand, self.pos("10", SPADE), False))
+
+    def test_follow_anything(self):
+        hand = self.mask(("K", SPADE), ("Q", CLUB))
+
+        self.assertEqual(hand, self.moves.follow(hand, self.pos("A", DIAMOND), True))
+
+    def test_exchange(self):
+        self.assertTrue(self.moves.can_exchange(self.mask(("J", HEART), ("A", SPADE))))
+        self.assertFalse(self.moves.can_exchange(self.mask(("J", SPADE), ("A", HEART))))
+
+    def test_marriages(self):
+        hand = self.mask(("K", SPADE), ("Q", SPADE), ("K", HEART), ("Q", CLUB))
+
+        self.assertEqual([SPADE.symbol], self.moves.available_marriages(hand))
+        self.assertEqual(self.mask(("K", SPADE)), self.moves.partner[self.pos("Q", SPADE)])
+        self.assertEqual(0, self.moves.partner[self.pos("A", SPADE)])
+        self.assertEqual(40, self.moves.marriage_points[self.pos("Q", HEART)])
+        self.assertEqual(20, self.moves.marriage_points[self.pos("Q", CLUB)])
+
+    def test_wins(self):
+        self.assertTrue(self.moves.wins(self.pos("10", SPADE), self.pos("A", SPADE)))
+        self.assertTrue(self.moves.wins(self.pos("A", SPADE), self.pos("J", HEART)))
+        self.assertFalse(self.moves.wins(self.pos("J", SPADE), self.pos("A", CLUB)))
+        self.assertFalse(self.moves.wins(self.pos("10", SPADE), self.pos("K", SPADE)))
+        self.assertFalse(self.moves.wins(self.pos("J", HEART), self.pos("A", SPADE)))
+        self.assertTrue(self.moves.wins(self.pos("J", HEART), self.pos("Q", HEART)))
@@ -0,0 +1,36 @@
+import random
+from unittest import TestCase
+
+from games.schnapsen.simulation import RandomPolicy, get_simulation, get_result
+
+
+class RandomPolicyTestCase(TestCase):
+    def test_cards(self):
+        policy = RandomPolicy(random.Random(0))
+        for i in range(20):
+            response = policy(None, "games.schnapsen.play_turn", {"options": [{"type": "close"}], "cards": ["a", "b"]})
+            self.assertEqual("card", response["type"])
+            self.assertIn(response["card"], ["a", "b"])
+
+    def test_options(self):
+        policy = RandomPolicy(random.Random(0), option_probability=1)
+        response = policy(None, "games.schnapsen.play_turn", {"options": [{"type": "close"}], "cards": ["a", "b"]})
+        self.assertEqual({"type": "close"}, response)
+
+
+class SimulationTestCase(TestCase):
+    def test_complete_games(self):
+        simulation = get_simulation(random.Random(0), option_probability=0.2)
+        for i in range(50):
+            winner, points, tricks = get_result(simulation.play(i))
+
+            self.assertIn(winner, (0, 1))
+            self.assertTrue(1 <= tricks <= 10)
+
+    def test_headless(self):
+        game = get_simulation(random.Random(0)).play(0)
+
+        self.assertTrue(game.headless)
+        self.assertEqual([], game.log.entries)
+        self.assertGreater(game.log.current_turn, 0)
+        self.assertFalse(game.waiting_messages_manager.active_players)
@@ -1,6 +1,7 @@
 from unittest import TestCase
 from unittest.mock import Mock
 
+from base.client import MockClient
 import games.lobby
 
 
@@ -36,3 +37,26 @@ class ProposalTestCast(TestCase):
         # too many
         with self.assertRaises(games.lobby.GameProposalCreationError):
             games.lobby.GameProposal(lobby, {Mock(), Mock(), Mock(), Mock()}, {})
+
+
+class LobbyTestCase(TestCase):
+    def test_membership(self):
+        lobby = games.lobby.Lobby("dummy")
+        lobby.presence._schedule_flush = Mock()
+        alice, bob = MockClient(1, "Alice"), MockClient(2, "Bob")
+
+        lobby.join(alice)
+        lobby.presence.flush()
+        lobby.join(bob)
+
+        init = [m for m in bob.messages if m["command"] == "games.lobby.init"][0]
+        self.assertEqual({1: "Alice"}, init["clients"])
+        self.assertEqual(1, init["version"])
+
+        lobby.presence.flush()
+        self.assertEqual({2: "Bob"}, alice.messages[-1]["add"])
+        self.assertEqual(alice.messages[-1], bob.messages[-1])
+
+        lobby.handle_request(bob, "games.lobby.get_clients", {"offset": 1})
+        self.assertEqual({2: "Bob"}, bob.messages[-1]["clients"])
+        self.assertEqual(2, bob.messages[-1]["version"])
@@ -1,6 +1,21 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
 from unittest import TestCase
+from unittest.mock import Mock, patch
 
+from tornado.testing import AsyncHTTPTestCase
+import tornado.gen
+import tornado.ioloop
+import tornado.web
+
+import base.assets
+import base.client
 import server
+import tests.load_test
 from configuration import config
 
 
@@ -16,4 +31,230 @@ class ServerTestCase(TestCase):
         self.assertEqual(1, config.port)
 
         s.reset()
-        self.assertEqual(port, config.port)
\ No newline at end of file
+        self.assertEqual(port, config.port)
+
+    @patch("asyncio.set_event_loop_policy")
+    def test_event_loop_policy(self, set_policy):
+        for name in ("missing_module.EventLoopPolicy", "asyncio.MissingPolicy", None):
+            config.maps.insert(0, {"event_loop_policy": name})
+            try:
+                server.set_event_loop_policy()
+            finally:
+                del config.maps[0]
+        self.assertFalse(set_policy.called)
+
+        config.maps.insert(0, {"event_loop_policy": "asyncio.DefaultEventLoopPolicy"})
+        try:
+            server.set_event_loop_policy()
+        finally:
+            del config.maps[0]
+        self.assertIsInstance(set_policy.call_args[0][0], asyncio.DefaultEventLoopPolicy)
+
+class StaticFileHandlerTestCase(AsyncHTTPTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.content = b"var a = 1;\n" * 100
+        with open(os.path.join(self.directory.name, "a.js"), "wb") as file:
+            file.write(self.content)
+        base.assets.compress(os.path.join(self.directory.name, "a.js"))
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        self.directory.cleanup()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    def get_app(self):
+        return tornado.web.Application([
+            (r"/static/(.*)", server.StaticFileHandler, {"path": self.directory.name}),
+            (r"/assets/(.*)", server.StaticFileHandler, {"path": self.directory.name, "immutable": True}),
+        ])
+
+    def test_identity(self):
+        response = self.fetch("/static/a.js", headers={"Accept-Encoding": "identity"}, decompress_response=False)
+
+        self.assertEqual(200, response.code)
+        self.assertEqual(self.content, response.body)
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertIn("javascript", response.headers["Content-Type"])
+        self.assertEqual('"{}"'.format(hashlib.sha1(self.content).hexdigest()), response.headers["Etag"])
+
+    def test_gzip(self):
+        response = self.fetch("/static/a.js", headers={"Accept-Encoding": "gzip, deflate"}, decompress_response=False)
+
+        self.assertEqual("gzip", response.headers["Content-Encoding"])
+        self.assertEqual("Accept-Encoding", response.headers["Vary"])
+        self.assertIn("javascript", response.headers["Content-Type"])
+        self.assertEqual(self.content, gzip.decompress(response.body))
+
+    def test_compressed_file(self):
+        response = self.fetch("/static/a.js.gz", headers={"Accept-Encoding": "gzip"}, decompress_response=False)
+
+        self.assertEqual("application/gzip", response.headers["Content-Type"])
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(self.content, gzip.decompress(response.body))
+
+    def test_etag(self):
+        etag = self.fetch("/static/a.js").headers["Etag"]
+        response = self.fetch("/static/a.js", headers={"If-None-Match": etag})
+        self.assertEqual(304, response.code)
+
+    def test_immutable(self):
+        response = self.fetch("/assets/a.js")
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        self.assertEqual(404, self.fetch("/assets/missing.js").code)
+
+
+class StartHandlerTestCase(AsyncHTTPTestCase):
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    def get_app(self):
+        return tornado.web.Application([(r"/", server.StartHandler)], template_path=config.template_path)
+
+    def test_inline_state(self):
+        client = base.client.Client(1, "Alice")
+        with patch.object(server.StartHandler, "get_current_user", return_value=client):
+            response = self.fetch("/")
+
+        self.assertEqual(200, response.code)
+        page = response.body.decode()
+        self.assertIn("var initial_commands = [", page)
+        self.assertIn('"set_client_info"', page)
+        self.assertIn('"/static/lobby.html"', page)
+        self.assertNotIn("</div>", page.split("var fragments = ")[1].split("\n")[0])
+        # The messages are in the page, so they are not sent with the next poll.
+        self.assertEqual([], client.messages.get_all())
+
+    def test_load_test_reads_page(self):
+        client = base.client.Client(1, "Alice")
+        with patch.object(server.StartHandler, "get_current_user", return_value=client):
+            page = self.fetch("/").body.decode()
+
+        session_id, commands = tests.load_test.parse_start_page(page)
+
+        self.assertEqual(client.session_id, session_id)
+        client_info = [c for c in commands if c["command"] == "set_client_info"]
+        self.assertEqual(1, len(client_info))
+        self.assertEqual(1, client_info[0]["id"])
+
+
+class PollHandlerTestCase(AsyncHTTPTestCase):
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    def get_app(self):
+        return tornado.web.Application([(r"/poll", server.PollHandler)])
+
+    def poll(self, client, encoding, **kwargs):
+        with patch.object(server.PollHandler, "get_current_user", return_value=client):
+            return self.fetch("/poll?session_id={}&encoding={}".format(client.session_id, encoding), **kwargs)
+
+    def poll_say(self, client, encoding):
+        client.messages.put({"command": "ui.say", "message": "Hi"})
+        return json.loads(self.poll(client, encoding).body.decode())
+
+    def test_compact(self):
+        client = base.client.Client(1, "Alice")
+        self.assertEqual({"s": {"0": ["ui.say", "message"]}, "m": [[0, "Hi"]]}, self.poll_say(client, "compact"))
+        self.assertEqual({"s": {}, "m": [[0, "Hi"]]}, self.poll_say(client, "compact"))
+
+    def test_plain(self):
+        client = base.client.Client(1, "Alice")
+        self.assertEqual([{"command": "ui.say", "message": "Hi"}], self.poll_say(client, "json"))
+
+        config.maps.insert(0, {"compact_encoding": False})
+        try:
+            self.assertEqual([{"command": "ui.say", "message": "Hi"}], self.poll_say(client, "compact"))
+        finally:
+            del config.maps[0]
+
+    def test_compression(self):
+        client = base.client.Client(1, "Alice")
+        stats = server.CompressionStats()
+        messages = [{"command": "chat.receive_message", "message": "Hello {}".format(i)} for i in range(200)]
+
+        with patch.object(server.PollHandler, "compression_stats", stats):
+            for message in messages:
+                client.messages.put(message)
+            response = self.poll(client, "json", decompress_response=False, headers={"Accept-Encoding": "gzip"})
+            self.assertEqual("gzip", response.headers["Content-Encoding"])
+            self.assertEqual(messages, json.loads(gzip.decompress(response.body).decode()))
+
+            client.messages.put(messages[0])
+            response = self.poll(client, "json", decompress_response=False, headers={"Accept-Encoding": "gzip"})
+            self.assertNotIn("Content-Encoding", response.headers)
+
+        self.assertEqual(2, stats.responses)
+        self.assertEqual(1, stats.compressed)
+        self.assertLess(stats.ratio, 0.5)
+        self.assertIn("1 of 2 responses compressed", str(stats))
+
+    def test_no_compression(self):
+        client = base.client.Client(1, "Alice")
+        for i in range(200):
+            client.messages.put({"command": "chat.receive_message", "message": "Hello {}".format(i)})
+
+        response = self.poll(client, "json", decompress_response=False, headers={"Accept-Encoding": "identity"})
+
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(200, len(json.loads(response.body.decode())))
+
+
+class ClientRequestHandlerTestCase(AsyncHTTPTestCase):
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    def get_app(self):
+        return tornado.web.Application([(r"/request", server.ClientRequestHandler)])
+
+    def test_deferred(self):
+        client = base.client.Client(1, "Alice")
+        client.handle_request = Mock(side_effect=base.client.UnhandledClientRequestError("chat.message"))
+        client.notify_of_exception = Mock()
+
+        with patch.object(server.ClientRequestHandler, "get_current_user", return_value=client), \
+                self.assertLogs("base.scheduler", level="ERROR"):
+            response = self.fetch(
+                "/request?session_id={}".format(client.session_id), method="POST", body='{"command": "chat.message"}'
+            )
+            self.io_loop.run_sync(lambda: tornado.gen.moment)
+
+        # The request is accepted before it is handled, so its failure only reaches the location.
+        self.assertEqual(202, response.code)
+        client.handle_request.assert_called_once_with({"command": "chat.message"})
+        self.assertTrue(client.notify_of_exception.called)
+
+    def test_rate_limit(self):
+        client = base.client.Client(1, "Alice")
+        client.handle_request = Mock()
+        config.maps.insert(0, {"rate_limits": {"chat.message": (0.001, 2)}})
+        try:
+            with patch.object(server.ClientRequestHandler, "get_current_user", return_value=client):
+                codes = [
+                    self.fetch(
+                        "/request?session_id={}".format(client.session_id),
+                        method="POST",
+                        body='{{"command": "chat.message", "message": "{}"}}'.format(i)
+                    ).code
+                    for i in range(3)
+                ]
+        finally:
+            del config.maps[0]
+
+        self.assertEqual([202, 202, 429], codes)
+        self.io_loop.run_sync(lambda: tornado.gen.moment)
+        self.assertEqual(2, client.handle_request.call_count)
+
+    def test_deduplication_key(self):
+        client = base.client.Client(1, "Alice")
+        put = Mock(return_value=True)
+        with patch.object(server.ClientRequestHandler, "get_current_user", return_value=client), \
+                patch.object(server.get_instance().scheduler, "put", put):
+            for body in ('{"command": "chat.message", "message": "ok"}', '{"command": "games.get_info"}'):
+                self.fetch("/request?session_id={}".format(client.session_id), method="POST", body=body)
+
+        self.assertIsNone(put.call_args_list[0][1]["key"])
+        self.assertIsNotNone(put.call_args_list[1][1]["key"])